@@ -0,0 +1,234 @@
+"""
+HotelCrawler のベンチマーク
+his-vacation.com と同じ形の一覧ページを返すローカルのテスト用サーバーを立て、
+test.ipynb の scrape() と同じ方法（1ページずつ requests.get + 固定の sleep）と、HotelCrawler を比べる
+途中で止めてチェックポイントから再開しても、通しで取得したときと同じ宿が集まることも確かめる
+解析だけの速さ（BeautifulSoup / lxml、取得スレッドで解析 / プロセスプールで解析）も測る
+一度保存した後に一部の宿の内容を変え、差分取得（--incremental と同じ）でどれだけリクエストと書き込みが減るかも測る
+
+使い方: python bench_crawler.py [--listings 300] [--per-page 30] [--latency 0.2] [--sleep 1.5]
+                               [--rate 4] [--workers 4] [--parse-workers N] [--limit 100] [--parse-pages 200]
+                               [--changed 5]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+import hotel_crawler
+from hotel_crawler import HDR, PREFECTURES, CrawlCheckpoint, HotelCrawler, parse_listing_page
+from hotel_store import HotelStore
+from scrape_pipeline import default_parse_workers
+
+ITEM_HTML = """<li>
+  <h2 class="ut_name"><a href="/hotel/{id}/">{name}</a></h2>
+  <p class="ut_btn_clip"><a href="#" data-value="{id}">クリップ</a></p>
+  <div class="ut_review"><span class="ut_average">{rating:.1f}</span>
+    <span>（<span itemprop="reviewCount">{reviews:,}</span>件）</span></div>
+  <p class="ut_person">大人1名：{price:,}円〜</p>
+</li>"""
+
+
+def make_listings(prefectures, n):
+    """県ごとに n 件の宿（id, 宿名, 評価, レビュー数, 価格）を作る"""
+    listings = {}
+    for p_index, prefecture in enumerate(prefectures):
+        base = (p_index + 1) * 1_000_000
+        listings[prefecture] = [
+            {"id": base + i, "name": f"{prefecture} ホテル {i}", "rating": 3 + (i % 20) / 10,
+             "reviews": (i * 37) % 5000, "price": 5000 + (i * 113) % 40000}
+            for i in range(n)
+        ]
+    return listings
+
+
+def render_page(items):
+    return "<html><body><ul id=\"result-list\">{}</ul></body></html>".format(
+        "\n".join(ITEM_HTML.format(**item) for item in items)).encode("utf-8")
+
+
+def start_fixture_server(listings, per_page, latency):
+    """/area/<県>/ と /area/<県>/<n>.html を返すサーバーを別スレッドで起動する"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path).path.strip("/").split("/")
+            if len(parts) < 2 or parts[0] != "area" or parts[1] not in listings:
+                self.send_error(404)
+                return
+            page = int(parts[2].removesuffix(".html")) if len(parts) > 2 and parts[2] else 1
+            items = listings[parts[1]][(page - 1) * per_page:page * per_page]
+            if latency:
+                time.sleep(latency)
+            body = render_page(items)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/area/"
+
+
+def sequential_crawl(base_url, prefectures, limit, sleep):
+    """test.ipynb の scrape() と同じ取り方（県ごと・1ページずつ、ページの間に sleep）"""
+    results = {}
+    for prefecture in prefectures:
+        rows, page = [], 1
+        while len(rows) < limit:
+            url = f"{base_url}{prefecture}/{f'{page}.html' if page > 1 else ''}?kd=h_3&sr=pop"
+            res = requests.get(url, headers=HDR)
+            res.raise_for_status()
+            found = parse_listing_page(res.content)
+            if not found:
+                break
+            rows.extend(found[:limit - len(rows)])
+            page += 1
+            time.sleep(sleep)
+        results[prefecture] = rows
+    return results
+
+
+def run_crawler(base_url, args, checkpoint=None, stop_after=None):
+    """HotelCrawler で取得する（stop_after ページを処理したら、次のページを受け取ったところで中断する）"""
+    crawler = HotelCrawler(base_url=base_url, limit=args.limit, rate=args.rate, burst=args.workers,
+                           max_workers=args.workers, checkpoint=checkpoint, parse_workers=args.parse_workers)
+    results = {p: [] for p in PREFECTURES}
+    try:
+        for n, (prefecture, _, rows) in enumerate(crawler.iter_pages(PREFECTURES), start=1):
+            if stop_after is not None and n > stop_after:
+                break
+            results[prefecture].extend(rows)
+    finally:
+        crawler.close()
+    return results, crawler.stats()
+
+
+def run_into_store(base_url, args, store, incremental=False):
+    """HotelCrawler で取得して store に保存する（incremental なら前回と同じページが続いたところで打ち切る）"""
+    crawler = HotelCrawler(base_url=base_url, limit=args.limit, rate=args.rate, burst=args.workers,
+                           max_workers=args.workers, parse_workers=args.parse_workers,
+                           page_unchanged=store.is_unchanged if incremental else None)
+    changes = [0, 0, 0]
+    try:
+        for _, _, rows in crawler.iter_pages(PREFECTURES):
+            # ページごとに書き込む（次のページの判定に、このページの保存結果を使うため）
+            changes = [total + n for total, n in zip(changes, store.record_listings(rows))]
+    finally:
+        crawler.close()
+    return changes, crawler.stats()
+
+
+def ids(results):
+    return {p: [row.id for row in rows] for p, rows in results.items()}
+
+
+def parse_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return hotel_crawler._parse_items(soup.select("#result-list > li"), hotel_crawler._parse_item)
+
+
+def bench_parse(pages, parse_workers):
+    """解析だけの速さ（pages の各ページを解析し終えるまで）"""
+    results = {}
+    start = time.perf_counter()
+    results["BeautifulSoup"] = [parse_bs4(page) for page in pages]
+    times = {"BeautifulSoup": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    results["lxml"] = [parse_listing_page(page) for page in pages]
+    times["lxml"] = time.perf_counter() - start
+
+    if parse_workers:
+        with ProcessPoolExecutor(parse_workers) as pool:
+            list(pool.map(abs, range(parse_workers)))  # プロセスの起動は測らない
+            start = time.perf_counter()
+            results[f"lxml x{parse_workers} procs"] = list(pool.map(parse_listing_page, pages, chunksize=4))
+            times[f"lxml x{parse_workers} procs"] = time.perf_counter() - start
+    return times, all(r == results["BeautifulSoup"] for r in results.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hotel crawler benchmark against a local fixture server")
+    parser.add_argument("--listings", type=int, default=300, help="県ごとの宿の数")
+    parser.add_argument("--per-page", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.2, help="サーバーの応答の遅さ(秒)")
+    parser.add_argument("--sleep", type=float, default=1.5, help="scrape() のページ間の sleep(秒)")
+    parser.add_argument("--rate", type=float, default=4.0, help="HotelCrawler の1秒あたりのリクエスト数")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, default=None, help="解析のプロセス数（0 で取得スレッドで解析）")
+    parser.add_argument("--parse-pages", type=int, default=200, help="解析だけを測るページ数")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--changed", type=int, default=5, help="差分取得の前に内容を変える宿の数（県ごと、先頭のページ）")
+    args = parser.parse_args()
+
+    listings = make_listings(["bench"], args.per_page * args.parse_pages)["bench"]
+    pages = [render_page(listings[i:i + args.per_page]) for i in range(0, len(listings), args.per_page)]
+    parse_workers = default_parse_workers() if args.parse_workers is None else args.parse_workers
+    times, same = bench_parse(pages, parse_workers)
+    print(f"parse {len(pages)} pages x {args.per_page} listings (results match: {same})")
+    for name, sec in times.items():
+        print(f"  {name:<22} {sec:>7.2f}s  {len(pages) / sec:>8.1f} pages/s")
+
+    all_listings = make_listings(PREFECTURES, args.listings)
+    server, base_url = start_fixture_server(all_listings, args.per_page, args.latency)
+    print(f"{len(PREFECTURES)} prefectures x limit {args.limit}, {args.per_page}/page, latency {args.latency}s")
+    try:
+        start = time.perf_counter()
+        expected = sequential_crawl(base_url, PREFECTURES, args.limit, args.sleep)
+        sequential_sec = time.perf_counter() - start
+
+        results, s = run_crawler(base_url, args)
+        print(f"{'scrape() (sequential)':<24} {sequential_sec:>7.2f}s")
+        print(f"{'HotelCrawler':<24} {s['elapsed_sec']:>7.2f}s  {s['requests']} requests, "
+              f"{s['pages_per_sec']:.2f} pages/s, {s['listings_per_sec']:.1f} listings/s, "
+              f"rate limit wait {s['wait_sec']:.2f}s")
+        print(f"speedup {sequential_sec / s['elapsed_sec']:.1f}x, results match: {ids(results) == ids(expected)}")
+
+        # 2ページ処理したところで中断し、チェックポイントから再開する
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "crawl_state.json")
+            first, _ = run_crawler(base_url, args, CrawlCheckpoint(path), stop_after=2)
+            second, s = run_crawler(base_url, args, CrawlCheckpoint(path))
+            resumed = {p: first[p] + second[p] for p in PREFECTURES}
+            print(f"resumed crawl: {sum(map(len, first.values()))} + {sum(map(len, second.values()))} listings, "
+                  f"{s['requests']} requests after resume, results match: {ids(resumed) == ids(expected)}")
+
+        # 全件を保存した後、県ごとに先頭の数件の価格を変えて、全件の取り直しと差分取得を比べる
+        with tempfile.TemporaryDirectory() as tmp:
+            store = HotelStore(os.path.join(tmp, "bench.db"))
+            try:
+                run_into_store(base_url, args, store)
+                for items in all_listings.values():
+                    for item in items[:args.changed]:
+                        item["price"] += 100
+                saved = store.query("SELECT id, content_hash FROM hotel_listings")
+                for label, incremental in (("full re-crawl", False), ("incremental", True)):
+                    # どちらも価格を変える前に保存した状態から始める
+                    with store.transaction() as cursor:
+                        cursor.executemany("UPDATE hotel_listings SET content_hash = ? WHERE id = ?",
+                                           [(digest, hid) for hid, digest in saved])
+                    (inserted, updated, unchanged), s = run_into_store(base_url, args, store, incremental)
+                    print(f"{label:<24} {s['elapsed_sec']:>7.2f}s  {s['requests']} requests, "
+                          f"{updated} changed / {unchanged} unchanged listings, "
+                          f"{s['unchanged_pages']} unchanged pages")
+            finally:
+                store.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+DistanceEngine のベンチマーク
+入力を大きくしても、ピークのメモリ（tracemalloc で測った numpy の確保量）が
+入力の配列 + memory_budget 程度に収まる（ホテル数 × 観光地数 に比例しない）ことを確かめる
+
+使い方: python bench_distance.py [--sizes 1000x100000 4000x100000 2000x1000000] [--budget-mb 64] [--float32] [--workers 1]
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench_proximity import make_points
+from distance_engine import DistanceEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="tiled pairwise distance benchmark")
+    parser.add_argument("--sizes", nargs="+", default=["1000x100000", "4000x100000", "2000x1000000"],
+                        help="ホテル数x観光地数")
+    parser.add_argument("--budget-mb", type=float, default=64)
+    parser.add_argument("--float32", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--radius", type=float, default=1.0)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = DistanceEngine(
+        memory_budget=int(args.budget_mb * 1024 * 1024),
+        dtype=np.float32 if args.float32 else np.float64,
+        workers=args.workers,
+    )
+    rng = np.random.default_rng(0)
+    print(f"budget {args.budget_mb}MB, dtype {engine.dtype}, workers {engine.workers}")
+    print(f"{'size':>16} {'mode':>8} {'time':>9} {'pairs/s':>12} {'peak mem':>10} {'result':>12}")
+    for size in args.sizes:
+        n_hotels, n_pois = (int(v) for v in size.split("x"))
+        h_lat, h_lon = make_points(n_hotels, rng)
+        a_lat, a_lon = make_points(n_pois, rng)
+
+        for mode in ("within", "nearest"):
+            tracemalloc.start()
+            start = time.perf_counter()
+            if mode == "within":
+                # 組は数えるだけで捨てる（ストリームで受け取ればメモリは増えない）
+                found = sum(len(rows) for rows, _, _ in engine.pairs_within(h_lat, h_lon, a_lat, a_lon, args.radius))
+                result = f"{found} pairs"
+            else:
+                indices, _ = engine.nearest(h_lat, h_lon, a_lat, a_lon, k=args.k)
+                result = f"{indices.shape[0]}x{indices.shape[1]}"
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            rate = n_hotels * n_pois / elapsed
+            print(f"{size:>16} {mode:>8} {elapsed:>8.2f}s {rate:>12.3g} {peak / 2 ** 20:>8.1f}MB {result:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+HotelStore のベンチマーク
+test.ipynb と同じ方法（主キーなしのテーブルに INSERT、座標は iterrows で1行ずつ UPDATE ... WHERE name = ?）と、
+HotelStore（id の一意インデックス + ON CONFLICT の一括 upsert、座標は一時テーブルから1回の UPDATE）を比べる
+
+使い方: python bench_hotel_store.py [--hotels 20000] [--sample 300]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from hotel_store import HotelStore
+
+
+def make_hotels(n, rng):
+    """(id, name, lat, lon, rating, review_count, price) の行と、座標をつけたCSV用の DataFrame を作る"""
+    ids = rng.choice(10_000_000, n, replace=False)
+    rows = [(int(i), f"ホテル{i}", None, None, float(r), int(c), int(p)) for i, r, c, p in
+            zip(ids, rng.uniform(3, 5, n).round(2), rng.integers(0, 5000, n), rng.integers(5000, 50000, n))]
+    coords = pd.DataFrame({"name": [r[1] for r in rows], "lat": rng.uniform(34.6, 35.9, n),
+                           "lon": rng.uniform(138.0, 139.8, n)})
+    return rows, coords
+
+
+def write_coords_csv(coords, path):
+    """スプレッドシートから書き出したCSVと同じ並び（A列: 宿名, G列: lat, H列: lon）"""
+    df = pd.DataFrame({"宿名": coords["name"]})
+    for col in "BCDEF":
+        df[col] = ""
+    df["lat"], df["lon"] = coords["lat"], coords["lon"]
+    df.to_csv(path, index=False)
+
+
+def notebook_insert(db_name, rows):
+    conn = sqlite3.connect(db_name)
+    conn.execute("CREATE TABLE IF NOT EXISTS hotels (id INT, name TEXT, lat REAL, lon REAL, rating REAL, review_count INT, price INT)")
+    conn.executemany("INSERT INTO hotels VALUES (?,?,?,?,?,?,?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def notebook_import_coords(db_name, csv_name, sample):
+    """safe_import_coords と同じ方法（先頭 sample 行だけ）"""
+    df = pd.read_csv(csv_name, usecols=[0, 6, 7], names=["name", "lat", "lon"], header=0).iloc[:sample]
+    df = df.replace({np.nan: None})
+    conn = sqlite3.connect(db_name)
+    cur = conn.cursor()
+    for _, row in df.iterrows():
+        if row["name"]:
+            cur.execute("UPDATE hotels SET lat = ?, lon = ? WHERE name = ?", (row["lat"], row["lon"], row["name"]))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hotels table upsert / coordinate merge benchmark")
+    parser.add_argument("--hotels", type=int, default=20_000)
+    parser.add_argument("--sample", type=int, default=300, help="1行ずつの UPDATE で測る行数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    rows, coords = make_hotels(args.hotels, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_name = os.path.join(tmp, "hotel_coords.csv")
+        write_coords_csv(coords, csv_name)
+
+        # test.ipynb の方法（同じ宿を2回取り込むと2行になる）
+        old_db = os.path.join(tmp, "old.db")
+        start = time.perf_counter()
+        notebook_insert(old_db, rows)
+        notebook_insert(old_db, rows)
+        old_insert_sec = time.perf_counter() - start
+        start = time.perf_counter()
+        notebook_import_coords(old_db, csv_name, args.sample)
+        old_coords_sec = (time.perf_counter() - start) / args.sample * args.hotels
+        old_rows = sqlite3.connect(old_db).execute("SELECT COUNT(*) FROM hotels").fetchone()[0]
+
+        # HotelStore（古いDBを開くと重複をまとめて一意インデックスを張る）
+        start = time.perf_counter()
+        store = HotelStore(old_db)
+        migrate_sec = time.perf_counter() - start
+        migrated = store.query("SELECT COUNT(*), COUNT(lat) FROM hotels")[0]
+        store.close()
+
+        store = HotelStore(os.path.join(tmp, "new.db"))
+        start = time.perf_counter()
+        first = store.upsert_hotels(rows)
+        second = store.upsert_hotels(rows)
+        upsert_sec = time.perf_counter() - start
+        start = time.perf_counter()
+        total, updated = store.import_coords_csv(csv_name)
+        coords_sec = time.perf_counter() - start
+        count, located = store.query("SELECT COUNT(*), COUNT(lat) FROM hotels")[0]
+        # 座標を入れた後に取り直しても、座標は残る
+        store.upsert_hotels(rows[:100])
+        kept = store.query("SELECT COUNT(lat) FROM hotels")[0][0] == located
+        store.close()
+
+    n = args.hotels
+    print(f"{n} hotels, imported twice")
+    print(f"{'notebook insert x2':<28} {old_insert_sec:>8.2f}s  {old_rows} rows")
+    print(f"{'notebook coords (estimated)':<28} {old_coords_sec:>8.2f}s  {n / old_coords_sec:>10.0f} rows/s  from {args.sample} rows")
+    print(f"{'migrate old table':<28} {migrate_sec:>8.2f}s  {migrated[0]} rows ({migrated[1]} with coordinates)")
+    print(f"{'HotelStore upsert x2':<28} {upsert_sec:>8.2f}s  {2 * n / upsert_sec:>10.0f} rows/s  "
+          f"{count} rows (inserted {first[0]}, then updated {second[1]})")
+    print(f"{'HotelStore coords merge':<28} {coords_sec:>8.2f}s  {total / coords_sec:>10.0f} rows/s  "
+          f"{updated} updated, {located} with coordinates")
+    print(f"coordinates kept after re-scrape: {kept}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+周辺観光地の集計のベンチマーク
+analysis.ipynb のようにホテルを1件ずつ iterrows で回して全観光地との距離を計算する方法と、
+ProximityIndex でまとめて数える方法を比べる
+
+ホテルと観光地は神奈川・静岡・山梨のあたりに、街の周りに集まるように合成する
+（1件ずつの方法は全件だと時間がかかりすぎるので、--sample 件だけ測って全件分に換算する）
+
+使い方: python bench_proximity.py [--hotels 100000] [--pois 1000000] [--radius 1.0] [--sample 50]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from proximity import ProximityIndex, haversine_km, nearby_category_counts
+
+CATEGORIES = ["museum", "place_of_worship", "viewpoint", "theme_park", "attraction", "park"]
+LAT_RANGE = (34.6, 35.9)
+LON_RANGE = (138.0, 139.8)
+
+
+def make_points(n, rng, n_towns=200, town_share=0.7, town_sigma_km=3.0):
+    """街の周りに集まった点と、全体にばらけた点を混ぜて作る"""
+    towns_lat = rng.uniform(*LAT_RANGE, n_towns)
+    towns_lon = rng.uniform(*LON_RANGE, n_towns)
+    n_town = int(n * town_share)
+    town = rng.integers(0, n_towns, n_town)
+    sigma = town_sigma_km / 111.0
+    lat = np.concatenate([towns_lat[town] + rng.normal(0, sigma, n_town), rng.uniform(*LAT_RANGE, n - n_town)])
+    lon = np.concatenate([towns_lon[town] + rng.normal(0, sigma, n_town), rng.uniform(*LON_RANGE, n - n_town)])
+    return lat, lon
+
+
+def naive_counts(df_h, df_a, radius_km):
+    """analysis.ipynb と同じ方法（ホテルごとに全観光地との距離を計算）"""
+    results = []
+    for _, hotel in df_h.iterrows():
+        distances = haversine_km(hotel["lat"], hotel["lon"], df_a["lat"], df_a["lon"])
+        nearby = df_a[distances <= radius_km]
+        results.append([len(nearby)] + [len(nearby[nearby["category"] == c]) for c in CATEGORIES])
+    return np.array(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hotel-attraction proximity benchmark")
+    parser.add_argument("--hotels", type=int, default=100_000)
+    parser.add_argument("--pois", type=int, default=1_000_000)
+    parser.add_argument("--radius", type=float, default=1.0, help="検索半径(km)")
+    parser.add_argument("--sample", type=int, default=50, help="1件ずつの方法で測るホテル数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    h_lat, h_lon = make_points(args.hotels, rng)
+    a_lat, a_lon = make_points(args.pois, rng)
+    df_h = pd.DataFrame({"lat": h_lat, "lon": h_lon})
+    df_a = pd.DataFrame({"lat": a_lat, "lon": a_lon, "category": rng.choice(CATEGORIES, args.pois)})
+    print(f"{args.hotels} hotels x {args.pois} POIs, radius {args.radius}km")
+
+    start = time.perf_counter()
+    index = ProximityIndex(df_a["lat"], df_a["lon"], radius_km=args.radius, categories=df_a["category"])
+    build_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    total = index.count_within(df_h["lat"], df_h["lon"])
+    total_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    counts, names = index.count_by_category(df_h["lat"], df_h["lon"])
+    category_sec = time.perf_counter() - start
+
+    # df_analysis と同じ表を作る（近傍の疎行列 → カテゴリ別の行列を1回の集計で）
+    start = time.perf_counter()
+    df_analysis = nearby_category_counts(df_h, df_a, radius_km=args.radius)
+    analysis_sec = time.perf_counter() - start
+
+    sample = df_h.iloc[:args.sample]
+    start = time.perf_counter()
+    expected = naive_counts(sample, df_a, args.radius)
+    naive_sec = (time.perf_counter() - start) / len(sample) * args.hotels
+
+    # 1件ずつの方法と結果が一致するか確かめる
+    order = [list(names).index(c) for c in CATEGORIES]
+    matches = np.array_equal(expected[:, 0], total[:args.sample]) and \
+        np.array_equal(expected[:, 1:], counts[:args.sample][:, order])
+
+    print(f"{'index build':<28} {build_sec:>10.2f}s")
+    print(f"{'radius counts (all hotels)':<28} {total_sec:>10.2f}s  mean {total.mean():.1f} POIs/hotel")
+    print(f"{'per-category counts':<28} {category_sec:>10.2f}s  {counts.shape[0]}x{counts.shape[1]} matrix")
+    print(f"{'df_analysis (sparse → table)':<28} {analysis_sec:>10.2f}s  {len(df_analysis)} rows")
+    print(f"{'iterrows loop (estimated)':<28} {naive_sec:>10.1f}s  from {args.sample} hotels")
+    print(f"speedup {naive_sec / (build_sec + category_sec):.0f}x, results match: {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+from bench_crawler import render_page
+
+
+# --- his-vacation.com と同じ形の一覧ページを返すスタブサーバー ---
+class ListingServer:
+    """
+    /area/<県>/ と /area/<県>/<n>.html を返す
+    failures[(県, ページ)] に回数を入れると、その回数だけ500を返す（None なら毎回）
+    """
+
+    def __init__(self, listings, per_page, latency=0):
+        self.listings = listings
+        self.per_page = per_page
+        self.latency = latency
+        self.failures = {}
+        self.requests = []       # 受け取った (県, ページ)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}/area/"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def handle(self, handler):
+        parts = urlsplit(handler.path).path.strip("/").split("/")
+        prefecture = parts[1]
+        page = int(parts[2].removesuffix(".html")) if len(parts) > 2 and parts[2] else 1
+        with self._lock:
+            self.requests.append((prefecture, page))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            remaining = self.failures.get((prefecture, page), 0)
+            fail = remaining is None or remaining > 0
+            if remaining:
+                self.failures[(prefecture, page)] = remaining - 1
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                handler.send_error(500)
+                return
+            if prefecture not in self.listings:
+                handler.send_error(404)
+                return
+            body = render_page(self.listings[prefecture][(page - 1) * self.per_page:page * self.per_page])
+            handler.send_response(200)
+            handler.send_header("Content-Type", "text/html; charset=utf-8")
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def pages_requested(self, prefecture):
+        return sorted(page for p, page in self.requests if p == prefecture)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def listing_server():
+    """ListingServer を起動する関数を返す（テストの終わりに止める）"""
+    servers = []
+
+    def start(listings, per_page, latency=0):
+        server = ListingServer(listings, per_page, latency)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
@@ -0,0 +1,190 @@
+"""
+メモリ使用量を抑えた総当たりの距離計算
+
+ホテル × 観光地 の距離行列を一度に作らず、メモリの上限（memory_budget）に収まる大きさの
+タイルに分けて計算する。結果は
+  - しきい値以下の (ホテル, 観光地, 距離km) の組をタイル（行ブロック × 列タイル）ごとに順に返す（pairs_within）
+  - ホテルごとに近い順 k 件を返す（nearest）
+のどちらかで受け取るので、ピークのメモリは 入力の配列（点の数に比例）+ memory_budget 程度に収まり、
+ホテル数 × 観光地数 には比例しない。
+
+使い方:
+    engine = DistanceEngine(memory_budget=64 * 1024 * 1024, dtype=np.float32, workers=4)
+    for hotel_idx, attraction_idx, dist in engine.pairs_within(h_lat, h_lon, a_lat, a_lon, max_km=1.0):
+        ...
+    indices, distances = engine.nearest(h_lat, h_lon, a_lat, a_lon, k=5)
+"""
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from proximity import EARTH_RADIUS_KM
+
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024  # タイルの計算に使うメモリの上限(バイト)
+# タイルの1マスあたりに同時に確保するメモリのおおよその量（浮動小数点の配列数, 整数(int64)の配列数）
+PAIRS_TILE_ARRAYS = (5, 2)     # 計算途中の配列・比較結果などと、しきい値以下の組（すべてが該当しても収まるように）
+NEAREST_TILE_ARRAYS = (4, 3)   # 上に加えて、候補の位置と並べ替え用の添字
+
+
+# --- 1タイル分の計算 ---
+
+def _prepare(lat, lon, dtype):
+    """緯度経度をラジアンにして、cos(緯度) と一緒に持つ"""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    return lat.astype(dtype), lon.astype(dtype), np.cos(lat).astype(dtype)
+
+
+def _haversine_term(a, b, a_slice, b_slice):
+    """
+    ハバーサイン公式の hav(距離/R) の値をタイル分まとめて計算する（距離に対して単調増加）
+    一時配列を増やさないよう、できるだけ同じ配列の上で計算する
+    """
+    a_lat, a_lon, a_cos = (x[a_slice, None] for x in a)
+    b_lat, b_lon, b_cos = (x[None, b_slice] for x in b)
+    h = b_lat - a_lat
+    np.multiply(h, 0.5, out=h)
+    np.sin(h, out=h)
+    np.square(h, out=h)
+    t = b_lon - a_lon
+    np.multiply(t, 0.5, out=t)
+    np.sin(t, out=t)
+    np.square(t, out=t)
+    t *= a_cos
+    t *= b_cos
+    h += t
+    return h
+
+
+def _to_km(h):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+def _tile_pairs(a, b, param, tile_cols):
+    """タイル1つ分（行ブロック × 列 j0 から tile_cols 列）について、しきい値以下の組を返す"""
+    max_h, j0 = param
+    h = _haversine_term(a, b, slice(0, len(a[0])), slice(j0, j0 + tile_cols))
+    i, j = np.nonzero(h <= max_h)
+    return i, j + j0, _to_km(h[i, j])
+
+
+def _block_nearest(a, b, k, tile_cols):
+    """行ブロック1つ分について、列タイルをまたいで近い順 k 件を保ちながら探す"""
+    n_rows, n_cols = len(a[0]), len(b[0])
+    best_h = np.full((n_rows, 0), np.inf, dtype=a[0].dtype)
+    best_j = np.zeros((n_rows, 0), dtype=np.int64)
+    for j0 in range(0, n_cols, tile_cols):
+        h = _haversine_term(a, b, slice(0, n_rows), slice(j0, j0 + tile_cols))
+        cand_h = np.concatenate([best_h, h], axis=1)
+        cand_j = np.concatenate([best_j, np.broadcast_to(np.arange(j0, j0 + h.shape[1]), h.shape)], axis=1)
+        if cand_h.shape[1] > k:
+            top = np.argpartition(cand_h, k - 1, axis=1)[:, :k]
+            cand_h = np.take_along_axis(cand_h, top, axis=1)
+            cand_j = np.take_along_axis(cand_j, top, axis=1)
+        best_h, best_j = cand_h, cand_j
+    order = np.argsort(best_h, axis=1, kind="stable")
+    return np.take_along_axis(best_j, order, axis=1), _to_km(np.take_along_axis(best_h, order, axis=1))
+
+
+# --- プロセスプール用（観光地側の配列は各プロセスに1回だけ渡す） ---
+
+_shared = {}
+
+
+def _init_worker(b, tile_cols):
+    _shared["b"] = b
+    _shared["tile_cols"] = tile_cols
+
+
+def _run_block(block_func, a, param):
+    return block_func(a, _shared["b"], param, _shared["tile_cols"])
+
+
+class DistanceEngine:
+    """
+    タイル分割による総当たりの距離計算
+    memory_budget: 1タイル（プロセスごと）の計算に使うメモリの上限(バイト)
+    dtype: np.float32 にするとメモリが半分になる（距離の誤差は数メートル程度）
+    workers: 2以上でタイルの計算を複数のプロセスに分ける
+    """
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, dtype=np.float64, workers=1):
+        if memory_budget <= 0:
+            raise ValueError("memory_budget must be positive")
+        self.memory_budget = memory_budget
+        self.dtype = np.dtype(dtype)
+        self.workers = max(1, int(workers))
+
+    def tile_shape(self, n_rows, n_cols, arrays=PAIRS_TILE_ARRAYS):
+        """memory_budget に収まるタイルの (行数, 列数)"""
+        float_arrays, int_arrays = arrays
+        bytes_per_cell = float_arrays * self.dtype.itemsize + int_arrays * 8
+        cells = max(1, self.memory_budget // bytes_per_cell)
+        tile_cols = max(1, min(n_cols, math.isqrt(cells)))
+        tile_rows = max(1, min(n_rows, cells // tile_cols))
+        return tile_rows, tile_cols
+
+    def _blocks(self, a, b, block_func, params, tile_rows, tile_cols):
+        """
+        行ブロック × params の各組について block_func の結果を順番に返す
+        （並列実行中も、待ちの結果は workers × 2 個まで）
+        """
+        n_rows = len(a[0])
+        blocks = (
+            (i0, tuple(x[i0:i0 + tile_rows] for x in a), param)
+            for i0 in range(0, n_rows, tile_rows)
+            for param in params
+        )
+        if self.workers == 1:
+            for i0, a_block, param in blocks:
+                yield i0, block_func(a_block, b, param, tile_cols)
+            return
+
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(b, tile_cols)) as pool:
+            pending = deque()
+            for i0, a_block, param in blocks:
+                pending.append((i0, pool.submit(_run_block, block_func, a_block, param)))
+                if len(pending) >= self.workers * 2:
+                    i, future = pending.popleft()
+                    yield i, future.result()
+            while pending:
+                i, future = pending.popleft()
+                yield i, future.result()
+
+    def pairs_within(self, a_lat, a_lon, b_lat, b_lon, max_km):
+        """
+        距離が max_km 以下の (a の位置, b の位置, 距離km) を、タイルごとに配列で順に返す
+        1回に返す組はタイル1つ分までなので、組が多くてもメモリは memory_budget 程度に収まる
+        """
+        a = _prepare(a_lat, a_lon, self.dtype)
+        b = _prepare(b_lat, b_lon, self.dtype)
+        tile_rows, tile_cols = self.tile_shape(len(a[0]), len(b[0]))
+        max_h = math.sin(min(max_km / EARTH_RADIUS_KM, math.pi) / 2) ** 2
+        params = [(max_h, j0) for j0 in range(0, len(b[0]), tile_cols)]
+        for i0, (rows, cols, dists) in self._blocks(a, b, _tile_pairs, params, tile_rows, tile_cols):
+            yield rows + i0, cols, dists
+
+    def nearest(self, a_lat, a_lon, b_lat, b_lon, k=1):
+        """
+        a の各点について、b の中で近い順に k 件を返す
+        戻り値: (indices[len(a), k], distances_km[len(a), k])
+        b が k 件より少ないときは、足りない分を 位置 -1・距離 NaN で埋める（b が空なら全部）
+        """
+        if k < 1:
+            raise ValueError(f"k must be at least 1 (got {k})")
+        a = _prepare(a_lat, a_lon, self.dtype)
+        b = _prepare(b_lat, b_lon, self.dtype)
+        indices = np.full((len(a[0]), k), -1, dtype=np.int64)
+        distances = np.full((len(a[0]), k), np.nan, dtype=self.dtype)
+        found = min(k, len(b[0]))
+        if found == 0:
+            return indices, distances
+        # 上位 found 件の候補を足しても上限に収まるよう、列数を found だけ減らして考える
+        tile_rows, tile_cols = self.tile_shape(len(a[0]), len(b[0]), NEAREST_TILE_ARRAYS)
+        tile_cols = max(1, tile_cols - found)
+        for i0, (idx, dist) in self._blocks(a, b, _block_nearest, [found], tile_rows, tile_cols):
+            indices[i0:i0 + len(idx), :found] = idx
+            distances[i0:i0 + len(idx), :found] = dist
+        return indices, distances
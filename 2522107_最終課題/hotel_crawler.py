@@ -0,0 +1,473 @@
+"""
+his-vacation.com の宿泊施設一覧を集めるクローラー
+
+test.ipynb の scrape()（県ごとにコピーされていたもの）を1つにまとめたもの。
+  - requests.Session を使い回す（同時接続数と同じ大きさのコネクションプール）
+  - トークンバケットで全体のリクエスト間隔を制限する（固定の sleep の代わり）
+  - 複数の県・複数のページを並列に取得する（結果は県ごとにページ順で返す）
+  - HTML の解析はプロセスプールで行い（scrape_pipeline.FetchParsePool）、lxml があればそれで解析する
+  - DB へは BatchWriter でまとめて書き込む（hotel_store.HotelStore, 同じ宿は id で1行にまとめる）
+  - 県ごとの進み具合をチェックポイント(JSON)に保存し、中断しても続きから再開できる（最後まで取得できたら消す）
+  - 取得ページ数・件数・バイト数・待ち時間などを stats() で返す
+  - 差分取得（--incremental）: 前回と内容の同じページが続いたら、その県の残りのページは取りに行かず、
+    内容の変わった宿だけを書き込む（HotelStore.is_unchanged / record_listings）
+base_url を差し替えればローカルのテスト用サーバーに対しても動かせる（bench_crawler.py）
+
+使い方: python hotel_crawler.py [--prefectures kanagawa shizuoka yamanashi] [--limit 100]
+                               [--rate 1.0] [--workers 4] [--retries 2] [--parse-workers N] [--batch-size 500]
+                               [--checkpoint crawl_state.json] [--fresh] [--incremental [--stop-after-unchanged 2]]
+"""
+import argparse
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from hotel_store import DB_NAME, HotelStore
+from scrape_pipeline import (DEFAULT_BATCH_SIZE, BatchWriter, FetchParsePool, TokenBucket, has_class, stripped_text,
+                             xpath_first)
+
+try:
+    import lxml.html
+except ImportError:  # lxml が無ければ BeautifulSoup だけで解析する
+    lxml = None
+
+# --- 設定値 ---
+BASE_URL = "https://www.his-vacation.com/area/"
+QUERY = "?kd=h_3&sr=pop"
+PREFECTURES = ("kanagawa", "shizuoka", "yamanashi")
+HDR = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
+LIMIT = 100               # 県ごとに集める件数
+
+DEFAULT_RATE = 1.0        # 全体で1秒あたりのリクエスト数の上限
+DEFAULT_BURST = 1         # 溜めておけるトークンの数（連続して送れるリクエスト数）
+DEFAULT_MAX_WORKERS = 4   # 同時接続数の上限
+DEFAULT_TIMEOUT = 10      # 1リクエストあたりのタイムアウト(秒)
+DEFAULT_RETRIES = 2       # 失敗時の再試行回数
+DEFAULT_BACKOFF = 1.0     # 再試行までの待ち時間(秒, 回数に応じて倍増)
+DEFAULT_STOP_AFTER_UNCHANGED = 2  # 差分取得で、内容の変わらないページが何ページ続いたら打ち切るか
+
+# hotels テーブルの1行（列の並びもテーブルと同じ）
+HotelRow = namedtuple("HotelRow", ["id", "name", "lat", "lon", "rating", "review_count", "price"])
+
+
+# --- 一覧ページの解析 ---
+
+def parse_listing_page(html):
+    """
+    一覧ページの HTML から HotelRow のリストを作る（読めない宿は飛ばす）
+    lxml があれば XPath で解析し（速い）、無いときや UTF-8 で読めないときは BeautifulSoup で解析する
+    """
+    if lxml is not None:
+        try:
+            text = html.decode("utf-8") if isinstance(html, bytes) else html
+        except UnicodeDecodeError:
+            pass
+        else:
+            return _parse_items(lxml.html.fromstring(text).xpath('//*[@id="result-list"]/li'), _parse_item_lxml)
+    soup = BeautifulSoup(html, "html.parser")
+    return _parse_items(soup.select("#result-list > li"), _parse_item)
+
+
+def _parse_items(items, parse_item):
+    rows = []
+    for it in items:
+        try:
+            row = parse_item(it)
+        except (ValueError, KeyError, TypeError):
+            continue
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def _parse_item_lxml(it):
+    """_parse_item の lxml 版（取り出す値は同じ）"""
+    id_tag = xpath_first(it, f".//{has_class('p', 'ut_btn_clip')}//a")
+    if id_tag is None:
+        return None
+    hid = int(id_tag.attrib["data-value"])
+
+    name_tag = xpath_first(it, f".//{has_class('h2', 'ut_name')}")
+    name = stripped_text(name_tag) if name_tag is not None else "不明"
+
+    rate_tag = xpath_first(it, f".//{has_class('span', 'ut_average')}")
+    rating = float(rate_tag.text_content()) if rate_tag is not None else 0.0
+
+    rev_tag = xpath_first(it, './/*[@itemprop="reviewCount"]')
+    review_count = int(re.sub(r"\D", "", rev_tag.text_content())) if rev_tag is not None else 0
+
+    price_tag = xpath_first(it, f".//{has_class('p', 'ut_person')}")
+    price = int(re.sub(r"\D", "", price_tag.text_content().split("：")[-1])) if price_tag is not None else 0
+
+    return HotelRow(hid, name, None, None, rating, review_count, price)
+
+
+def _parse_item(it):
+    # 1. ID (data-value)
+    id_tag = it.select_one("p.ut_btn_clip a")
+    if id_tag is None:
+        return None
+    hid = int(id_tag["data-value"])
+
+    # 2. 宿名
+    name_tag = it.select_one("h2.ut_name")
+    name = name_tag.get_text(strip=True) if name_tag else "不明"
+
+    # 3. 評価
+    rate_tag = it.select_one("span.ut_average")
+    rating = float(rate_tag.text) if rate_tag else 0.0
+
+    # 4. レビュー数
+    rev_tag = it.select_one('[itemprop="reviewCount"]')
+    review_count = int(re.sub(r"\D", "", rev_tag.text)) if rev_tag else 0
+
+    # 5. 大人1名価格（「：」で区切って後半を取得。大人1名の「1」を避ける）
+    price_tag = it.select_one("p.ut_person")
+    price = int(re.sub(r"\D", "", price_tag.get_text().split("：")[-1])) if price_tag else 0
+
+    return HotelRow(hid, name, None, None, rating, review_count, price)
+
+
+# --- 再開用のチェックポイント ---
+class CrawlCheckpoint:
+    """
+    県ごとの進み具合を JSON ファイルに保存する
+    {prefecture: {"next_page": 次に取るページ, "count": 取得済みの件数, "exhausted": 最後のページまで取ったか}}
+    書き込みは一時ファイルを置き換えるので、途中で止まっても壊れない
+    autosave=False なら update() では書き込まず、save() を呼んだときに書き込む
+    （DB にまとめて書き込むとき、commit した後にだけ進み具合を保存するため）
+    """
+
+    def __init__(self, path, autosave=True):
+        self.path = path
+        self.autosave = autosave
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._state = json.load(f)
+        except FileNotFoundError:
+            self._state = {}
+
+    def get(self, prefecture):
+        with self._lock:
+            progress = self._state.get(prefecture)
+            return dict(progress) if progress else None
+
+    def update(self, prefecture, **progress):
+        with self._lock:
+            self._state.setdefault(prefecture, {}).update(progress)
+            if self.autosave:
+                self._write()
+
+    def save(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        with self._lock:
+            self._state = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+# --- 取得の計測 ---
+class CrawlMetrics:
+    """取得したページ数・件数などを数える（スレッドから同時に足してよい）"""
+
+    FIELDS = ("requests", "pages", "listings", "unchanged_pages", "bytes", "retries", "errors", "wait_sec")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+        self.started_at = time.perf_counter()
+
+    def add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self._counts[key] += value
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+        elapsed = time.perf_counter() - self.started_at
+        stats["elapsed_sec"] = elapsed
+        stats["pages_per_sec"] = stats["pages"] / elapsed if elapsed else 0.0
+        stats["listings_per_sec"] = stats["listings"] / elapsed if elapsed else 0.0
+        return stats
+
+
+class _PrefectureState:
+    """1つの県の取得状況（iter_pages の中だけで使う）"""
+
+    def __init__(self, prefecture, next_page, count):
+        self.prefecture = prefecture
+        self.next_submit = next_page   # 次に取得を始めるページ
+        self.next_yield = next_page    # 次に返すページ（ページ順に返すため）
+        self.count = count
+        self.per_page = None           # 1ページあたりの件数（最初のページを見てから決まる）
+        self.done = False
+        self.finished = {}             # 取得が終わり、返す順番を待っているページ -> Future
+        self.unchanged_pages = 0       # 前回と内容の同じページが何ページ続いているか
+        self.error = None
+
+
+# --- 一覧ページの並列クローラー ---
+class HotelCrawler:
+    """
+    県ごとの一覧ページを並列に取得する
+    1ページあたりの件数が分かるまでは県ごとに1ページずつ、分かった後は limit に必要なページまでを
+    同時に max_workers 件まで取りに行く。リクエストの間隔は全体で TokenBucket により制限する
+    checkpoint（CrawlCheckpoint）を渡すと、前回の続きのページから始める
+    parse_workers: 解析に使うプロセス数（None ならCPUの数、0 なら取得したスレッドで解析）
+    page_unchanged: rows を受け取り、前回と同じ内容なら True を返す関数（差分取得）
+                    True のページが stop_after_unchanged ページ続いたら、その県はそこで打ち切る
+    """
+
+    def __init__(self, base_url=BASE_URL, query=QUERY, limit=LIMIT, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, checkpoint=None, headers=HDR, parse_workers=None,
+                 page_unchanged=None, stop_after_unchanged=DEFAULT_STOP_AFTER_UNCHANGED):
+        self.base_url = base_url
+        self.query = query
+        self.limit = limit
+        self.max_workers = max(1, int(max_workers))
+        self.parse_workers = parse_workers
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.checkpoint = checkpoint
+        self.page_unchanged = page_unchanged
+        self.stop_after_unchanged = max(1, int(stop_after_unchanged))
+        self.limiter = TokenBucket(rate, burst)
+        self.metrics = CrawlMetrics()
+
+        # コネクションを使い回すため、同時接続数と同じ大きさのプールを持つSessionを用意
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def page_url(self, prefecture, page):
+        return f"{self.base_url}{prefecture}/{f'{page}.html' if page > 1 else ''}{self.query}"
+
+    def fetch_html(self, prefecture, page):
+        """1ページの HTML(bytes) を取得する（404 なら None）"""
+        url = self.page_url(prefecture, page)
+        last_error = None
+        for attempt in range(self.retries + 1):
+            self.metrics.add(requests=1, wait_sec=self.limiter.acquire())
+            try:
+                res = self.session.get(url, timeout=self.timeout)
+                if res.status_code == 404:
+                    return None
+                res.raise_for_status()
+            except requests.RequestException as e:
+                last_error = e
+                if attempt < self.retries:
+                    self.metrics.add(retries=1)
+                    time.sleep(self.backoff * (2 ** attempt))
+                continue
+            self.metrics.add(pages=1, bytes=len(res.content))
+            return res.content
+        raise last_error
+
+    def _start_state(self, prefecture):
+        progress = self.checkpoint.get(prefecture) if self.checkpoint else None
+        if progress is None:
+            return _PrefectureState(prefecture, 1, 0)
+        state = _PrefectureState(prefecture, progress["next_page"], progress["count"])
+        state.done = progress.get("exhausted", False) or state.count >= self.limit
+        return state
+
+    def _can_submit(self, state):
+        if state.done:
+            return False
+        if state.per_page is None:
+            # 1ページの件数が分かるまでは1ページずつ
+            return state.next_submit == state.next_yield
+        window = min(-(-(self.limit - state.count) // state.per_page), self.max_workers)
+        if state.unchanged_pages:
+            # 打ち切るかどうかが決まるまでは、先のページを取りに行かない
+            window = min(window, self.stop_after_unchanged - state.unchanged_pages)
+        return state.next_submit < state.next_yield + window
+
+    def _fill(self, pool, states, futures):
+        """同時接続数に空きがある間、県を順番に回してページの取得を始める"""
+        while len(futures) < self.max_workers:
+            submitted = False
+            for state in states:
+                if len(futures) >= self.max_workers:
+                    break
+                if self._can_submit(state):
+                    future = pool.submit(state.prefecture, state.next_submit)
+                    futures[future] = (state, state.next_submit)
+                    state.next_submit += 1
+                    submitted = True
+            if not submitted:
+                break
+
+    def _save_progress(self, state, exhausted=False):
+        if self.checkpoint is not None:
+            self.checkpoint.update(state.prefecture, next_page=state.next_yield, count=state.count,
+                                   exhausted=exhausted)
+
+    def _ready_pages(self, state):
+        """ページ順に返せるところまで (page, rows) を返す"""
+        while not state.done and state.next_yield in state.finished:
+            page = state.next_yield
+            try:
+                rows = state.finished.pop(page).result() or []
+            except Exception as e:
+                # この県はここで打ち切る（チェックポイントは進めないので、次回はこのページから）
+                state.done, state.error = True, e
+                self.metrics.add(errors=1)
+                print(f"エラーが発生しました ({state.prefecture} page {page}): {e}")
+                break
+            if not rows:
+                state.done = True
+                self._save_progress(state, exhausted=True)
+                break
+            if state.per_page is None:
+                state.per_page = len(rows)
+            rows = rows[:self.limit - state.count]
+            if self.page_unchanged is not None:
+                if self.page_unchanged(rows):
+                    state.unchanged_pages += 1
+                    self.metrics.add(unchanged_pages=1)
+                else:
+                    state.unchanged_pages = 0
+            yield page, rows
+
+        if state.done:
+            state.finished.clear()
+
+    def iter_pages(self, prefectures=PREFECTURES):
+        """
+        (prefecture, page, rows) を、県ごとにページ順で返す
+        呼び出し側がその行を処理し終えて次を受け取った時点で、チェックポイントを進める
+        """
+        states = [self._start_state(p) for p in dict.fromkeys(prefectures)]
+        futures = {}  # Future -> (state, page)
+        # 取得はスレッド、解析は別プロセスで行い、終わったページから受け取る
+        pool = FetchParsePool(self.fetch_html, parse_listing_page, self.max_workers, self.parse_workers)
+        try:
+            while True:
+                self._fill(pool, states, futures)
+                if not futures:
+                    break
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    state, page = futures.pop(future)
+                    if not state.done:
+                        state.finished[page] = future
+
+                for state in states:
+                    for page, rows in self._ready_pages(state):
+                        self.metrics.add(listings=len(rows))
+                        yield state.prefecture, page, rows
+                        state.count += len(rows)
+                        state.next_yield = page + 1
+                        if state.count >= self.limit:
+                            state.done = True
+                        elif state.unchanged_pages >= self.stop_after_unchanged:
+                            state.done = True
+                            print(f"{state.prefecture}: {state.unchanged_pages}ページ続けて変更が無いため、ここで打ち切ります")
+                        self._save_progress(state)
+        finally:
+            pool.shutdown()
+
+    def crawl(self, prefectures=PREFECTURES):
+        """すべての県を取得して {prefecture: [HotelRow, ...]} を返す"""
+        results = {p: [] for p in prefectures}
+        for prefecture, _, rows in self.iter_pages(prefectures):
+            results[prefecture].extend(rows)
+        return results
+
+    def stats(self):
+        return self.metrics.stats()
+
+    def close(self):
+        self.session.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="his-vacation.com hotel crawler")
+    parser.add_argument("--prefectures", nargs="+", default=list(PREFECTURES))
+    parser.add_argument("--limit", type=int, default=LIMIT, help="県ごとの件数")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="1秒あたりのリクエスト数の上限")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST)
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="1ページあたりの再試行回数")
+    parser.add_argument("--parse-workers", type=int, default=None, help="解析のプロセス数（0 で取得スレッドで解析）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="まとめて書き込む行数")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--checkpoint", default="crawl_state.json")
+    parser.add_argument("--fresh", action="store_true", help="チェックポイントを消して最初から取得する")
+    parser.add_argument("--incremental", action="store_true",
+                        help="差分取得（最初のページから取り直し、前回と同じ内容のページが続いたら打ち切る）")
+    parser.add_argument("--stop-after-unchanged", type=int, default=DEFAULT_STOP_AFTER_UNCHANGED)
+    args = parser.parse_args(argv)
+
+    # 進み具合は DB に commit した後にだけ保存する（再開したときに行が抜けないように）
+    checkpoint = CrawlCheckpoint(args.checkpoint, autosave=False)
+    if args.fresh or args.incremental:
+        checkpoint.reset()
+    # 同じ宿は id で1行にまとめ、内容の変わった宿だけを書き込む（再開や取り直しで重複しない）
+    store = HotelStore(args.db)
+    seen_at = datetime.now().isoformat(timespec="seconds")
+    writer = BatchWriter(functools.partial(store.record_listings, seen_at=seen_at), batch_size=args.batch_size,
+                         on_flush=checkpoint.save)
+    crawler = HotelCrawler(base_url=args.base_url, limit=args.limit, rate=args.rate, burst=args.burst,
+                           max_workers=args.workers, retries=args.retries, checkpoint=checkpoint,
+                           parse_workers=args.parse_workers, page_unchanged=store.is_unchanged if args.incremental else None,
+                           stop_after_unchanged=args.stop_after_unchanged)
+    totals = {}
+    try:
+        for prefecture, page, rows in crawler.iter_pages(args.prefectures):
+            writer.add(rows)
+            totals[prefecture] = totals.get(prefecture, 0) + len(rows)
+            print(f"{prefecture} Page {page}: {len(rows)}件取得 (累計 {totals[prefecture]}件)")
+        writer.flush()
+        # 最後まで取得できたら進み具合を消して、次の実行は最初から取り直す
+        # （エラーで打ち切った県があるときや、途中で止めたときだけ残して再開に使う）
+        if crawler.stats()["errors"] == 0:
+            checkpoint.reset()
+        inserted, changed = store.query(
+            "SELECT COUNT(*) FILTER (WHERE first_seen_at = ?), COUNT(*) FROM hotel_listings WHERE last_changed_at = ?",
+            (seen_at, seen_at),
+        )[0]
+    finally:
+        store.close()
+        crawler.close()
+
+    s = crawler.stats()
+    print(f"全工程完了。合計 {sum(totals.values())}件取得しました。")
+    print(f"{s['pages']} pages, {s['listings']} listings, {s['bytes'] / 1024:.0f}KB in {s['elapsed_sec']:.1f}s "
+          f"({s['pages_per_sec']:.2f} pages/s, rate limit wait {s['wait_sec']:.1f}s, "
+          f"retries {s['retries']}, errors {s['errors']})")
+    w = writer.stats()
+    print(f"{w['rows_written']} rows in {w['batches']} batches ({w['write_sec']:.2f}s): "
+          f"{inserted} new, {changed - inserted} changed, {w['rows_written'] - changed} unchanged "
+          f"({s['unchanged_pages']} unchanged pages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+宿泊施設DB（accommodations.db の hotels テーブル）の管理
+
+  - サイトの宿ID（id）を自然キーにして一意インデックスを張る（同じ宿を何度取り込んでも1行）
+  - 取り込みは INSERT ... ON CONFLICT(id) DO UPDATE をまとめて実行する（1トランザクション）
+  - 座標のCSV（スプレッドシートで座標をつけたもの）は一時テーブルに入れてから、
+    1回の UPDATE で宿名の一致する行に反映する（test.ipynb の safe_import_coords の置き換え）
+  - 宿ごとの内容のハッシュと最後に見かけた日時を hotel_listings に残し、取り直しでは変わった宿だけを書き込む
+列の並びは test.ipynb で作っていたテーブルと同じなので、analysis.ipynb の SELECT * もそのまま使える
+
+使い方: python hotel_store.py [--db accommodations.db] [--import-coords hotel_coords.csv] [--export-names hotel_names.csv]
+"""
+import argparse
+import csv
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from scrape_pipeline import content_hash
+
+DB_NAME = "accommodations.db"
+
+# 接続時に設定するPRAGMA（WAL + synchronous=NORMAL でコミットのたびに fsync しない）
+# lecture-6/weather_db.py より少ないのは、hotels は数千行程度でキャッシュや mmap を広げても速くならないため
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+]
+
+# 1つのSQL文に渡すプレースホルダ数の上限（古いSQLiteの既定値に合わせる）
+SQLITE_MAX_PARAMS = 999
+
+# 取得し直した宿は名前・評価・レビュー数・価格を更新し、座標は新しい値が無ければ今の値を残す
+UPSERT_HOTEL_SQL = '''
+    INSERT INTO hotels (id, name, lat, lon, rating, review_count, price)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        lat = COALESCE(excluded.lat, hotels.lat),
+        lon = COALESCE(excluded.lon, hotels.lon),
+        rating = excluded.rating,
+        review_count = excluded.review_count,
+        price = excluded.price
+'''
+
+# 宿ごとの取得状況（content_hash: 一覧ページの内容のハッシュ, last_changed_at: 内容が最後に変わった日時）
+HOTEL_LISTINGS_DDL = '''
+    CREATE TABLE IF NOT EXISTS hotel_listings (
+        id INTEGER PRIMARY KEY,
+        content_hash TEXT NOT NULL,
+        first_seen_at TEXT NOT NULL,
+        last_seen_at TEXT NOT NULL,
+        last_changed_at TEXT NOT NULL
+    ) WITHOUT ROWID
+'''
+
+# record_listings の結果（新しい宿 / 内容が変わった宿 / 変わっていない宿 の数）
+ListingChanges = namedtuple("ListingChanges", ["inserted", "updated", "unchanged"])
+
+
+def listing_hash(row):
+    """一覧ページから取れる内容（宿名・評価・レビュー数・価格）のハッシュ。座標は含めない"""
+    _, name, _, _, rating, review_count, price = row
+    return content_hash((name, rating, review_count, price))
+
+
+class HotelStore:
+    """
+    hotels テーブルの読み書き
+    接続まわり（get_connection / transaction / query / close）は lecture-6/weather_db.py の WeatherDatabase に合わせているが、
+    最終課題のフォルダは単独で提出・実行するので import はせず、次の点で意図して変えている
+      - PRAGMA は WAL / synchronous / temp_store / busy_timeout だけ（cache_size と mmap_size は使わない）
+      - row_factory は設定せず、query() はタプルを返す（pandas.read_sql や analysis.ipynb にそのまま渡す）
+    """
+
+    def __init__(self, db_name=DB_NAME):
+        self.db_name = db_name
+        # 接続は1本を使い回し、スレッド間の同時アクセスはロックで直列化する
+        self._conn = None
+        self._lock = threading.RLock()
+        self.init_db()
+
+    def get_connection(self):
+        """長寿命の接続を返す（初回呼び出し時に作成）"""
+        with self._lock:
+            if self._conn is None:
+                conn = sqlite3.connect(self.db_name, check_same_thread=False)
+                for pragma in SQLITE_PRAGMAS:
+                    conn.execute(pragma)
+                self._conn = conn
+            return self._conn
+
+    @contextmanager
+    def transaction(self):
+        """1つのトランザクションとしてまとめて実行する（成功時commit / 失敗時rollback）"""
+        with self._lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def query(self, sql, params=()):
+        """SELECT文を実行して全行を返す"""
+        with self._lock:
+            return self.get_connection().execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def init_db(self):
+        """テーブルとインデックスの作成（主キーの無い古いテーブルは重複を除いてから一意インデックスを張る）"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS hotels (
+                    id INTEGER NOT NULL,
+                    name TEXT,
+                    lat REAL,
+                    lon REAL,
+                    rating REAL,
+                    review_count INTEGER,
+                    price INTEGER
+                )
+            ''')
+            indexes = {r[1] for r in cursor.execute("PRAGMA index_list(hotels)")}
+            if "idx_hotels_id" not in indexes:
+                self._dedupe(cursor)
+                cursor.execute("CREATE UNIQUE INDEX idx_hotels_id ON hotels (id)")
+            # 座標CSVとの突き合わせ用
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_hotels_name ON hotels (name)")
+            cursor.execute(HOTEL_LISTINGS_DDL)
+
+    def _dedupe(self, cursor):
+        """
+        同じ id の行を1行にまとめる（後から入れた行を残し、座標はどれかの行にあればそれを使う）
+        id の無い行は宿として扱えないので消す
+        """
+        cursor.execute("DELETE FROM hotels WHERE id IS NULL")
+        # 座標のある行のうち最後のもの（MAX(rowid) の行の lat, lon）を、座標の無い行に写す
+        cursor.execute('''
+            UPDATE hotels SET lat = c.lat, lon = c.lon
+            FROM (
+                SELECT id, lat, lon, MAX(rowid) FROM hotels
+                WHERE lat IS NOT NULL AND lon IS NOT NULL GROUP BY id
+            ) AS c
+            WHERE hotels.id = c.id AND hotels.lat IS NULL
+        ''')
+        cursor.execute("DELETE FROM hotels WHERE rowid NOT IN (SELECT MAX(rowid) FROM hotels GROUP BY id)")
+
+    def upsert_hotels(self, rows):
+        """
+        宿の一括保存（executemany で1トランザクション・1コミット）
+        rows: (id, name, lat, lon, rating, review_count, price) のリスト（HotelRow など）
+        戻り値: (新しく入った件数, 更新した件数)
+        """
+        rows = [tuple(row) for row in rows]
+        with self.transaction() as cursor:
+            # UPSERT の rowcount は挿入と更新の区別がつかないので、新しい宿はバッチ分だけ一意インデックスで引いて数える
+            ids = list(dict.fromkeys(row[0] for row in rows))
+            inserted = len(ids) - len(self._existing_ids(cursor, ids))
+            cursor.executemany(UPSERT_HOTEL_SQL, rows)
+        return inserted, len(rows) - inserted
+
+    def _existing_ids(self, cursor, ids):
+        """ids のうち hotels に行のある id の集合"""
+        existing = set()
+        for i in range(0, len(ids), SQLITE_MAX_PARAMS):
+            chunk = ids[i:i + SQLITE_MAX_PARAMS]
+            cursor.execute(f"SELECT id FROM hotels WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            existing.update(r[0] for r in cursor.fetchall())
+        return existing
+
+    def _known_hashes(self, cursor, ids):
+        hashes = {}
+        ids = list(dict.fromkeys(ids))
+        for i in range(0, len(ids), SQLITE_MAX_PARAMS):
+            chunk = ids[i:i + SQLITE_MAX_PARAMS]
+            # hotels の行が消えている宿（テーブルを作り直したときなど）は、記録が残っていても書き込み直す
+            cursor.execute(f'''
+                SELECT l.id, l.content_hash FROM hotel_listings AS l JOIN hotels AS h ON h.id = l.id
+                WHERE l.id IN ({','.join('?' * len(chunk))})
+            ''', chunk)
+            hashes.update(cursor.fetchall())
+        return hashes
+
+    def known_hashes(self, ids):
+        """{id: 前回保存したときの内容のハッシュ}（まだ記録の無い宿と、hotels に行の無い宿は含まない）"""
+        with self.transaction() as cursor:
+            return self._known_hashes(cursor, ids)
+
+    def is_unchanged(self, rows):
+        """一覧ページの宿がすべて、前回保存したときと同じ内容なら True"""
+        rows = list(rows)
+        if not rows:
+            return False
+        known = self.known_hashes(row[0] for row in rows)
+        return all(known.get(row[0]) == listing_hash(row) for row in rows)
+
+    def record_listings(self, rows, seen_at=None):
+        """
+        一覧ページから取った宿を保存する（1トランザクション）
+        内容が前回から変わった宿（と新しい宿）だけを hotels に書き込み、
+        変わっていない宿は hotel_listings の last_seen_at だけを進める
+        seen_at: 取得日時（省略時は現在時刻）
+        戻り値: ListingChanges
+        """
+        now = seen_at or datetime.now().isoformat(timespec="seconds")
+        rows = [tuple(row) for row in rows]
+        with self.transaction() as cursor:
+            known = self._known_hashes(cursor, (row[0] for row in rows))
+            changed, changed_state, unchanged = [], [], []
+            inserted = 0
+            for row in rows:
+                digest = listing_hash(row)
+                previous = known.get(row[0])
+                if previous == digest:
+                    unchanged.append((now, row[0]))
+                    continue
+                inserted += previous is None
+                known[row[0]] = digest  # 同じ宿が2回あっても1回だけ書き込む
+                changed.append(row)
+                changed_state.append((row[0], digest, now, now, now))
+
+            cursor.executemany(UPSERT_HOTEL_SQL, changed)
+            cursor.executemany('''
+                INSERT INTO hotel_listings (id, content_hash, first_seen_at, last_seen_at, last_changed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    last_seen_at = excluded.last_seen_at,
+                    last_changed_at = excluded.last_changed_at
+            ''', changed_state)
+            cursor.executemany("UPDATE hotel_listings SET last_seen_at = ? WHERE id = ?", unchanged)
+        return ListingChanges(inserted, len(changed) - inserted, len(unchanged))
+
+    def merge_coordinates(self, records):
+        """
+        宿名ごとの座標をまとめて反映する
+        records: (name, lat, lon) のリスト（同じ宿名が複数あれば後のものを使い、座標の無いものは無視する）
+        戻り値: 座標を更新した宿の数
+        """
+        records = [(name, float(lat), float(lon)) for name, lat, lon in records
+                   if name and not (pd.isna(lat) or pd.isna(lon))]
+        with self.transaction() as cursor:
+            cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS coords_import (
+                    name TEXT PRIMARY KEY,
+                    lat REAL,
+                    lon REAL
+                )
+            ''')
+            cursor.execute("DELETE FROM coords_import")
+            cursor.executemany("INSERT OR REPLACE INTO coords_import (name, lat, lon) VALUES (?, ?, ?)", records)
+            cursor.execute('''
+                UPDATE hotels SET lat = c.lat, lon = c.lon
+                FROM coords_import c
+                WHERE hotels.name = c.name
+            ''')
+            updated = cursor.rowcount
+            cursor.execute("DELETE FROM coords_import")
+        return updated
+
+    def import_coords_csv(self, csv_name):
+        """
+        スプレッドシートから書き出した座標CSVを取り込む
+        ヘッダー名に依存せず「列番号」で読み込む（A列: 宿名, G列: lat, H列: lon）
+        数値として読めない座標は空として扱う
+        戻り値: (CSVの行数, 座標を更新した宿の数)
+        """
+        df = pd.read_csv(csv_name, usecols=[0, 6, 7], names=["name", "lat", "lon"], header=0)
+        df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
+        df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
+        df["name"] = df["name"].where(df["name"].notna(), None)
+        return len(df), self.merge_coordinates(df.itertuples(index=False, name=None))
+
+    def export_names_csv(self, output_file):
+        """座標をつけるための宿名のCSVを書き出す。書き出した件数を返す"""
+        rows = self.query("SELECT name FROM hotels ORDER BY rowid")
+        with open(output_file, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(["宿名"])  # ヘッダー
+            writer.writerows(rows)
+        return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hotels table maintenance")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--import-coords", metavar="CSV", help="座標をつけたCSVを取り込む")
+    parser.add_argument("--export-names", metavar="CSV", help="宿名のCSVを書き出す")
+    args = parser.parse_args()
+
+    store = HotelStore(args.db)
+    try:
+        if args.export_names:
+            count = store.export_names_csv(args.export_names)
+            print(f"成功: {count}件の宿名を '{args.export_names}' に保存しました。")
+        if args.import_coords:
+            total, updated = store.import_coords_csv(args.import_coords)
+            print(f"完了！ {total}件の照合を行い、{updated}件の宿の座標を更新しました。")
+        located, hotels = store.query("SELECT COUNT(lat), COUNT(*) FROM hotels")[0]
+        print(f"hotels: {hotels}件（座標あり {located}件）")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+宿泊施設の周辺にある観光地を数えるための空間インデックス
+
+観光地を緯度経度の格子（1マスが検索半径以上の大きさ）に振り分けておき、
+各宿泊施設について周囲 3×3 マスの観光地だけと距離を計算する。
+ホテル数 × 観光地数 の総当たりをせずに、全ホテル分をまとめて（ループなしで）数えられる。
+
+使い方:
+    index = ProximityIndex(df_attractions['lat'], df_attractions['lon'], radius_km=1.0,
+                           categories=df_attractions['category'])
+    total = index.count_within(df_hotels['lat'], df_hotels['lon'])
+    counts, names = index.count_by_category(df_hotels['lat'], df_hotels['lon'])
+
+    # analysis.ipynb の df_analysis をまとめて作る
+    df_analysis = nearby_category_counts(df_hotels, df_attractions, radius_km=1.0)
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371  # 地球の半径(km)
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180  # 緯度1度あたりの距離(km)
+DEFAULT_CHUNK_SIZE = 8192  # 一度に処理する宿泊施設の数（候補の組の配列が大きくなりすぎないように）
+
+# 周囲 3×3 マス
+NEIGHBOR_OFFSETS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+
+# 分析で数えるカテゴリと df_analysis の列名
+CATEGORY_COLUMNS = {
+    "museum": "museum_count",
+    "place_of_worship": "shrine_temple_count",
+    "viewpoint": "viewpoint_count",
+    "theme_park": "theme_park_count",
+}
+# df_analysis にそのまま残す宿泊施設の列
+HOTEL_COLUMNS = ["id", "name", "rating", "review_count", "price"]
+
+# 検索点ごとの近傍（CSR形式の疎行列）
+# 検索点 i の近傍は indices[indptr[i]:indptr[i + 1]]（地点の元の位置）と、同じ範囲の distances(km)
+Neighbors = namedtuple("Neighbors", ["indptr", "indices", "distances"])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """2点間の距離(km)。配列同士でもまとめて計算できる"""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(np.subtract(lat2, lat1))
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class ProximityIndex:
+    """
+    地点（観光地など）の格子インデックス
+    radius_km 以下の半径であれば、何度でも検索できる
+    """
+
+    def __init__(self, lat, lon, radius_km=1.0, categories=None):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        if radius_km <= 0:
+            raise ValueError("radius_km must be positive")
+        self.radius_km = radius_km
+
+        # 座標の無い地点は除く（ids は元の並びでの位置）
+        ids = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        lat, lon = lat[ids], lon[ids]
+
+        # 1マスの大きさ（度）。経度方向は高緯度ほど1度が短くなるので、最も北（南）の地点に合わせて広げる
+        self.cell_lat = radius_km / KM_PER_DEGREE
+        max_abs_lat = min(float(np.abs(lat).max()) + self.cell_lat, 89.0) if len(lat) else 0.0
+        self.cell_lon = self.cell_lat / np.cos(np.radians(max_abs_lat))
+        self.lat0 = float(lat.min()) if len(lat) else 0.0
+        self.lon0 = float(lon.min()) if len(lon) else 0.0
+
+        rows, cols = self._cells(lat, lon)
+        self.n_rows = int(rows.max()) + 1 if len(rows) else 0
+        self.n_cols = int(cols.max()) + 1 if len(cols) else 0
+
+        # マスの番号順に並べ替えておき、マスごとの範囲を二分探索で引けるようにする
+        keys = rows * self.n_cols + cols
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.ids = ids[order]
+        self.lat = lat[order]
+        self.lon = lon[order]
+
+        # カテゴリは番号（category_names の位置）にして持つ
+        if categories is None:
+            self.category_names = np.array([], dtype=str)
+            self.category_codes = None
+        else:
+            labels = np.asarray(categories, dtype=object)[ids].astype(str)
+            self.category_names, codes = np.unique(labels, return_inverse=True)
+            self.category_codes = codes[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cells(self, lat, lon):
+        rows = np.floor((lat - self.lat0) / self.cell_lat).astype(np.int64)
+        cols = np.floor((lon - self.lon0) / self.cell_lon).astype(np.int64)
+        return rows, cols
+
+    def _candidates(self, lat, lon):
+        """
+        周囲 3×3 マスに入っている地点との組をすべて返す
+        戻り値: (検索点の位置, インデックス内の地点の位置)
+        """
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        rows, cols = self._cells(np.where(valid, lat, self.lat0), np.where(valid, lon, self.lon0))
+        query_parts, point_parts = [], []
+        for dy, dx in NEIGHBOR_OFFSETS:
+            r, c = rows + dy, cols + dx
+            inside = valid & (r >= 0) & (r < self.n_rows) & (c >= 0) & (c < self.n_cols)
+            keys = r * self.n_cols + c
+            starts = np.searchsorted(self.keys, keys, side="left")
+            ends = np.searchsorted(self.keys, keys, side="right")
+            lengths = np.where(inside, ends - starts, 0)
+            total = int(lengths.sum())
+            if total == 0:
+                continue
+            # 検索点ごとの [start, end) を1本の配列に展開する
+            query = np.repeat(np.arange(len(lat)), lengths)
+            offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            query_parts.append(query)
+            point_parts.append(np.repeat(starts, lengths) + offsets)
+        if not query_parts:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty
+        return np.concatenate(query_parts), np.concatenate(point_parts)
+
+    def _check_radius(self, radius_km):
+        radius_km = self.radius_km if radius_km is None else radius_km
+        if radius_km > self.radius_km:
+            raise ValueError(f"radius_km ({radius_km}) is larger than the index radius ({self.radius_km})")
+        return radius_km
+
+    def _iter_near(self, lat, lon, radius_km, chunk_size):
+        """
+        検索点 chunk_size 件ごとに、半径内の組を返す
+        戻り値: (先頭の検索点の位置, チャンク内での検索点の位置, インデックス内の地点の位置, 距離km, チャンクの件数)
+        """
+        radius_km = self._check_radius(radius_km)
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        for start in range(0, len(lat), chunk_size):
+            q_lat, q_lon = lat[start:start + chunk_size], lon[start:start + chunk_size]
+            query, point = self._candidates(q_lat, q_lon)
+            dist = haversine_km(q_lat[query], q_lon[query], self.lat[point], self.lon[point])
+            near = dist <= radius_km
+            yield start, query[near], point[near], dist[near], len(q_lat)
+
+    def iter_pairs(self, lat, lon, radius_km=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        半径内にある (検索点の位置, 地点の元の位置, 距離km) を、検索点 chunk_size 件ごとに配列で返す
+        """
+        for start, query, point, dist, _ in self._iter_near(lat, lon, radius_km, chunk_size):
+            yield query + start, self.ids[point], dist
+
+    def count_within(self, lat, lon, radius_km=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """検索点ごとに、半径内にある地点の数を返す"""
+        counts = np.zeros(len(lat), dtype=np.int64)
+        for start, query, _, _, size in self._iter_near(lat, lon, radius_km, chunk_size):
+            counts[start:start + size] = np.bincount(query, minlength=size)
+        return counts
+
+    def count_by_category(self, lat, lon, radius_km=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        検索点 × カテゴリ の地点数の行列を返す
+        戻り値: (counts[検索点, カテゴリ], category_names)
+        """
+        if self.category_codes is None:
+            raise ValueError("the index was built without categories")
+        n_categories = len(self.category_names)
+        counts = np.zeros((len(lat), n_categories), dtype=np.int64)
+        for start, query, point, _, size in self._iter_near(lat, lon, radius_km, chunk_size):
+            flat = np.bincount(query * n_categories + self.category_codes[point], minlength=size * n_categories)
+            counts[start:start + size] = flat.reshape(size, n_categories)
+        return counts, self.category_names
+
+    def neighbors(self, lat, lon, radius_km=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """全検索点の近傍をまとめて Neighbors（CSR形式）で返す"""
+        n = len(lat)
+        rows, indices, distances = [], [], []
+        for query, point, dist in self.iter_pairs(lat, lon, radius_km, chunk_size):
+            order = np.argsort(query, kind="stable")
+            rows.append(query[order])
+            indices.append(point[order])
+            distances.append(dist[order])
+        rows = np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return Neighbors(
+            indptr=indptr,
+            indices=np.concatenate(indices) if indices else np.array([], dtype=np.int64),
+            distances=np.concatenate(distances) if distances else np.array([], dtype=np.float64),
+        )
+
+
+def count_matrix(neighbors, codes, n_codes):
+    """
+    近傍の地点を codes（地点ごとの番号, 0〜n_codes-1, 数えない地点は負の値）で数えた
+    検索点 × 番号 の行列を1回の bincount で作る
+    """
+    n = len(neighbors.indptr) - 1
+    rows = np.repeat(np.arange(n), np.diff(neighbors.indptr))
+    point_codes = np.asarray(codes)[neighbors.indices]
+    keep = point_codes >= 0
+    flat = np.bincount(rows[keep] * n_codes + point_codes[keep], minlength=n * n_codes)
+    return flat.reshape(n, n_codes)
+
+
+def nearby_category_counts(df_hotels, df_attractions, radius_km=1.0, category_columns=CATEGORY_COLUMNS):
+    """
+    宿泊施設ごとに、半径内の観光地の総数とカテゴリ別の数を数えた DataFrame を返す
+    （analysis.ipynb の df_analysis と同じ列: HOTEL_COLUMNS, total_count, *_count）
+    """
+    index = ProximityIndex(df_attractions["lat"], df_attractions["lon"], radius_km=radius_km)
+    found = index.neighbors(df_hotels["lat"], df_hotels["lon"])
+
+    codes = pd.Categorical(df_attractions["category"], categories=list(category_columns)).codes
+    counts = count_matrix(found, codes, len(category_columns))
+
+    df = df_hotels[[c for c in HOTEL_COLUMNS if c in df_hotels.columns]].reset_index(drop=True)
+    df["total_count"] = np.diff(found.indptr)
+    df[list(category_columns.values())] = counts
+    return df
@@ -0,0 +1,190 @@
+"""
+スクレイピング用のパイプライン部品
+
+取得（ネットワーク待ち）と HTML の解析（CPUを使う）と DB への書き込みを分けて、
+  取得: スレッドプール（TokenBucket で間隔を制限）→ 解析: プロセスプール → 書き込み: BatchWriter でまとめて
+の順に流す。解析を別プロセスに出すので、解析が取得のスレッドや GIL を塞がず、コア数に応じて並列になる。
+lecture-1/github_scraper.py もこのモジュールを import して使う（lecture-1 にコピーは置かない）。
+
+使い方:
+    with FetchParsePool(fetch_html, parse_listing_page, fetch_workers=4, parse_workers=4) as pool:
+        future = pool.submit(url)       # parse_listing_page(fetch_html(url)) の結果になる Future
+    writer = BatchWriter(store.upsert_hotels, batch_size=500)
+    writer.add(rows)
+    writer.flush()
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+DEFAULT_BATCH_SIZE = 500   # 1回の executemany + commit で書き込む行数
+
+
+def default_parse_workers():
+    """解析に使うプロセス数（CPUが1つなら別プロセスにしても速くならないので 0 = 取得スレッドで解析）"""
+    cpus = os.cpu_count() or 1
+    return cpus if cpus > 1 else 0
+
+
+# --- リクエスト間隔の制限 ---
+class TokenBucket:
+    """
+    rate 個/秒 でトークンが溜まり（最大 burst 個）、1リクエストごとに1個使う
+    複数のスレッドから呼んでも、全体のリクエスト数が rate を超えないようにする
+    rate が None なら制限しない
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取る（無ければ溜まるまで待つ）。待った秒数を返す"""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+# --- lxml で解析するときの補助 ---
+
+def has_class(tag, name):
+    """CSS の tag.name と同じ意味の XPath"""
+    return f'{tag}[contains(concat(" ", normalize-space(@class), " "), " {name} ")]'
+
+
+def xpath_first(el, xpath):
+    found = el.xpath(xpath)
+    return found[0] if found else None
+
+
+def stripped_text(el):
+    """BeautifulSoup の get_text(strip=True) と同じ（文字列ごとに前後の空白を除いてつなげる）"""
+    return "".join(s.strip() for s in el.itertext())
+
+
+# --- 取得 → 解析 ---
+class FetchParsePool:
+    """
+    fetch(*args) をスレッドで実行し、その結果を parse(結果) としてプロセスプールで解析する
+    submit() は解析まで終わった結果を持つ Future を返す（fetch が None を返したら解析せず None）
+    shutdown() で取り消された取得・解析の Future は CancelledError で終わる
+    parse はプロセスに渡すので、モジュールの関数（pickle できるもの）にする
+    parse_workers が 0 なら、取得したスレッドでそのまま解析する
+    """
+
+    def __init__(self, fetch, parse, fetch_workers=4, parse_workers=None):
+        self.fetch = fetch
+        self.parse = parse
+        self.parse_workers = default_parse_workers() if parse_workers is None else max(0, int(parse_workers))
+        self._fetch_pool = ThreadPoolExecutor(max(1, int(fetch_workers)), thread_name_prefix="scrape-fetch")
+        self._parse_pool = ProcessPoolExecutor(self.parse_workers) if self.parse_workers else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def _fetch_inline(self, args):
+        content = self.fetch(*args)
+        return None if content is None else self.parse(content)
+
+    def submit(self, *args):
+        if self._parse_pool is None:
+            return self._fetch_pool.submit(self._fetch_inline, args)
+
+        result = Future()
+
+        def on_parsed(parse_future):
+            if parse_future.cancelled():
+                # result は実行中にしてあるので cancel() は効かない。待っている側には例外で知らせる
+                result.set_exception(CancelledError())
+            elif parse_future.exception() is not None:
+                result.set_exception(parse_future.exception())
+            else:
+                result.set_result(parse_future.result())
+
+        def on_fetched(fetch_future):
+            if fetch_future.cancelled():
+                result.set_exception(CancelledError())
+            elif fetch_future.exception() is not None:
+                result.set_exception(fetch_future.exception())
+            elif fetch_future.result() is None:
+                result.set_result(None)
+            else:
+                try:
+                    self._parse_pool.submit(self.parse, fetch_future.result()).add_done_callback(on_parsed)
+                except RuntimeError as e:  # shutdown() の後
+                    result.set_exception(e)
+
+        result.set_running_or_notify_cancel()
+        self._fetch_pool.submit(self.fetch, *args).add_done_callback(on_fetched)
+        return result
+
+    def shutdown(self, wait=True):
+        """待ちの取得は取り消し、実行中のものは（wait=True なら）終わるまで待つ"""
+        self._fetch_pool.shutdown(wait=wait, cancel_futures=True)
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# --- 変更の検出 ---
+
+def content_hash(values):
+    """行の内容（値の並び）のハッシュ。前回取得したときから変わったかどうかの判定に使う"""
+    return hashlib.sha1(json.dumps(list(values), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# --- まとめて書き込み ---
+
+class BatchWriter:
+    """
+    行を batch_size 件ずつまとめて write(行のリスト) に渡す（write は1回のトランザクションで書き込む関数）
+    on_flush を渡すと、書き込みの後に呼ぶ（チェックポイントの保存など）
+    """
+
+    def __init__(self, write, batch_size=DEFAULT_BATCH_SIZE, on_flush=None):
+        self.write = write
+        self.batch_size = max(1, int(batch_size))
+        self.on_flush = on_flush
+        self._rows = []
+        self.rows_written = 0
+        self.batches = 0
+        self.write_sec = 0.0
+
+    def add(self, rows):
+        self._rows.extend(rows)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            start = time.perf_counter()
+            self.write(self._rows)
+            self.write_sec += time.perf_counter() - start
+            self.rows_written += len(self._rows)
+            self.batches += 1
+            self._rows = []
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def stats(self):
+        return {"rows_written": self.rows_written, "batches": self.batches, "write_sec": self.write_sec,
+                "pending": len(self._rows)}
@@ -0,0 +1,142 @@
+import pytest
+
+import hotel_crawler
+from bench_crawler import make_listings
+from hotel_crawler import HotelRow
+from hotel_store import HotelStore, ListingChanges, listing_hash
+from scrape_pipeline import content_hash
+
+PER_PAGE = 10
+LIMIT = 40         # 4ページちょうど（limit と同じにして、先読みで余分なページを取らないようにする）
+
+ROWS = [
+    HotelRow(101, "熱海ホテル", None, None, 4.2, 120, 15000),
+    HotelRow(102, "箱根旅館", None, None, 3.8, 45, 22000),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HotelStore(str(tmp_path / "accommodations.db"))
+    yield store
+    store.close()
+
+
+def listing_state(store, hotel_id):
+    return store.query(
+        "SELECT first_seen_at, last_seen_at, last_changed_at FROM hotel_listings WHERE id = ?", (hotel_id,)
+    )[0]
+
+
+# --- ハッシュ ---
+
+def test_content_hash_depends_only_on_values():
+    assert content_hash(("熱海ホテル", 4.2, 120)) == content_hash(["熱海ホテル", 4.2, 120])
+    assert content_hash(("熱海ホテル", 4.2, 120)) != content_hash(("熱海ホテル", 4.2, 121))
+
+
+def test_listing_hash_ignores_coordinates():
+    assert listing_hash(ROWS[0]) == listing_hash(ROWS[0]._replace(lat=35.1, lon=139.07))
+    assert listing_hash(ROWS[0]) != listing_hash(ROWS[0]._replace(price=14000))
+
+
+# --- HotelStore.record_listings / is_unchanged ---
+
+def test_unchanged_listing_is_skipped(store):
+    assert store.record_listings(ROWS, seen_at="2026-10-01T00:00:00") == ListingChanges(2, 0, 0)
+    # 変わっていない宿は hotels に書き込まないので、手で入れた座標や値はそのまま残る
+    store.merge_coordinates([("熱海ホテル", 35.1, 139.07)])
+
+    assert store.is_unchanged(ROWS)
+    assert store.record_listings(ROWS, seen_at="2026-10-02T00:00:00") == ListingChanges(0, 0, 2)
+    assert store.query("SELECT lat, lon FROM hotels WHERE id = 101") == [(35.1, 139.07)]
+    assert listing_state(store, 101) == ("2026-10-01T00:00:00", "2026-10-02T00:00:00", "2026-10-01T00:00:00")
+
+
+def test_changed_listing_is_written(store):
+    store.record_listings(ROWS, seen_at="2026-10-01T00:00:00")
+    changed = ROWS[1]._replace(price=19800)
+
+    assert not store.is_unchanged([ROWS[0], changed])
+    assert store.record_listings([ROWS[0], changed], seen_at="2026-10-02T00:00:00") == ListingChanges(0, 1, 1)
+    assert store.query("SELECT price FROM hotels WHERE id = 102") == [(19800,)]
+    assert listing_state(store, 102) == ("2026-10-01T00:00:00", "2026-10-02T00:00:00", "2026-10-02T00:00:00")
+
+
+def test_listing_with_deleted_row_is_treated_as_changed(store):
+    store.record_listings(ROWS, seen_at="2026-10-01T00:00:00")
+    with store.transaction() as cursor:
+        cursor.execute("DELETE FROM hotels WHERE id = 102")
+
+    # hotel_listings に同じハッシュが残っていても、hotels に行が無ければ書き込み直す
+    assert store.known_hashes([101, 102]) == {101: listing_hash(ROWS[0])}
+    assert not store.is_unchanged(ROWS)
+    assert store.record_listings(ROWS, seen_at="2026-10-02T00:00:00") == ListingChanges(1, 0, 1)
+    assert store.query("SELECT id, name FROM hotels ORDER BY id") == [(101, "熱海ホテル"), (102, "箱根旅館")]
+
+
+def test_empty_page_is_not_unchanged(store):
+    assert not store.is_unchanged([])
+
+
+# --- 差分取得（hotel_crawler.py --incremental） ---
+
+@pytest.fixture
+def listings():
+    return make_listings(["kanagawa"], LIMIT)
+
+
+@pytest.fixture
+def server(listing_server, listings):
+    return listing_server(listings, per_page=PER_PAGE)
+
+
+def run_main(server, tmp_path, *extra):
+    db_path = tmp_path / "hotels.db"
+    hotel_crawler.main([
+        "--base-url", server.url, "--db", str(db_path), "--checkpoint", str(tmp_path / "crawl_state.json"),
+        "--prefectures", "kanagawa", "--limit", str(LIMIT), "--rate", "0", "--workers", "1",
+        "--parse-workers", "0", *extra,
+    ])
+    return db_path
+
+
+def stored(db_path, hotel_id):
+    store = HotelStore(str(db_path))
+    try:
+        return store.query("SELECT name, price FROM hotels WHERE id = ?", (hotel_id,))
+    finally:
+        store.close()
+
+
+def test_incremental_crawl_stops_after_unchanged_pages(server, tmp_path):
+    run_main(server, tmp_path)
+    server.requests.clear()
+    run_main(server, tmp_path, "--incremental")
+    assert server.pages_requested("kanagawa") == [1, 2]
+
+
+def test_incremental_crawl_rewrites_changed_listing(server, listings, tmp_path):
+    db_path = run_main(server, tmp_path)
+    target = listings["kanagawa"][PER_PAGE]  # 2ページ目の先頭
+    target["price"] += 1000
+
+    server.requests.clear()
+    run_main(server, tmp_path, "--incremental")
+    # 1ページ目は変わらず、2ページ目で変更を見つけ、3・4ページ目が変わらないので打ち切る
+    assert server.pages_requested("kanagawa") == [1, 2, 3, 4]
+    assert stored(db_path, target["id"]) == [(target["name"], target["price"])]
+
+
+def test_incremental_crawl_restores_deleted_row(server, listings, tmp_path):
+    db_path = run_main(server, tmp_path)
+    target = listings["kanagawa"][0]
+    store = HotelStore(str(db_path))
+    try:
+        with store.transaction() as cursor:
+            cursor.execute("DELETE FROM hotels WHERE id = ?", (target["id"],))
+    finally:
+        store.close()
+
+    run_main(server, tmp_path, "--incremental")
+    assert stored(db_path, target["id"]) == [(target["name"], target["price"])]
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from distance_engine import DistanceEngine
+from proximity import haversine_km
+
+# タイルが数十マスになる小さな上限にして、タイルの境界をまたぐ場合も確かめる
+SMALL_BUDGET = 2048
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    hotels = (rng.uniform(35.0, 35.3, 40), rng.uniform(139.0, 139.3, 40))
+    attractions = (rng.uniform(35.0, 35.3, 70), rng.uniform(139.0, 139.3, 70))
+    return hotels, attractions
+
+
+def brute_force(hotels, attractions):
+    """ホテル × 観光地 の距離行列（比較用）"""
+    return haversine_km(hotels[0][:, None], hotels[1][:, None], attractions[0][None, :], attractions[1][None, :])
+
+
+# --- 総当たりとの比較 ---
+
+@pytest.mark.parametrize("budget", [SMALL_BUDGET, 64 * 1024 * 1024])
+def test_nearest_matches_brute_force(points, budget):
+    hotels, attractions = points
+    expected = brute_force(hotels, attractions)
+    indices, distances = DistanceEngine(memory_budget=budget).nearest(*hotels, *attractions, k=5)
+
+    assert indices.shape == distances.shape == (40, 5)
+    np.testing.assert_array_equal(indices, np.argsort(expected, axis=1, kind="stable")[:, :5])
+    np.testing.assert_allclose(distances, np.sort(expected, axis=1)[:, :5])
+
+
+@pytest.mark.parametrize("budget", [SMALL_BUDGET, 64 * 1024 * 1024])
+def test_pairs_within_matches_brute_force(points, budget):
+    hotels, attractions = points
+    expected = brute_force(hotels, attractions)
+    found = {}
+    for rows, cols, dists in DistanceEngine(memory_budget=budget).pairs_within(*hotels, *attractions, max_km=5):
+        found.update(zip(zip(rows.tolist(), cols.tolist()), dists.tolist()))
+
+    rows, cols = np.nonzero(expected <= 5)
+    assert sorted(found) == sorted(zip(rows.tolist(), cols.tolist()))
+    np.testing.assert_allclose([found[pair] for pair in zip(rows.tolist(), cols.tolist())], expected[rows, cols])
+
+
+def test_nearest_float32_is_close_to_brute_force(points):
+    hotels, attractions = points
+    _, distances = DistanceEngine(dtype=np.float32).nearest(*hotels, *attractions, k=1)
+    np.testing.assert_allclose(distances[:, 0], brute_force(hotels, attractions).min(axis=1), atol=0.01)
+
+
+# --- 境界の値 ---
+
+def test_nearest_pads_when_k_exceeds_points(points):
+    hotels, attractions = points
+    few = (attractions[0][:3], attractions[1][:3])
+    indices, distances = DistanceEngine(memory_budget=SMALL_BUDGET).nearest(*hotels, *few, k=5)
+
+    assert indices.shape == distances.shape == (40, 5)
+    np.testing.assert_array_equal(np.sort(indices[:, :3], axis=1), np.tile([0, 1, 2], (40, 1)))
+    assert (indices[:, 3:] == -1).all() and np.isnan(distances[:, 3:]).all()
+    assert not np.isnan(distances[:, :3]).any()
+
+
+def test_nearest_with_no_points(points):
+    hotels, _ = points
+    indices, distances = DistanceEngine().nearest(*hotels, [], [], k=2)
+    assert indices.shape == distances.shape == (40, 2)
+    assert (indices == -1).all() and np.isnan(distances).all()
+
+    indices, distances = DistanceEngine().nearest([], [], *hotels, k=2)
+    assert indices.shape == distances.shape == (0, 2)
+    assert list(DistanceEngine().pairs_within(*hotels, [], [], max_km=1)) == []
+
+
+def test_invalid_arguments_raise_value_error(points):
+    hotels, attractions = points
+    with pytest.raises(ValueError, match="k must be at least 1"):
+        DistanceEngine().nearest(*hotels, *attractions, k=0)
+    with pytest.raises(ValueError, match="memory_budget"):
+        DistanceEngine(memory_budget=0)
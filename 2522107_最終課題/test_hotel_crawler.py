@@ -0,0 +1,185 @@
+import json
+import time
+
+import pytest
+
+import hotel_crawler
+from bench_crawler import make_listings, render_page
+from hotel_crawler import CrawlCheckpoint, HotelCrawler, parse_listing_page
+from hotel_store import HotelStore
+from scrape_pipeline import TokenBucket
+
+PREFECTURES = ("kanagawa", "shizuoka")
+PER_PAGE = 10
+LIMIT = 35         # 県ごとの宿の数（limit と同じにして、先読みで余分なページを取らないようにする）
+
+
+@pytest.fixture
+def listings():
+    return make_listings(PREFECTURES, LIMIT)
+
+
+@pytest.fixture
+def server(listing_server, listings):
+    return listing_server(listings, per_page=PER_PAGE)
+
+
+def make_crawler(server, **options):
+    options = {"limit": LIMIT, "rate": None, "max_workers": 4, "parse_workers": 0, "backoff": 0, **options}
+    return HotelCrawler(base_url=server.url, **options)
+
+
+def ids(rows):
+    return [row.id for row in rows]
+
+
+def run_main(server, tmp_path, *extra):
+    """hotel_crawler.main() を tmp_path の DB とチェックポイントで実行する"""
+    db_path, checkpoint_path = tmp_path / "hotels.db", tmp_path / "crawl_state.json"
+    hotel_crawler.main([
+        "--base-url", server.url, "--db", str(db_path), "--checkpoint", str(checkpoint_path),
+        "--prefectures", *PREFECTURES, "--limit", str(LIMIT), "--rate", "0", "--workers", "2",
+        "--parse-workers", "0", "--batch-size", "7", *extra,
+    ])
+    return db_path, checkpoint_path
+
+
+def stored_ids(db_path):
+    store = HotelStore(str(db_path))
+    try:
+        return {row[0] for row in store.query("SELECT id FROM hotels")}
+    finally:
+        store.close()
+
+
+# --- 解析 ---
+
+def test_parse_listing_page_lxml_and_bs4_agree(listings, monkeypatch):
+    html = render_page(listings["kanagawa"][:PER_PAGE])
+    rows = parse_listing_page(html)
+    assert ids(rows) == [item["id"] for item in listings["kanagawa"][:PER_PAGE]]
+    assert rows[1].price == listings["kanagawa"][1]["price"]
+    assert rows[1].review_count == listings["kanagawa"][1]["reviews"]
+
+    monkeypatch.setattr(hotel_crawler, "lxml", None)
+    assert parse_listing_page(html) == rows
+
+
+# --- 取得 ---
+
+@pytest.mark.parametrize("parse_workers", [0, 1])
+def test_crawl_returns_every_listing_in_page_order(server, listings, parse_workers):
+    crawler = make_crawler(server, parse_workers=parse_workers)
+    try:
+        results = crawler.crawl(PREFECTURES)
+    finally:
+        crawler.close()
+    for prefecture in PREFECTURES:
+        assert ids(results[prefecture]) == [item["id"] for item in listings[prefecture]]
+        assert server.pages_requested(prefecture) == [1, 2, 3, 4]
+
+
+def test_crawl_stops_at_limit(server, listings):
+    crawler = make_crawler(server, limit=15)
+    try:
+        results = crawler.crawl(["kanagawa"])
+    finally:
+        crawler.close()
+    assert ids(results["kanagawa"]) == [item["id"] for item in listings["kanagawa"][:15]]
+    assert server.pages_requested("kanagawa") == [1, 2]
+
+
+def test_crawl_fetches_pages_concurrently_up_to_max_workers(listing_server, listings):
+    server = listing_server(listings, per_page=PER_PAGE, latency=0.1)
+    crawler = make_crawler(server, max_workers=3)
+    try:
+        results = crawler.crawl(PREFECTURES)
+    finally:
+        crawler.close()
+    assert all(len(results[p]) == LIMIT for p in PREFECTURES)
+    assert 1 < server.max_in_flight <= 3
+
+
+def test_crawl_respects_rate_limit(server):
+    crawler = make_crawler(server, rate=20, burst=1)
+    start = time.perf_counter()
+    try:
+        crawler.crawl(PREFECTURES)
+    finally:
+        crawler.close()
+    elapsed = time.perf_counter() - start
+    # 8リクエスト（県ごとに4ページ）を 20回/秒 で送るので、最初の1回を除いて 7/20 秒はかかる
+    assert len(server.requests) == 8
+    assert elapsed >= 7 / 20 * 0.9
+    assert crawler.stats()["wait_sec"] > 0
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=50, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() > 0
+
+
+def test_fetch_html_retries_server_errors(server):
+    server.failures[("kanagawa", 1)] = 2
+    crawler = make_crawler(server, retries=2)
+    try:
+        rows = parse_listing_page(crawler.fetch_html("kanagawa", 1))
+    finally:
+        crawler.close()
+    assert len(rows) == PER_PAGE
+    assert server.pages_requested("kanagawa") == [1, 1, 1]
+    assert crawler.stats()["retries"] == 2
+
+
+def test_failed_page_stops_only_that_prefecture(server, listings, tmp_path):
+    server.failures[("kanagawa", 3)] = None
+    checkpoint = CrawlCheckpoint(str(tmp_path / "crawl_state.json"))
+    crawler = make_crawler(server, retries=1, checkpoint=checkpoint)
+    try:
+        results = crawler.crawl(PREFECTURES)
+    finally:
+        crawler.close()
+    assert ids(results["kanagawa"]) == [item["id"] for item in listings["kanagawa"][:20]]
+    assert len(results["shizuoka"]) == LIMIT
+    assert crawler.stats()["errors"] == 1
+    # 失敗したページから再開できるように、チェックポイントはその手前で止まっている
+    assert checkpoint.get("kanagawa") == {"next_page": 3, "count": 20, "exhausted": False}
+    assert checkpoint.get("shizuoka")["count"] == LIMIT
+
+
+# --- チェックポイント（main） ---
+
+def test_main_clears_checkpoint_after_clean_run(server, listings, tmp_path):
+    db_path, checkpoint_path = run_main(server, tmp_path)
+    assert not checkpoint_path.exists()
+    assert stored_ids(db_path) == {item["id"] for p in PREFECTURES for item in listings[p]}
+
+
+def test_main_resumes_from_checkpoint_after_partial_failure(server, listings, tmp_path):
+    server.failures[("kanagawa", 3)] = None
+    db_path, checkpoint_path = run_main(server, tmp_path, "--retries", "0")
+
+    # エラーで打ち切った県があるので、チェックポイントは残る
+    saved = json.loads(checkpoint_path.read_text(encoding="utf-8"))
+    assert saved["kanagawa"]["next_page"] == 3 and saved["kanagawa"]["count"] == 20
+    assert saved["shizuoka"]["count"] == LIMIT
+    assert len(stored_ids(db_path)) == 20 + LIMIT
+
+    # 次の実行は kanagawa の3ページ目からだけ取り直し、最後まで取れたらチェックポイントを消す
+    server.failures.clear()
+    server.requests.clear()
+    run_main(server, tmp_path)
+    assert sorted(server.requests) == [("kanagawa", 3), ("kanagawa", 4)]
+    assert not checkpoint_path.exists()
+    assert stored_ids(db_path) == {item["id"] for p in PREFECTURES for item in listings[p]}
+
+
+def test_main_fresh_ignores_checkpoint(server, listings, tmp_path):
+    server.failures[("kanagawa", 2)] = None
+    run_main(server, tmp_path, "--retries", "0")
+    server.failures.clear()
+    server.requests.clear()
+    run_main(server, tmp_path, "--fresh")
+    assert server.pages_requested("kanagawa") == [1, 2, 3, 4]
+    assert server.pages_requested("shizuoka") == [1, 2, 3, 4]
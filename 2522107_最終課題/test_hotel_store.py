@@ -0,0 +1,128 @@
+import sqlite3
+
+import pytest
+
+from hotel_crawler import HotelRow
+from hotel_store import HotelStore
+
+ROWS = [
+    HotelRow(101, "熱海ホテル", None, None, 4.2, 120, 15000),
+    HotelRow(102, "箱根旅館", None, None, 3.8, 45, 22000),
+    HotelRow(103, "河口湖の宿", None, None, 4.5, 300, 18000),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HotelStore(str(tmp_path / "accommodations.db"))
+    yield store
+    store.close()
+
+
+def all_hotels(store):
+    return store.query("SELECT id, name, lat, lon, rating, review_count, price FROM hotels ORDER BY id")
+
+
+# --- 一括保存 ---
+
+def test_upsert_hotels_counts_inserts_and_updates(store):
+    assert store.upsert_hotels(ROWS[:2]) == (2, 0)
+    assert store.upsert_hotels(ROWS) == (1, 2)
+    assert all_hotels(store) == [tuple(row) for row in ROWS]
+
+
+def test_upsert_hotels_is_idempotent(store):
+    store.upsert_hotels(ROWS)
+    assert store.upsert_hotels(ROWS) == (0, 3)
+    assert all_hotels(store) == [tuple(row) for row in ROWS]
+    assert store.query("SELECT COUNT(*) FROM hotels") == [(3,)]
+
+
+def test_upsert_hotels_counts_duplicate_ids_in_one_batch_once(store):
+    updated = ROWS[0]._replace(price=9000)
+    assert store.upsert_hotels([ROWS[0], updated]) == (1, 1)
+    assert all_hotels(store) == [tuple(updated)]
+
+
+def test_upsert_hotels_keeps_coordinates_when_new_row_has_none(store):
+    store.upsert_hotels([ROWS[0]._replace(lat=35.1, lon=139.07)])
+    store.upsert_hotels([ROWS[0]._replace(rating=4.0)])
+    assert all_hotels(store) == [(101, "熱海ホテル", 35.1, 139.07, 4.0, 120, 15000)]
+
+    # 新しい座標があればそちらにする
+    store.upsert_hotels([ROWS[0]._replace(lat=35.2, lon=139.08)])
+    assert all_hotels(store)[0][2:4] == (35.2, 139.08)
+
+
+def test_upsert_hotels_rolls_back_failed_batch(store):
+    store.upsert_hotels(ROWS[:1])
+    with pytest.raises(sqlite3.IntegrityError):
+        store.upsert_hotels([ROWS[1], ROWS[2]._replace(id=None)])
+    assert all_hotels(store) == [tuple(ROWS[0])]
+
+
+# --- 座標 ---
+
+def test_merge_coordinates_skips_missing_values(store):
+    store.upsert_hotels(ROWS)
+    updated = store.merge_coordinates([
+        ("熱海ホテル", 35.1, 139.07),
+        ("箱根旅館", float("nan"), 139.0),
+        ("河口湖の宿", None, None),
+        (None, 35.5, 138.7),
+        ("存在しない宿", 35.0, 139.0),
+    ])
+    assert updated == 1
+    assert [row[2:4] for row in all_hotels(store)] == [(35.1, 139.07), (None, None), (None, None)]
+
+
+def test_import_coords_csv_reads_columns_by_position(store, tmp_path):
+    store.upsert_hotels(ROWS)
+    csv_path = tmp_path / "hotel_coords.csv"
+    csv_path.write_text(
+        "宿名,b,c,d,e,f,緯度,経度\n"
+        "熱海ホテル,,,,,,35.1,139.07\n"
+        "箱根旅館,,,,,,見つかりません,\n"
+        "河口湖の宿,,,,,,35.5,138.76\n",
+        encoding="utf-8",
+    )
+    assert store.import_coords_csv(str(csv_path)) == (3, 2)
+    assert [row[2:4] for row in all_hotels(store)] == [(35.1, 139.07), (None, None), (35.5, 138.76)]
+
+
+# --- 読み出し・旧形式のテーブル ---
+
+def test_query_returns_tuples_with_params(store):
+    store.upsert_hotels(ROWS)
+    assert store.query("SELECT id, name FROM hotels WHERE price < ? ORDER BY id", (20000,)) == [
+        (101, "熱海ホテル"), (103, "河口湖の宿"),
+    ]
+    assert store.query("SELECT COUNT(lat), COUNT(*) FROM hotels") == [(0, 3)]
+
+
+def test_export_names_csv(store, tmp_path):
+    store.upsert_hotels(ROWS)
+    path = tmp_path / "hotel_names.csv"
+    assert store.export_names_csv(str(path)) == 3
+    assert path.read_text(encoding="utf-8-sig").splitlines() == ["宿名", "熱海ホテル", "箱根旅館", "河口湖の宿"]
+
+
+def test_init_db_dedupes_legacy_table(tmp_path):
+    path = str(tmp_path / "accommodations.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE hotels (id INTEGER, name TEXT, lat REAL, lon REAL, rating REAL, review_count INTEGER, price INTEGER)")
+    conn.executemany("INSERT INTO hotels VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        (101, "熱海ホテル", 35.1, 139.07, 4.0, 100, 14000),
+        (101, "熱海ホテル", None, None, 4.2, 120, 15000),
+        (None, "不明", None, None, 0.0, 0, 0),
+    ])
+    conn.commit()
+    conn.close()
+
+    store = HotelStore(path)
+    try:
+        # 後から入れた行を残し、座標は前の行のものを引き継ぐ
+        assert all_hotels(store) == [(101, "熱海ホテル", 35.1, 139.07, 4.2, 120, 15000)]
+        assert store.upsert_hotels([ROWS[0]]) == (0, 1)
+    finally:
+        store.close()
@@ -0,0 +1,399 @@
+"""
+GitHub の google 組織のリポジトリ一覧を集めるスクレイパー
+
+assignment.ipynb の scrape_and_insert_directly() を、
+  取得（スレッド, TokenBucket で間隔を制限）→ 解析（プロセスプール, lxml があればそれで）→ まとめて書き込み
+のパイプラインにしたもの（部品は 2522107_最終課題/scrape_pipeline.py を使う）。
+ページは先の分まで並列に取得し、ページ順に受け取って終わり（空のページ・前のページと同じ内容）を判定する。
+リポジトリごとに内容（言語・スター数）のハッシュと最後に見かけた日時を repository_state に残す。
+--incremental ではテーブルを作り直さず、内容の変わったリポジトリだけを書き込み、
+前回と同じ内容のページが続いたらそこで打ち切る。
+
+使い方: python github_scraper.py [--max-pages N] [--workers 4] [--parse-workers N] [--rate 1.0] [--batch-size 500]
+                                [--incremental [--stop-after-unchanged 2]]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+# パイプライン部品は 2522107_最終課題/scrape_pipeline.py の1つだけを使う（lecture-1 にコピーは置かない）
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "2522107_最終課題")
+if PIPELINE_DIR not in sys.path:
+    sys.path.append(PIPELINE_DIR)
+from scrape_pipeline import (DEFAULT_BATCH_SIZE, BatchWriter, FetchParsePool, TokenBucket, content_hash,
+                             stripped_text, xpath_first)
+
+try:
+    import lxml.html
+except ImportError:  # lxml が無ければ BeautifulSoup だけで解析する
+    lxml = None
+
+# --- 設定 ---
+BASE_URL = "https://github.com/orgs/google/repositories?type=all"
+DB_NAME = "github_repos.db"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+TITLE_CLASS = "Title-module__anchor--GmXUE Title-module__inline--oM0P7"
+LIST_CLASS = "ListView_module__list-view-container"
+LANGUAGE_CLASS = "LanguageCircle-module__LanguageCircleIndicator"
+
+DEFAULT_RATE = 1.0        # 1秒あたりのリクエスト数の上限（ノートブックの time.sleep(1) と同じ程度）
+DEFAULT_MAX_WORKERS = 4   # 同時に取得するページ数
+DEFAULT_TIMEOUT = 10      # 1リクエストあたりのタイムアウト(秒)
+DEFAULT_RETRIES = 2       # 通信エラー・429・5xx のときの再試行回数
+DEFAULT_BACKOFF = 1.0     # 再試行までの待ち時間(秒, 回数に応じて倍増)
+DEFAULT_STOP_AFTER_UNCHANGED = 2  # 差分取得で、内容の変わらないページが何ページ続いたら打ち切るか
+SQLITE_MAX_PARAMS = 999   # 1つのSQL文に渡すプレースホルダ数の上限
+
+Repository = namedtuple("Repository", ["name", "primary_language", "stars"])
+
+
+# --- ヘルパー関数: スター数を数値に変換 ---
+def parse_stars_to_int(star_text):
+    if not star_text:
+        return 0
+    try:
+        if "k" in star_text:
+            return int(float(star_text.replace("k", "")) * 1000)
+        return int(float(star_text.replace(",", "")))
+    except ValueError:
+        return 0
+
+
+# --- 一覧ページの解析 ---
+
+def parse_repo_page(html):
+    """
+    一覧ページの HTML から Repository のリストを作る（名前の無いものは飛ばす）
+    lxml があれば XPath で解析し、無いときや UTF-8 で読めないときは BeautifulSoup で解析する
+    """
+    if lxml is not None:
+        try:
+            text = html.decode("utf-8") if isinstance(html, bytes) else html
+        except UnicodeDecodeError:
+            pass
+        else:
+            return _parse_repos_lxml(lxml.html.fromstring(text))
+    return _parse_repos_bs4(BeautifulSoup(html, "html.parser"))
+
+
+def _parse_repos_lxml(root):
+    container = xpath_first(root, f'//div[contains(@class, "{LIST_CLASS}")]')
+    items = container.xpath(".//li") if container is not None else []
+    if not items:
+        # フォールバック
+        items = root.xpath(f'//li[.//a[normalize-space(@class)="{TITLE_CLASS}"]]')
+
+    repos = []
+    for item in items:
+        name_tag = xpath_first(item, f'(.//a[normalize-space(@class)="{TITLE_CLASS}"])[1]')
+        span = xpath_first(name_tag, "(.//span)[1]") if name_tag is not None else None
+        if span is None:
+            continue
+
+        language = "N/A"
+        lang_span = xpath_first(item, f'(.//div[contains(@class, "{LANGUAGE_CLASS}")])[1]/following-sibling::span[1]')
+        if lang_span is not None:
+            language = lang_span.text_content().strip()
+
+        star_tag = xpath_first(item, '(.//a[contains(@href, "/stargazers")])[1]')
+        stars = parse_stars_to_int(stripped_text(star_tag)) if star_tag is not None else 0
+
+        repos.append(Repository(span.text_content().strip(), language, stars))
+    return repos
+
+
+def _parse_repos_bs4(soup):
+    """assignment.ipynb と同じ解析"""
+    repo_items = []
+    repo_list_container = soup.find("div", class_=lambda c: c and LIST_CLASS in c)
+    if repo_list_container:
+        repo_items = repo_list_container.find_all("li")
+    if not repo_items:
+        # フォールバック
+        repo_items = [li for li in soup.find_all("li") if li.find("a", class_=TITLE_CLASS)]
+
+    repos = []
+    for item in repo_items:
+        name_tag = item.find("a", class_=TITLE_CLASS)
+        if not (name_tag and name_tag.find("span")):
+            continue
+
+        language = "N/A"
+        lang_circle = item.find("div", class_=lambda c: c and LANGUAGE_CLASS in c)
+        if lang_circle:
+            lang_span = lang_circle.find_next_sibling("span")
+            if lang_span:
+                language = lang_span.text.strip()
+
+        star_tag = item.find("a", href=lambda h: h and "/stargazers" in h)
+        stars = parse_stars_to_int(star_tag.get_text(strip=True)) if star_tag else 0
+
+        repos.append(Repository(name_tag.find("span").text.strip(), language, stars))
+    return repos
+
+
+# --- 取得 ---
+class GithubRepoScraper:
+    """
+    一覧ページを max_workers ページ先まで並列に取得・解析し、ページ順に返す
+    リクエストの間隔は TokenBucket で制限する
+    """
+
+    def __init__(self, base_url=BASE_URL, rate=DEFAULT_RATE, max_workers=DEFAULT_MAX_WORKERS,
+                 parse_workers=None, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 headers=HEADERS):
+        self.base_url = base_url
+        self.max_workers = max(1, int(max_workers))
+        self.parse_workers = parse_workers
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+        self.limiter = TokenBucket(rate, burst=1)
+        self.requests = 0
+        self.retried = 0
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def page_url(self, page):
+        return f"{self.base_url}&page={page}"
+
+    def fetch_html(self, page):
+        """
+        1ページの HTML(bytes) を取得する
+        接続エラー・タイムアウト・429・5xx は backoff を倍々にしながら再試行し、それでも失敗したら例外を投げる
+        それ以外の 200 以外（404 など）は再試行せずに None を返す
+        """
+        last_error = None
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            self.requests += 1
+            try:
+                res = self.session.get(self.page_url(page), timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+            else:
+                if res.status_code == 200:
+                    return res.content
+                if res.status_code != 429 and res.status_code < 500:
+                    print(f"❌ エラー: ステータスコード {res.status_code} ({page}ページ目)")
+                    return None
+                last_error = requests.HTTPError(f"ステータスコード {res.status_code} ({page}ページ目)", response=res)
+            if attempt < self.retries:
+                self.retried += 1
+                time.sleep(self.backoff * (2 ** attempt))
+        raise last_error
+
+    def iter_pages(self, max_pages=None, page_unchanged=None, stop_after_unchanged=DEFAULT_STOP_AFTER_UNCHANGED):
+        """
+        (page, [Repository, ...]) をページ順に返す
+        page_unchanged: repos を受け取り、前回と同じ内容なら True を返す関数（差分取得）
+                        True のページが stop_after_unchanged ページ続いたら、そこで打ち切る
+        """
+        futures = {}
+        next_submit = next_yield = 1
+        previous_page_first_repo = None
+        unchanged_pages = 0
+        with FetchParsePool(self.fetch_html, parse_repo_page, self.max_workers, self.parse_workers) as pool:
+            while True:
+                window = self.max_workers
+                if unchanged_pages:
+                    # 打ち切るかどうかが決まるまでは、先のページを取りに行かない
+                    window = min(window, stop_after_unchanged - unchanged_pages)
+                while len(futures) < window and (max_pages is None or next_submit <= max_pages):
+                    futures[next_submit] = pool.submit(next_submit)
+                    next_submit += 1
+                if next_yield not in futures:
+                    break
+                try:
+                    repos = futures.pop(next_yield).result()
+                except Exception as e:
+                    print(f"❌ 予期せぬエラー: {e}")
+                    break
+                if not repos:
+                    print("🏁 アイテムが見つかりません。終了します。")
+                    break
+                # 無限ループ防止（最後のページより先は、最後のページと同じ内容が返ってくる）
+                if repos[0].name == previous_page_first_repo:
+                    print("🏁 前ページと同じ内容のため終了します。")
+                    break
+                previous_page_first_repo = repos[0].name
+                if page_unchanged is not None:
+                    unchanged_pages = unchanged_pages + 1 if page_unchanged(repos) else 0
+                yield next_yield, repos
+                next_yield += 1
+                if page_unchanged is not None and unchanged_pages >= stop_after_unchanged:
+                    print(f"🏁 {unchanged_pages}ページ続けて変更が無いため終了します。")
+                    break
+
+    def close(self):
+        self.session.close()
+
+
+# --- 保存 ---
+
+def repo_hash(repo):
+    """一覧ページから取れる内容（言語・スター数）のハッシュ"""
+    return content_hash((repo.primary_language, repo.stars))
+
+
+def init_db(conn, incremental=False):
+    """テーブルを用意する（incremental でなければ作り直す）"""
+    with conn:
+        if not incremental:
+            conn.execute("DROP TABLE IF EXISTS repositories")
+            conn.execute("DROP TABLE IF EXISTS repository_state")
+        conn.execute("CREATE TABLE IF NOT EXISTS repositories (id INT, name TEXT, primary_language TEXT, stars INT);")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS repository_state (
+                name TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                first_seen_at TEXT NOT NULL,
+                last_seen_at TEXT NOT NULL,
+                last_changed_at TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_repositories_name'").fetchone():
+            # 以前の版で作ったテーブルは同じ名前の行が重なっていることがあるので、最後の行だけを残す
+            conn.execute("DELETE FROM repositories WHERE rowid NOT IN (SELECT MAX(rowid) FROM repositories GROUP BY name)")
+            conn.execute("CREATE UNIQUE INDEX idx_repositories_name ON repositories (name)")
+
+
+def known_hashes(conn, names):
+    """{name: 前回保存したときの内容のハッシュ}（まだ記録の無いリポジトリと、repositories に行の無いものは含まない）"""
+    hashes = {}
+    names = list(dict.fromkeys(names))
+    for i in range(0, len(names), SQLITE_MAX_PARAMS):
+        chunk = names[i:i + SQLITE_MAX_PARAMS]
+        # repositories の行が消えているもの（手で消したときなど）は、記録が残っていても書き込み直す
+        hashes.update(conn.execute(f"""
+            SELECT s.name, s.content_hash FROM repository_state AS s JOIN repositories AS r ON r.name = s.name
+            WHERE s.name IN ({','.join('?' * len(chunk))})
+        """, chunk))
+    return hashes
+
+
+def page_unchanged(conn):
+    """ページのリポジトリがすべて前回と同じ内容なら True を返す関数（iter_pages の page_unchanged 用）"""
+    def unchanged(repos):
+        known = known_hashes(conn, (repo.name for repo in repos))
+        return all(known.get(repo.name) == repo_hash(repo) for repo in repos)
+    return unchanged
+
+
+def repository_writer(conn, seen_at, counts):
+    """
+    Repository のリストを1回のトランザクションで書き込む関数を返す（BatchWriter の write 用）
+    内容の変わったリポジトリ（と新しいリポジトリ）だけを repositories に書き込み、
+    変わっていないものは repository_state の last_seen_at だけを進める
+    新しいリポジトリの id は、今ある最大の id の続きの番号にする
+    counts: "inserted" / "updated" / "unchanged" の件数を足していく dict
+    """
+    def write(repos):
+        with conn:
+            known = known_hashes(conn, (repo.name for repo in repos))
+            next_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM repositories").fetchone()[0] + 1
+            new, changed, state, unchanged = [], [], [], []
+            for repo in repos:
+                digest = repo_hash(repo)
+                previous = known.get(repo.name)
+                if previous == digest:
+                    unchanged.append((seen_at, repo.name))
+                    continue
+                known[repo.name] = digest  # 同じリポジトリが2回あっても1回だけ書き込む
+                if previous is None:
+                    new.append((next_id, *repo))
+                    next_id += 1
+                else:
+                    changed.append((repo.primary_language, repo.stars, repo.name))
+                state.append((repo.name, digest, seen_at, seen_at, seen_at))
+
+            # 列の順番: id, name, primary_language, stars
+            conn.executemany("""
+                INSERT INTO repositories (id, name, primary_language, stars) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET primary_language = excluded.primary_language, stars = excluded.stars
+            """, new)
+            conn.executemany("UPDATE repositories SET primary_language = ?, stars = ? WHERE name = ?", changed)
+            conn.executemany("""
+                INSERT INTO repository_state (name, content_hash, first_seen_at, last_seen_at, last_changed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    last_seen_at = excluded.last_seen_at,
+                    last_changed_at = excluded.last_changed_at
+            """, state)
+            conn.executemany("UPDATE repository_state SET last_seen_at = ? WHERE name = ?", unchanged)
+        counts["inserted"] += len(new)
+        counts["updated"] += len(changed)
+        counts["unchanged"] += len(unchanged)
+    return write
+
+
+# --- メイン処理 ---
+def scrape_and_insert(db_name=DB_NAME, max_pages=None, batch_size=DEFAULT_BATCH_SIZE, incremental=False,
+                      stop_after_unchanged=DEFAULT_STOP_AFTER_UNCHANGED, **scraper_options):
+    """
+    全ページのリポジトリを書き込む（incremental でなければ repositories テーブルを作り直す）
+    incremental では内容の変わったリポジトリだけを書き込み、前回と同じ内容のページが続いたら打ち切る
+    取得した件数を返す
+    """
+    conn = sqlite3.connect(db_name)
+    init_db(conn, incremental)
+    print(f"🗄️ データベース '{db_name}' を作成し、接続しました。")
+
+    scraper = GithubRepoScraper(**scraper_options)
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    seen_at = datetime.now().isoformat(timespec="seconds")
+    writer = BatchWriter(repository_writer(conn, seen_at, counts), batch_size=batch_size)
+    total_repos = 0
+    start = time.perf_counter()
+    try:
+        pages = scraper.iter_pages(max_pages, page_unchanged(conn) if incremental else None, stop_after_unchanged)
+        for page, repos in pages:
+            writer.add(repos)
+            total_repos += len(repos)
+            print(f"📄 {page}ページ目: {len(repos)} 件 (合計: {total_repos}件)")
+        writer.flush()
+    finally:
+        conn.close()
+        scraper.close()
+    elapsed = time.perf_counter() - start
+    print(f"🔒 {total_repos}件を {writer.batches} 回に分けて書き込みました "
+          f"(新規 {counts['inserted']}, 変更 {counts['updated']}, 変更なし {counts['unchanged']}; "
+          f"{scraper.requests} requests, {scraper.retried} retries, {elapsed:.1f}s)。処理完了！")
+    return total_repos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GitHub organization repository scraper")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="1秒あたりのリクエスト数の上限")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--parse-workers", type=int, default=None, help="解析のプロセス数（0 で取得スレッドで解析）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--incremental", action="store_true",
+                        help="差分取得（テーブルを作り直さず、前回と同じ内容のページが続いたら打ち切る）")
+    parser.add_argument("--stop-after-unchanged", type=int, default=DEFAULT_STOP_AFTER_UNCHANGED)
+    args = parser.parse_args()
+    scrape_and_insert(args.db, args.max_pages, args.batch_size, args.incremental, max(1, args.stop_after_unchanged),
+                      base_url=args.base_url, rate=args.rate, max_workers=args.workers,
+                      parse_workers=args.parse_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from github_scraper import Repository, init_db, known_hashes, page_unchanged, repo_hash, repository_writer
+
+REPOS = [
+    Repository("guava", "Java", 50000),
+    Repository("gson", "Java", 23000),
+    Repository("jax", "Python", 30000),
+]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "github_repos.db"))
+    init_db(conn)
+    yield conn
+    conn.close()
+
+
+def write(conn, repos, seen_at):
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    repository_writer(conn, seen_at, counts)(repos)
+    return counts
+
+
+def repositories(conn):
+    return conn.execute("SELECT id, name, primary_language, stars FROM repositories ORDER BY id").fetchall()
+
+
+def test_unchanged_repositories_are_skipped(conn):
+    assert write(conn, REPOS, "2026-10-01") == {"inserted": 3, "updated": 0, "unchanged": 0}
+    assert page_unchanged(conn)(REPOS)
+    assert write(conn, REPOS, "2026-10-02") == {"inserted": 0, "updated": 0, "unchanged": 3}
+    assert conn.execute("SELECT last_seen_at, last_changed_at FROM repository_state WHERE name = 'jax'").fetchone() == (
+        "2026-10-02", "2026-10-01")
+
+
+def test_changed_repository_is_updated_in_place(conn):
+    write(conn, REPOS, "2026-10-01")
+    changed = REPOS[2]._replace(stars=31000)
+
+    assert not page_unchanged(conn)([REPOS[0], changed])
+    assert write(conn, [REPOS[0], changed], "2026-10-02") == {"inserted": 0, "updated": 1, "unchanged": 1}
+    assert repositories(conn)[2] == (3, "jax", "Python", 31000)
+    assert known_hashes(conn, ["jax"]) == {"jax": repo_hash(changed)}
+
+
+def test_repository_with_deleted_row_is_treated_as_changed(conn):
+    write(conn, REPOS, "2026-10-01")
+    with conn:
+        conn.execute("DELETE FROM repositories WHERE name = 'gson'")
+
+    # repository_state に同じハッシュが残っていても、repositories に行が無ければ書き込み直す
+    assert "gson" not in known_hashes(conn, [repo.name for repo in REPOS])
+    assert not page_unchanged(conn)(REPOS)
+    assert write(conn, REPOS, "2026-10-02") == {"inserted": 1, "updated": 0, "unchanged": 2}
+    assert [row[1] for row in repositories(conn)] == ["guava", "jax", "gson"]
+
+
+def test_incremental_init_keeps_existing_rows(conn):
+    write(conn, REPOS, "2026-10-01")
+    init_db(conn, incremental=True)
+    assert len(repositories(conn)) == 3
+    init_db(conn)
+    assert repositories(conn) == []
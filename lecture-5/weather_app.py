@@ -1,3 +1,4 @@
+import time
 import flet as ft
 import requests
 from datetime import datetime
@@ -5,6 +6,9 @@ from datetime import datetime
 # --- 設定値とエンドポイント ---
 JMA_BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/"
 REGION_CONF_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
+JSON_TTL = 600                  # 再検証なしで使う期間(秒)
+REGION_CONF_TTL = 24 * 60 * 60  # area.json はほとんど変わらないので1日は再検証しない
+REQUEST_TIMEOUT = 10
 
 # 観測地点（ID, 地域コード, 表示名, Y座標, X座標）
 MONITOR_POINTS = [
@@ -23,6 +27,51 @@ MONITOR_POINTS = [
     ("471000", "471010", "那覇", 630, 210),
 ]
 
+
+# --- ETag / Last-Modified による条件付きGET ---
+class JsonCache:
+    """
+    取得したJSONをURLごとに覚えておき、TTLを過ぎたら条件付きGETで再検証する
+    304が返った場合は前回のパース結果をそのまま返す（取得するURLは地点数程度なので件数の上限は設けない）
+    """
+
+    def __init__(self, ttl=JSON_TTL):
+        self.ttl = ttl
+        self.session = requests.Session()
+        self._entries = {}     # url -> (etag, last_modified, stored_at, data)
+        self.hits = 0          # TTL内でネットワークに出なかった回数
+        self.misses = 0        # 本文をダウンロードした回数
+        self.revalidated = 0   # 304で本文のダウンロードを省略できた回数
+
+    def get_json(self, url, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        entry = self._entries.get(url)
+        if entry is not None and time.time() - entry[2] < ttl:
+            self.hits += 1
+            return entry[3]
+
+        headers = {}
+        if entry is not None:
+            if entry[0]:
+                headers["If-None-Match"] = entry[0]
+            if entry[1]:
+                headers["If-Modified-Since"] = entry[1]
+        res = self.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if res.status_code == 304 and entry is not None:
+            self._entries[url] = (entry[0], entry[1], time.time(), entry[3])
+            self.revalidated += 1
+            return entry[3]
+
+        res.raise_for_status()
+        data = res.json()
+        self._entries[url] = (res.headers.get("ETag"), res.headers.get("Last-Modified"), time.time(), data)
+        self.misses += 1
+        return data
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated, "entries": len(self._entries)}
+
+
 def main(page: ft.Page):
     page.title = "Weather Intelligence Dashboard"
     page.theme_mode = ft.ThemeMode.LIGHT
@@ -31,6 +80,7 @@ def main(page: ft.Page):
     page.window_height = 920
     page.padding = 0
 
+    json_cache = JsonCache()
 
     def fetch_visual_style(condition_text):
         target = str(condition_text)
@@ -49,7 +99,7 @@ def main(page: ft.Page):
  
     def open_detailed_report(office_id, area_id, area_name):
         try:
-            raw_data = requests.get(f"{JMA_BASE_URL}{office_id}.json").json()
+            raw_data = json_cache.get_json(f"{JMA_BASE_URL}{office_id}.json")
             
             weekly_box = ft.Row(scroll=ft.ScrollMode.AUTO, spacing=12)
             if len(raw_data) > 1:
@@ -118,7 +168,7 @@ def main(page: ft.Page):
 
     def build_navigation():
         try:
-            config = requests.get(REGION_CONF_URL).json()
+            config = json_cache.get_json(REGION_CONF_URL, ttl=REGION_CONF_TTL)
             for c_id, c_data in config["centers"].items():
                 subs = []
                 for o_id in c_data.get("children", []):
@@ -136,9 +186,17 @@ def main(page: ft.Page):
     weather_canvas = ft.Stack(width=1100, height=850)
 
     def sync_map_data():
+        # 同じ予報区(oid)のJSONは1回だけ取得・パースして各地点で使い回す
+        office_data = {}
+        saved_requests = 0
+
         for oid, rid, name, top, left in MONITOR_POINTS:
             try:
-                data = requests.get(f"{JMA_BASE_URL}{oid}.json").json()
+                if oid in office_data:
+                    saved_requests += 1
+                else:
+                    office_data[oid] = json_cache.get_json(f"{JMA_BASE_URL}{oid}.json")
+                data = office_data[oid]
                 ts_base = data[0]["timeSeries"]
 
                 
@@ -220,6 +278,8 @@ def main(page: ft.Page):
             except Exception as e:
                 print("Map fetch error:", e)
 
+        print(f"Map sync: {len(MONITOR_POINTS)} points, {saved_requests} requests saved by office grouping")
+        print(f"HTTP cache: {json_cache.stats()}")
         page.update()
 
 
@@ -0,0 +1,120 @@
+"""
+WeatherDatabase のベンチマーク
+毎回 sqlite3.connect → commit → close していた旧実装と、
+長寿命接続 + WAL の現在の実装で upsert / 検索のスループットを比較する
+
+使い方: python bench_db.py [--areas 200] [--days 7] [--queries 200]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from weather_db import WeatherDatabase
+
+
+# --- 比較用: 変更前の実装（呼び出しごとに接続を開閉する） ---
+class LegacyWeatherDatabase(WeatherDatabase):
+    def get_connection(self):
+        return sqlite3.connect(self.db_name)
+
+    def init_db(self):
+        conn = self.get_connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS areas (
+                area_code TEXT PRIMARY KEY, office_code TEXT, name TEXT, pos_y INTEGER, pos_x INTEGER
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS forecasts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, area_code TEXT, target_date TEXT,
+                weather_code TEXT, weather_text TEXT, temp_max TEXT, temp_min TEXT, pop TEXT,
+                fetched_at TEXT, UNIQUE(area_code, target_date)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def upsert_area(self, area_data):
+        conn = self.get_connection()
+        conn.executemany('''
+            INSERT OR REPLACE INTO areas (office_code, area_code, name, pos_y, pos_x)
+            VALUES (?, ?, ?, ?, ?)
+        ''', area_data)
+        conn.commit()
+        conn.close()
+
+    def upsert_forecast(self, area_code, target_date, w_code, w_text, t_max, t_min, pop):
+        conn = self.get_connection()
+        now = datetime.now().isoformat()
+        conn.execute('''
+            INSERT OR REPLACE INTO forecasts
+            (area_code, target_date, weather_code, weather_text, temp_max, temp_min, pop, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (area_code, target_date, w_code, w_text, t_max, t_min, pop, now))
+        conn.commit()
+        conn.close()
+
+    def query(self, sql, params=()):
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(sql, params).fetchall()
+        conn.close()
+        return rows
+
+    def query_records(self, record_type, sql, params=()):
+        conn = self.get_connection()
+        rows = conn.execute(sql, params).fetchall()
+        conn.close()
+        return rows
+
+
+def run(db_class, db_path, n_areas, n_days, n_queries, batch=False):
+    db = db_class(db_path)
+    db.upsert_area([(f"{i:06d}", f"{i:06d}", f"area{i}", 0, 0) for i in range(n_areas)])
+    dates = [(date.today() + timedelta(days=d)).isoformat() for d in range(n_days)]
+
+    rows = [(f"{i:06d}", d, "100", "晴れ", "20", "10", "30") for d in dates for i in range(n_areas)]
+    start = time.perf_counter()
+    if batch:
+        db.upsert_forecasts(rows)
+    else:
+        for row in rows:
+            db.upsert_forecast(*row)
+    upsert_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for q in range(n_queries):
+        db.get_forecasts_by_date(dates[q % n_days])
+    query_sec = time.perf_counter() - start
+
+    db.close()
+    n_rows = n_areas * n_days
+    return n_rows / upsert_sec, n_queries / query_sec
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WeatherDatabase benchmark")
+    parser.add_argument("--areas", type=int, default=200)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"areas={args.areas} days={args.days} queries={args.queries}")
+    print(f"{'implementation':<12} {'upsert rows/s':>14} {'queries/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [
+            ("before", LegacyWeatherDatabase, False),
+            ("after", WeatherDatabase, False),
+            ("after/batch", WeatherDatabase, True),   # upsert_forecasts で1トランザクション
+        ]
+        for label, db_class, batch in cases:
+            path = os.path.join(tmp, f"{label.replace('/', '_')}.db")
+            upsert_rate, query_rate = run(db_class, path, args.areas, args.days, args.queries, batch)
+            print(f"{label:<12} {upsert_rate:>14,.0f} {query_rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+予報JSONパーサーのマイクロベンチマーク
+ingest と同じ取り出し（1件の予報JSONの ForecastIndex を全地域で使い回し、
+extract_daily_forecasts で全日付 + 週間予報）を、SeriesIndex.find の探し方だけ変えて比較する
+  linear: 毎回 timeSeries を先頭から探す
+  dict:   最初に引いたときに 地域コード → エリア の索引を作る
+  lazy:   最初の1回は先頭から探し、2回目に索引を作る（現在の SeriesIndex.find）
+
+使い方: python bench_parser.py [--areas 10 100 1000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+from forecast_parser import SeriesIndex, extract_daily_forecasts, extract_weekly_forecast, index_forecast
+
+
+def make_payload(area_codes, days=7, start=date(2025, 1, 1)):
+    """気象庁の予報JSONと同じ形のダミーデータを作る（start の日から days 日分）"""
+    dates = [(start + timedelta(days=d)).isoformat() for d in range(max(days, 3))]
+    today = [f"{d}T00:00:00+09:00" for d in dates[:3]]
+    hours = [f"{dates[0]}T{h:02d}:00:00+09:00" for h in (0, 6, 12, 18)]
+    week = [f"{d}T00:00:00+09:00" for d in dates[:days]]
+    return [
+        {"timeSeries": [
+            {"timeDefines": today, "areas": [
+                {"area": {"name": c, "code": c}, "weatherCodes": ["100", "200", "300"], "weathers": ["晴れ", "くもり", "雨"]}
+                for c in area_codes]},
+            {"timeDefines": hours, "areas": [
+                {"area": {"name": c, "code": c}, "pops": ["10", "20", "30", "40"]} for c in area_codes]},
+            {"timeDefines": hours[:2], "areas": [
+                {"area": {"name": c, "code": c}, "temps": ["5", "12"]} for c in area_codes]},
+        ]},
+        {"timeSeries": [
+            {"timeDefines": week, "areas": [
+                {"area": {"name": c, "code": c}, "weatherCodes": ["101"] * days, "pops": ["", *["30"] * (days - 1)]}
+                for c in area_codes]},
+            {"timeDefines": week, "areas": [
+                {"area": {"name": c, "code": c}, "tempsMin": ["", *["3"] * (days - 1)], "tempsMax": ["", *["11"] * (days - 1)]}
+                for c in area_codes]},
+        ]},
+    ]
+
+
+def extract_all(data, area_codes):
+    index = index_forecast(data)
+    return [(extract_daily_forecasts(index, c), extract_weekly_forecast(index, c)) for c in area_codes]
+
+
+# --- 比較用の探し方 ---
+def linear_find(self, area_code):
+    return next((a for a in self.areas if a["area"]["code"] == area_code), self.first)
+
+
+def dict_find(self, area_code):
+    if self._by_code is None:
+        self._by_code = {}
+        for a in self.areas:
+            self._by_code.setdefault(a["area"]["code"], a)
+    return self._by_code.get(area_code, self.first)
+
+
+def timed_with_find(find, data, area_codes, repeat):
+    """SeriesIndex.find を一時的に差し替えて extract_all を計る"""
+    saved = SeriesIndex.find
+    SeriesIndex.find = find
+    try:
+        return best_of(lambda: extract_all(data, area_codes), repeat)
+    finally:
+        SeriesIndex.find = saved
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="forecast parser micro-benchmark")
+    parser.add_argument("--areas", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'areas':>6} {'json.loads':>12} {'linear':>12} {'dict':>12} {'lazy':>12} {'vs linear':>10} {'vs dict':>8}")
+    for n in args.areas:
+        codes = [f"{i:06d}" for i in range(n)]
+        body = json.dumps(make_payload(codes), ensure_ascii=False).encode("utf-8")
+        data = json.loads(body)
+
+        load_sec = best_of(lambda: json.loads(body), args.repeat)
+        linear_sec = timed_with_find(linear_find, data, codes, args.repeat)
+        dict_sec = timed_with_find(dict_find, data, codes, args.repeat)
+        lazy_sec = best_of(lambda: extract_all(data, codes), args.repeat)
+        print(f"{n:>6} {load_sec * 1000:>10.2f}ms {linear_sec * 1000:>10.2f}ms {dict_sec * 1000:>10.2f}ms "
+              f"{lazy_sec * 1000:>10.2f}ms {linear_sec / lazy_sec:>9.2f}x {dict_sec / lazy_sec:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
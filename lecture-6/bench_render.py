@@ -0,0 +1,233 @@
+"""
+ダッシュボード描画のベンチマーク
+ブラウザや気象庁のサーバーを使わずに weather_app_v2 の画面を動かし、地域数ごとの
+所要時間・クライアントに送ったコントロール数・ピークメモリを測る
+
+- Flet の Page は本物を使い、クライアントとの接続だけをスタブに差し替える（差分の計算まで実際に行われる）
+- 予報JSONはローカルのスタブサーバーから返す（bench_parser.make_payload と同じ形, 今日から7日分）
+- 時間とメモリは別々の実行で測る（tracemalloc を有効にすると処理が遅くなるため）
+
+使い方: python bench_render.py [--areas 13 100 1000 all] [--dialogs 20] [--area-json area.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import flet as ft
+from flet.core.connection import Connection
+from flet.core.protocol import PageCommandResponsePayload, PageCommandsBatchResponsePayload
+
+from bench_parser import make_payload
+from jma_fetch import flatten_region_config
+from weather_app_v2 import main as build_dashboard
+from weather_db import WeatherDatabase
+
+ALL_CLASS10 = 142  # --area-json を省略したときの「全地域」の数（気象庁の class10 とおおよそ同じ規模）
+AREAS_PER_OFFICE = 4
+OFFICES_PER_CENTER = 6
+
+
+# --- スタブ ---
+
+class StubConnection(Connection):
+    """Flet クライアントの代わりにコマンドを受け取り、数だけ数える"""
+
+    def __init__(self):
+        super().__init__()
+        self.next_id = 0
+        self.reset()
+
+    def reset(self):
+        self.updates = 0    # page.update などの呼び出し回数
+        self.added = 0      # 追加されたコントロール数
+        self.changed = 0    # 属性の変更（set コマンド）の数
+
+    def send_commands(self, session_id, commands):
+        self.updates += 1
+        results = []
+        for command in commands:
+            if command.name == "add":
+                # 追加されたコントロールに id を振って返す（本物のクライアントと同じ形式）
+                count = len(command.commands) + (1 if command.values else 0)
+                ids = [f"_{self.next_id + i + 1}" for i in range(count)]
+                self.next_id += count
+                self.added += count
+                results.append(" ".join(ids))
+            elif command.name == "set":
+                self.changed += 1
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+    def send_command(self, session_id, command):
+        return PageCommandResponsePayload(result="", error="")
+
+
+def make_region_config(n_class10):
+    """area.json と同じ形の地域階層を作る（center → office → class10）"""
+    config = {"centers": {}, "offices": {}, "class10s": {}}
+    n_offices = -(-n_class10 // AREAS_PER_OFFICE)
+    for o in range(n_offices):
+        c_id = f"{o // OFFICES_PER_CENTER + 1:02d}0000"
+        o_id = f"{o + 1:04d}00"
+        center = config["centers"].setdefault(c_id, {"name": f"地方{c_id}", "children": []})
+        center["children"].append(o_id)
+        children = [f"{o + 1:04d}{r + 1:02d}" for r in range(min(AREAS_PER_OFFICE, n_class10 - o * AREAS_PER_OFFICE))]
+        config["offices"][o_id] = {"name": f"予報区{o_id}", "children": children, "parent": c_id}
+        for r_id in children:
+            config["class10s"][r_id] = {"name": f"地域{r_id}", "parent": o_id}
+    return config
+
+
+def start_stub_server(region_rows):
+    """予報区ごとの予報JSONを返すスタブサーバーを起動し、ベースURLを返す"""
+    children = {}
+    for level, code, parent, _, _ in region_rows:
+        if level == "class10":
+            children.setdefault(parent, []).append(code)
+    bodies = {
+        f"/{office}.json": json.dumps(make_payload(codes, start=date.today()), ensure_ascii=False).encode("utf-8")
+        for office, codes in children.items()
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = bodies.get(self.path)
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body or b"")))
+            self.end_headers()
+            self.wfile.write(body or b"")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+
+def monitor_points(region_rows, n):
+    """地図に並べる地点（class10 の先頭 n 件を格子状に配置）"""
+    class10s = [(code, parent, name) for level, code, parent, name, _ in region_rows if level == "class10"][:n]
+    return [
+        (parent, code, name, 20 + (i // 10) * 120, 20 + (i % 10) * 110)
+        for i, (code, parent, name) in enumerate(class10s)
+    ]
+
+
+def count_controls(control):
+    return 1 + sum(count_controls(c) for c in control._get_children())
+
+
+# --- 計測 ---
+
+def run_case(region_rows, n_areas, n_dialogs, trace_memory):
+    """1つの地域数について画面を一通り動かし、段階ごとの結果を返す"""
+    server, base_url = start_stub_server(region_rows)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = StubConnection()
+        page = ft.Page(conn, "bench", asyncio.new_event_loop())
+        db_name = os.path.join(tmp, "bench.db")
+
+        def measure(label, func):
+            conn.reset()
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):  # 同期のログなどは表示しない
+                func()
+            elapsed = time.perf_counter() - start
+            peak = 0
+            if trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            results.append((label, elapsed, conn.updates, conn.added, conn.changed, peak))
+
+        # 地域階層はDBに入れておく（build_navigation はDBから読む）
+        seed = WeatherDatabase(db_name)
+        seed.replace_regions(region_rows)
+        seed.close()
+
+        dashboard = None
+
+        def startup():
+            nonlocal dashboard
+            dashboard = build_dashboard(
+                page, db_name=db_name, base_url=base_url,
+                monitor_points=monitor_points(region_rows, n_areas), use_cache=False, auto_sync=False,
+            )
+
+        def expand_navigation():
+            for center_tile in dashboard.nav_panel.controls:
+                dashboard.expand_center(center_tile)
+                for office_tile in center_tile.controls:
+                    dashboard.expand_office(office_tile)
+
+        def open_dialogs():
+            for card in list(dashboard.area_cards.values())[:n_dialogs]:
+                card.on_click(None)
+
+        try:
+            measure("startup (nav + empty map)", startup)
+            measure("sync (stub JMA → DB → map)", dashboard.sync)
+            # 同期直後と同じ日付をもう一度描画する（値が変わらなければ何も送らないはず）
+            today_str = datetime.now().strftime("%Y-%m-%d")
+            measure("re-render (no changes)", lambda: dashboard.render_map(today_str))
+            # 日付の切り替え（予報期間内ならDBだけで描画できる）
+            later_str = (date.today() + timedelta(days=3)).isoformat()
+            measure("change date (+3 days)", lambda: dashboard.render_map(later_str))
+            # 前後の日付は先読みされているので、1日ずつの移動はDBに行かずに済む
+            dashboard.forecast_cache.close(wait=True)  # 先読みが終わるのを待つ
+            next_str = (date.today() + timedelta(days=4)).isoformat()
+            measure("change date (+1 day, prefetched)", lambda: dashboard.render_map(next_str))
+            measure("expand all nav tiles", expand_navigation)
+            measure(f"weekly dialog x{min(n_dialogs, n_areas)}", open_dialogs)
+            total_controls = count_controls(page)
+            dashboard.db.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results, total_controls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dashboard render benchmark")
+    parser.add_argument("--areas", nargs="+", default=["13", "100", "1000", "all"],
+                        help="地図に表示する地域数（all は地域階層の class10 すべて）")
+    parser.add_argument("--dialogs", type=int, default=20, help="開く週間予報ダイアログの数")
+    parser.add_argument("--area-json", help="保存済みの area.json（省略時は合成した地域階層を使う）")
+    args = parser.parse_args()
+
+    real_rows = None
+    if args.area_json:
+        with open(args.area_json, encoding="utf-8") as f:
+            real_rows = flatten_region_config(json.load(f))
+
+    for label in args.areas:
+        if label == "all":
+            region_rows = real_rows or flatten_region_config(make_region_config(ALL_CLASS10))
+            n_areas = sum(1 for row in region_rows if row[0] == "class10")
+        else:
+            n_areas = int(label)
+            region_rows = real_rows or flatten_region_config(make_region_config(n_areas))
+
+        timed, total_controls = run_case(region_rows, n_areas, args.dialogs, trace_memory=False)
+        traced, _ = run_case(region_rows, n_areas, args.dialogs, trace_memory=True)
+
+        print(f"\n== {label} ({n_areas} areas, {total_controls} controls on page) ==")
+        print(f"{'phase':<30} {'wall':>10} {'updates':>8} {'added':>8} {'set':>8} {'peak mem':>10}")
+        for (name, elapsed, updates, added, changed, _), (*_, peak) in zip(timed, traced):
+            print(f"{name:<30} {elapsed * 1000:>8.1f}ms {updates:>8} {added:>8} {changed:>8} {peak / 1024:>8.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
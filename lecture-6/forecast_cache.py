@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+DEFAULT_MAX_DATES = 32     # メモリに残す日付の数
+DEFAULT_PREFETCH_DAYS = 1  # 表示した日の前後何日分を先読みするか
+
+
+# --- 日付ごとの地図データのキャッシュ ---
+class ForecastDateCache:
+    """
+    get_forecasts_by_date の結果を日付ごとにメモリに残す（LRU）
+    表示した日の前後の日付はバックグラウンドで先読みしておき、日付の切り替えをDBに行かずに済ませる
+    同期でDBが書き換わったら invalidate() で捨てる
+    """
+
+    def __init__(self, db, max_dates=DEFAULT_MAX_DATES, prefetch_days=DEFAULT_PREFETCH_DAYS):
+        self.db = db
+        self.max_dates = max_dates
+        self.prefetch_days = prefetch_days
+        self._entries = OrderedDict()  # target_date -> 行のタプル（古く使われたものが先頭）
+        self._lock = threading.Lock()
+        self._generation = 0           # invalidate() のたびに増やす（古い先読み結果を捨てるため）
+        self._pending = set()          # 先読み中の日付
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forecast-prefetch")
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+    def _load(self, target_date):
+        return tuple(self.db.get_forecasts_by_date(target_date))
+
+    def _store(self, target_date, rows, generation):
+        """読み込んだ結果を入れる（途中で invalidate されていたら捨てる）"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[target_date] = rows
+            self._entries.move_to_end(target_date)
+            while len(self._entries) > self.max_dates:
+                self._entries.popitem(last=False)
+
+    def get(self, target_date):
+        """指定した日付の地図データ（MapForecastRecord のタプル）を返す"""
+        with self._lock:
+            rows = self._entries.get(target_date)
+            if rows is not None:
+                self._entries.move_to_end(target_date)
+                self.hits += 1
+                return rows
+            self.misses += 1
+            generation = self._generation
+        rows = self._load(target_date)
+        self._store(target_date, rows, generation)
+        return rows
+
+    def prefetch_around(self, target_date):
+        """前後 prefetch_days 日分のうち、まだ無い日付をバックグラウンドで読み込む"""
+        center = date.fromisoformat(target_date)
+        for offset in range(-self.prefetch_days, self.prefetch_days + 1):
+            if offset == 0:
+                continue
+            day = (center + timedelta(days=offset)).isoformat()
+            with self._lock:
+                if day in self._entries or day in self._pending:
+                    continue
+                self._pending.add(day)
+                generation = self._generation
+            try:
+                self._executor.submit(self._prefetch, day, generation)
+            except RuntimeError:  # close() の後
+                with self._lock:
+                    self._pending.discard(day)
+                return
+
+    def _prefetch(self, target_date, generation):
+        try:
+            self._store(target_date, self._load(target_date), generation)
+            self.prefetched += 1
+        except Exception as e:
+            print(f"Prefetch Error {target_date}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(target_date)
+
+    def invalidate(self):
+        """キャッシュをすべて捨てる（同期でDBに新しい行が入ったとき）"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "prefetched": self.prefetched,
+                    "dates": len(self._entries)}
+
+    def close(self, wait=False):
+        """先読みを止める（wait=True なら実行中・待ちの先読みが終わるまで待つ）"""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
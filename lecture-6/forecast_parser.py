@@ -0,0 +1,190 @@
+# --- 気象庁の予報JSONから必要な値を取り出す ---
+
+# 気象庁の天気コードと天気の文言
+WEATHER_CODE_TEXT = {
+    "100": "晴", "101": "晴時々曇", "102": "晴一時雨", "103": "晴時々雨", "104": "晴一時雪",
+    "105": "晴時々雪", "106": "晴一時雨か雪", "107": "晴時々雨か雪", "108": "晴一時雨か雷雨",
+    "110": "晴後時々曇", "111": "晴後曇", "112": "晴後一時雨", "113": "晴後時々雨", "114": "晴後雨",
+    "115": "晴後一時雪", "116": "晴後時々雪", "117": "晴後雪", "118": "晴後雨か雪", "119": "晴後雨か雷雨",
+    "120": "晴朝夕一時雨", "121": "晴朝の内一時雨", "122": "晴夕方一時雨", "123": "晴山沿い雷雨",
+    "124": "晴山沿い雪", "125": "晴午後は雷雨", "126": "晴昼頃から雨", "127": "晴夕方から雨",
+    "128": "晴夜は雨", "130": "朝の内霧後晴", "131": "晴明け方霧", "132": "晴朝夕曇",
+    "140": "晴時々雨で雷を伴う", "160": "晴一時雪か雨", "170": "晴時々雪か雨", "181": "晴後雪か雨",
+    "200": "曇", "201": "曇時々晴", "202": "曇一時雨", "203": "曇時々雨", "204": "曇一時雪",
+    "205": "曇時々雪", "206": "曇一時雨か雪", "207": "曇時々雨か雪", "208": "曇一時雨か雷雨",
+    "209": "霧", "210": "曇後時々晴", "211": "曇後晴", "212": "曇後一時雨", "213": "曇後時々雨",
+    "214": "曇後雨", "215": "曇後一時雪", "216": "曇後時々雪", "217": "曇後雪", "218": "曇後雨か雪",
+    "219": "曇後雨か雷雨", "220": "曇朝夕一時雨", "221": "曇朝の内一時雨", "222": "曇夕方一時雨",
+    "223": "曇日中時々晴", "224": "曇昼頃から雨", "225": "曇夕方から雨", "226": "曇夜は雨",
+    "228": "曇昼頃から雪", "229": "曇夕方から雪", "230": "曇夜は雪", "231": "曇海上海岸は霧か霧雨",
+    "240": "曇時々雨で雷を伴う", "250": "曇時々雪で雷を伴う", "260": "曇一時雪か雨",
+    "270": "曇時々雪か雨", "281": "曇後雪か雨",
+    "300": "雨", "301": "雨時々晴", "302": "雨時々止む", "303": "雨時々雪", "304": "雨か雪",
+    "306": "大雨", "308": "雨で暴風を伴う", "309": "雨一時雪", "311": "雨後晴", "313": "雨後曇",
+    "314": "雨後時々雪", "315": "雨後雪", "316": "雨か雪後晴", "317": "雨か雪後曇",
+    "320": "朝の内雨後晴", "321": "朝の内雨後曇", "322": "雨朝晩一時雪", "323": "雨昼頃から晴",
+    "324": "雨夕方から晴", "325": "雨夜は晴", "326": "雨夕方から雪", "327": "雨夜は雪",
+    "328": "雨一時強く降る", "329": "雨一時みぞれ", "340": "雪か雨", "350": "雨で雷を伴う",
+    "361": "雪か雨後晴", "371": "雪か雨後曇",
+    "400": "雪", "401": "雪時々晴", "402": "雪時々止む", "403": "雪時々雨", "405": "大雪",
+    "406": "風雪強い", "407": "暴風雪", "409": "雪一時雨", "411": "雪後晴", "413": "雪後曇",
+    "414": "雪後雨", "420": "朝の内雪後晴", "421": "朝の内雪後曇", "422": "雪昼頃から雨",
+    "423": "雪夕方から雨", "425": "雪一時強く降る", "426": "雪後みぞれ", "427": "雪一時みぞれ",
+    "430": "みぞれ", "450": "雪で雷を伴う",
+}
+
+
+class SeriesIndex:
+    """
+    1つの timeSeries について 地域コード → エリア の索引を持つ
+    1回しか引かれない系列（予報JSONをそのまま渡したときなど）では索引を作る方が遅いので、
+    最初の1回は先頭から探し、2回目に引かれたときに索引を作る
+    """
+    __slots__ = ("time_defines", "slots_by_date", "areas", "first", "_by_code", "_lookups")
+
+    def __init__(self, series):
+        self.areas = series.get("areas", [])
+        self.time_defines = series.get("timeDefines", [])
+        # 日付 → その日に当たる timeDefines の位置（全地域で共通なので1回だけ作る）
+        self.slots_by_date = {}
+        for i, time_define in enumerate(self.time_defines):
+            self.slots_by_date.setdefault(time_define[:10], []).append(i)
+        self.first = self.areas[0] if self.areas else {}
+        self._by_code = None
+        self._lookups = 0
+
+    def find(self, area_code):
+        """地域コードが一致するエリア（無ければ先頭のエリア）"""
+        if self._by_code is None:
+            self._lookups += 1
+            if self._lookups == 1:
+                return next((a for a in self.areas if a["area"]["code"] == area_code), self.first)
+            self._by_code = {}
+            for a in self.areas:
+                self._by_code.setdefault(a["area"]["code"], a)  # 先頭から探したときと同じく先に出てきた方を使う
+        return self._by_code.get(area_code, self.first)
+
+
+class ForecastIndex:
+    """
+    予報JSON 1件分の索引
+    timeSeries ごとの索引を使い回し、同じ予報区の地域はこれを渡して取り出す
+    """
+    __slots__ = ("today", "weekly")
+
+    def __init__(self, data):
+        self.today = [SeriesIndex(s) for s in data[0]["timeSeries"]] if data else []
+        self.weekly = [SeriesIndex(s) for s in data[1]["timeSeries"]] if len(data) > 1 else []
+
+
+def index_forecast(data):
+    """予報JSON（またはすでに作った索引）から ForecastIndex を返す"""
+    return data if isinstance(data, ForecastIndex) else ForecastIndex(data)
+
+
+def extract_weekly_forecast(data, area_code):
+    """
+    週間予報（data[1]）を取り出す（data は予報JSON か ForecastIndex）
+    戻り値: (area_code, target_date, weather_code, pop, temp_min, temp_max) のリスト
+    """
+    week_ts = index_forecast(data).weekly
+    if not week_ts:
+        return []
+
+    w_weather = week_ts[0].find(area_code)
+    w_temp = week_ts[1].find(area_code) if len(week_ts) > 1 else {}
+
+    time_defines = week_ts[0].time_defines
+    n = len(time_defines)
+    codes = w_weather.get("weatherCodes", ["100"] * n)
+    pops = w_weather.get("pops", ["--"] * n)
+    temps_min = w_temp.get("tempsMin", ["--"] * n)
+    temps_max = w_temp.get("tempsMax", ["--"] * n)
+
+    return [
+        (area_code, date_raw[:10], codes[i], pops[i] or "--", temps_min[i] or "--", temps_max[i] or "--")
+        for i, date_raw in enumerate(time_defines)
+    ]
+
+
+def _values_at(values, slots):
+    """slots の位置の値のうち、空でないものを順番に返す"""
+    return [values[i] for i in slots if i < len(values) and values[i] not in (None, "", "--")]
+
+
+def _first(values):
+    return values[0] if values else None
+
+
+def _max_pop(values):
+    """1日分の降水確率（6時間ごと）のうち最大のもの"""
+    numbers = []
+    for value in values:
+        try:
+            numbers.append(int(value))
+        except (TypeError, ValueError):
+            pass
+    return max(numbers) if numbers else None
+
+
+def extract_daily_forecasts(data, area_code):
+    """
+    予報JSONに含まれるすべての日付の予報を取り出す（data は予報JSON か ForecastIndex）
+    各系列の timeDefines を日付でまとめて対応させる:
+      天気・降水確率（その日の最大）・気温（その日の最初の値が最低, 最後の値が最高）
+    直近の予報（data[0]）に無い日や値は週間予報（data[1]）で補う
+    戻り値: (area_code, target_date, weather_code, weather_text, temp_max, temp_min, pop) のリスト（日付順）
+    """
+    index = index_forecast(data)
+    days = {}  # date -> [weather_code, weather_text, temp_max, temp_min, pop]
+
+    def fill(date, pos, value):
+        day = days.setdefault(date, [None] * 5)
+        if day[pos] is None and value is not None:
+            day[pos] = value
+
+    ts_base = index.today
+    if ts_base:
+        area_w = ts_base[0].find(area_code)
+        codes = area_w.get("weatherCodes", [])
+        texts = area_w.get("weathers", [])
+        for date, slots in ts_base[0].slots_by_date.items():
+            fill(date, 0, _first(_values_at(codes, slots)))
+            fill(date, 1, _first(_values_at(texts, slots)))
+    if len(ts_base) > 1:
+        pops = ts_base[1].find(area_code).get("pops", [])
+        for date, slots in ts_base[1].slots_by_date.items():
+            fill(date, 4, _max_pop(_values_at(pops, slots)))
+    if len(ts_base) > 2:
+        temps = ts_base[2].find(area_code).get("temps", [])
+        for date, slots in ts_base[2].slots_by_date.items():
+            values = _values_at(temps, slots)
+            if len(values) >= 2:
+                fill(date, 2, values[-1])
+                fill(date, 3, values[0])
+            elif values:  # 朝取得した場合などはMaxしかない場合がある
+                fill(date, 2, values[0])
+
+    week_ts = index.weekly
+    if week_ts:
+        w_weather = week_ts[0].find(area_code)
+        codes = w_weather.get("weatherCodes", [])
+        pops = w_weather.get("pops", [])
+        for date, slots in week_ts[0].slots_by_date.items():
+            fill(date, 0, _first(_values_at(codes, slots)))
+            fill(date, 4, _max_pop(_values_at(pops, slots)))
+    if len(week_ts) > 1:
+        w_temp = week_ts[1].find(area_code)
+        temps_min = w_temp.get("tempsMin", [])
+        temps_max = w_temp.get("tempsMax", [])
+        for date, slots in week_ts[1].slots_by_date.items():
+            fill(date, 2, _first(_values_at(temps_max, slots)))
+            fill(date, 3, _first(_values_at(temps_min, slots)))
+
+    rows = []
+    for date in sorted(days):
+        w_code, w_text, temp_max, temp_min, pop = days[date]
+        if w_code is None:
+            continue  # 天気の無い日（気温だけの系列の端など）は保存しない
+        rows.append((area_code, date, w_code, w_text or WEATHER_CODE_TEXT.get(w_code), temp_max, temp_min, pop))
+    return rows
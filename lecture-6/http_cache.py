@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache")
+DEFAULT_TTL = 600                      # 再検証なしで使う期間(秒)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024   # ディスク上のキャッシュ容量の上限
+
+
+# --- ETag / Last-Modified による条件付きGETのディスクキャッシュ ---
+class HttpCache:
+    """
+    JSONレスポンスをディスクに保存し、TTLを過ぎたら条件付きGETで再検証する
+    304が返った場合は保存済みのパース結果をそのまま返す（再パースしない）
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._index = self._load_index()   # key -> メタデータ(url, etag, last_modified, stored_at, accessed_at, size)
+        self._parsed = {}                  # key -> パース済みのJSON（プロセス内のみ）
+        self.hits = 0          # TTL内でネットワークに出なかった回数
+        self.misses = 0        # 本文をダウンロードした回数
+        self.revalidated = 0   # 304で本文のダウンロードを省略できた回数
+
+    # --- 内部処理 ---
+    def _key(self, url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # 本文ファイルが消えているエントリは捨てる
+        return {k: v for k, v in index.items() if os.path.exists(self._body_path(k))}
+
+    def _save_index(self):
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path())
+
+    def _read_parsed(self, key):
+        if key not in self._parsed:
+            with open(self._body_path(key), "rb") as f:
+                self._parsed[key] = json.loads(f.read())
+        return self._parsed[key]
+
+    def _store(self, key, url, res):
+        body = res.content
+        data = json.loads(body)
+        with open(self._body_path(key), "wb") as f:
+            f.write(body)
+        now = time.time()
+        self._index[key] = {
+            "url": url,
+            "etag": res.headers.get("ETag"),
+            "last_modified": res.headers.get("Last-Modified"),
+            "stored_at": now,
+            "accessed_at": now,
+            "size": len(body),
+        }
+        self._parsed[key] = data
+        self._evict()
+        return data
+
+    def _evict(self):
+        """容量の上限を超えたら、最後に使われた時刻が古いものから削除する"""
+        total = sum(meta["size"] for meta in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]["accessed_at"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._index.pop(key)["size"]
+            self._parsed.pop(key, None)
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+
+    # --- 公開API ---
+    def get_json(self, url, session=None, timeout=None, ttl=None):
+        """キャッシュを通してURLのJSONを取得する"""
+        session = session or requests
+        ttl = self.ttl if ttl is None else ttl
+        key = self._key(url)
+
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is not None and time.time() - meta["stored_at"] < ttl:
+                try:
+                    data = self._read_parsed(key)
+                    meta["accessed_at"] = time.time()
+                    self.hits += 1
+                    return data
+                except (OSError, ValueError):
+                    meta = None
+
+            headers = {}
+            if meta is not None:
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+
+        # 通信中はロックを持たない（他のURLの取得を妨げないため）
+        res = session.get(url, headers=headers, timeout=timeout)
+
+        if res.status_code == 304:
+            with self._lock:
+                if key in self._index:
+                    try:
+                        data = self._read_parsed(key)
+                        now = time.time()
+                        self._index[key]["stored_at"] = now
+                        self._index[key]["accessed_at"] = now
+                        self.revalidated += 1
+                        self._save_index()
+                        return data
+                    except (OSError, ValueError):
+                        pass
+            # 手元のデータが消えたり壊れたりしていれば、ロックを外したまま条件なしで取り直す
+            res = session.get(url, timeout=timeout)
+
+        res.raise_for_status()
+        with self._lock:
+            data = self._store(key, url, res)
+            self.misses += 1
+            self._save_index()
+            return data
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "entries": len(self._index),
+                "bytes": sum(meta["size"] for meta in self._index.values()),
+            }
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    os.remove(self._body_path(key))
+                except OSError:
+                    pass
+            self._index.clear()
+            self._parsed.clear()
+            self._save_index()
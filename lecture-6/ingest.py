@@ -0,0 +1,254 @@
+"""
+予報データの取り込み（取得 → パース → DB保存）
+GUIを起動せずに実行できるので、cron や systemd からも使える
+
+使い方:
+    python ingest.py                         # 1回だけ同期
+    python ingest.py --areas 130010,270000   # 一部の地域だけ同期
+    python ingest.py --dry-run               # DBに書き込まずに取得・パースだけ行う
+    python ingest.py --daemon --interval 1800
+    python ingest.py --daemon --record jma.archive   # 取得したJSONをアーカイブに記録し続ける
+    python ingest.py --replay jma.archive            # 記録済みの全期間をネットワークなしで一括取り込み
+"""
+import argparse
+import signal
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from forecast_parser import extract_daily_forecasts, extract_weekly_forecast, index_forecast
+from http_cache import HttpCache
+from jma_archive import ArchiveRecorder, ArchiveReplayer, ForecastArchive
+from jma_fetch import DEFAULT_MAX_WORKERS, ForecastFetcher, JMA_BASE_URL, REGION_CONF_URL, flatten_region_config
+from sync_scheduler import SyncScheduler
+from weather_db import WeatherDatabase
+
+# --- 設定値 ---
+DB_NAME = "weather_intelligence.db"
+REGION_CONF_TTL = 24 * 60 * 60  # area.json はほとんど変わらないので1日は再検証しない
+
+# 観測地点（ID, 地域コード, 表示名, Y座標, X座標）
+# 初期データとしてDBに登録します
+INITIAL_MONITOR_POINTS = [
+    ("016000", "016010", "札幌", 40, 620),
+    ("015000", "015010", "釧路", 70, 730),
+    ("040000", "040010", "仙台", 230, 590),
+    ("150000", "150010", "新潟", 250, 480),
+    ("130000", "130010", "東京", 360, 560),
+    ("230000", "230010", "名古屋", 390, 450),
+    ("170000", "170010", "金沢", 290, 380),
+    ("270000", "270000", "大阪", 410, 360),
+    ("340000", "340010", "広島", 410, 240),
+    ("390000", "390010", "高知", 520, 280),
+    ("400000", "400010", "福岡", 410, 100),
+    ("460100", "460100", "鹿児島", 530, 80),
+    ("471000", "471010", "那覇", 630, 210),
+]
+
+# 1回の取り込みの結果
+IngestResult = namedtuple("IngestResult", [
+    "sync_date",       # 保存した予報の対象日
+    "areas",           # 対象地域数
+    "offices",         # 取得した予報区の数（=HTTPリクエスト数）
+    "saved_requests",  # 予報区単位にまとめて省略したリクエスト数
+    "rows",            # 保存した（dry-runでは保存するはずだった）日ごとの予報の行数（地域数 × 日数）
+    "weekly_rows",     # 同じく週間予報の行数
+    "errors",          # 取得・パースに失敗した地域数
+    "elapsed",         # 所要時間(秒)
+])
+
+
+# --- 地域階層 ---
+
+def refresh_region_tree(db, fetcher):
+    """地域階層（area.json）を取得してDBに保存"""
+    config = fetcher.fetch_json(REGION_CONF_URL, ttl=REGION_CONF_TTL)
+    db.replace_regions(flatten_region_config(config))
+
+
+def region_tree_is_stale(db):
+    fetched_at = db.get_regions_fetched_at()
+    return fetched_at is None or datetime.now() - fetched_at > timedelta(seconds=REGION_CONF_TTL)
+
+
+# --- 予報の取り込み ---
+
+def ingest_forecasts(db, fetcher, area_codes=None, dry_run=False, as_of=None):
+    """
+    DBに登録された地域の予報を取得してDBに保存する
+    area_codes を指定するとその地域だけ、dry_run=True ならDBには書き込まない
+    as_of を指定すると、その日時に取得したデータとして保存する（記録済みデータの取り込み用）
+    """
+    start = time.perf_counter()
+    fetched_at = as_of.isoformat() if as_of else None
+    today_str = (as_of or datetime.now()).strftime("%Y-%m-%d")
+    areas = db.get_all_areas() # DBのマスタから取得
+    if area_codes:
+        wanted = set(area_codes)
+        areas = [a for a in areas if a["area_code"] in wanted]
+
+    rows = []  # 保存する予報データ（予報期間の全日付分, 最後に1トランザクションでまとめて保存）
+    weekly_rows = []  # 詳細ダイアログ用の週間予報
+    errors = 0
+    indexes = {}  # office_code -> ForecastIndex（予報区ごとに1回だけ作る）
+
+    # 全地域の予報JSONを並列に取得（全体の所要時間は最も遅い1件分程度になる）
+    for area, data, err in fetcher.fetch_areas(areas):
+        if err is not None:
+            print(f"Fetch Error {area['name']}: {err}")
+            errors += 1
+            continue
+
+        rid = area["area_code"]
+        try:
+            index = indexes.get(area["office_code"])
+            if index is None:
+                index = indexes[area["office_code"]] = index_forecast(data)
+            rows.extend(extract_daily_forecasts(index, rid))
+            weekly_rows.extend(extract_weekly_forecast(index, rid))
+        except Exception as e:
+            print(f"Parse Error {area['name']}: {e}")
+            errors += 1
+
+    # DBに一括保存 (Upsert)
+    if not dry_run:
+        db.upsert_forecasts(rows, fetched_at=fetched_at)
+        db.replace_weekly_forecasts(weekly_rows, fetched_at=fetched_at)
+
+    return IngestResult(
+        sync_date=today_str,
+        areas=len(areas),
+        offices=len(areas) - fetcher.last_saved_requests,
+        saved_requests=fetcher.last_saved_requests,
+        rows=len(rows),
+        weekly_rows=len(weekly_rows),
+        errors=errors,
+        elapsed=time.perf_counter() - start,
+    )
+
+
+def ingest_archive(db, fetcher, replayer, area_codes=None, since=None, until=None, dry_run=False):
+    """
+    アーカイブに記録された同期の回ごとに、その時点の予報を古い順に取り込む
+    fetcher は replayer をキャッシュとして使う ForecastFetcher（ネットワークには接続しない）
+    """
+    for as_of in replayer.archive.snapshot_times(since, until):
+        replayer.as_of = as_of
+        yield ingest_forecasts(db, fetcher, area_codes, dry_run=dry_run, as_of=as_of)
+
+
+def format_result(result, cache=None):
+    """取り込み結果を1行の文字列にする"""
+    rate = result.areas / result.elapsed if result.elapsed > 0 else 0.0
+    text = (
+        f"{result.sync_date}: {result.areas} areas / {result.offices} requests "
+        f"({result.saved_requests} saved), {result.rows} rows + {result.weekly_rows} weekly rows, "
+        f"{result.errors} errors, {result.elapsed:.2f}s ({rate:.1f} areas/s)"
+    )
+    if cache is not None:
+        text += f", cache {cache.stats()}"
+    return text
+
+
+# --- コマンドライン ---
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="気象庁の予報を取得して WeatherDatabase に保存する")
+    parser.add_argument("--db", default=DB_NAME, help="SQLiteファイルのパス")
+    parser.add_argument("--areas", default="", help="同期する地域コード（カンマ区切り, 省略時は全地域）")
+    parser.add_argument("--base-url", default=JMA_BASE_URL, help="予報JSONの取得元（検証用のスタブサーバーなど）")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="同時接続数")
+    parser.add_argument("--dry-run", action="store_true", help="DBに書き込まない")
+    parser.add_argument("--no-cache", action="store_true", help="HTTPキャッシュを使わない")
+    parser.add_argument("--no-history", action="store_true", help="予報の履歴を残さない")
+    parser.add_argument("--daemon", action="store_true", help="終了せずに定期的に同期し続ける")
+    parser.add_argument("--interval", type=float, default=30 * 60, help="デーモンモードの同期間隔(秒)")
+    parser.add_argument("--record", metavar="ARCHIVE", help="取得したJSONをこのアーカイブに記録する")
+    parser.add_argument("--replay", metavar="ARCHIVE", help="ネットワークの代わりにアーカイブの記録をすべて取り込む")
+    parser.add_argument("--since", help="--replay で取り込む期間の開始日時（ISO形式）")
+    parser.add_argument("--until", help="--replay で取り込む期間の終了日時（ISO形式）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    area_codes = [c.strip() for c in args.areas.split(",") if c.strip()]
+
+    db = WeatherDatabase(args.db, keep_history=not args.no_history)
+    if not db.get_all_areas():
+        db.upsert_area(INITIAL_MONITOR_POINTS) # マスタデータの投入
+    cache = None if args.no_cache else HttpCache()
+    archive = ForecastArchive(args.replay or args.record) if args.replay or args.record else None
+    if args.replay:
+        cache = ArchiveReplayer(archive)
+    elif args.record:
+        cache = ArchiveRecorder(archive, cache)
+    fetcher = ForecastFetcher(base_url=args.base_url, max_workers=args.workers, cache=cache)
+
+    def run():
+        if not args.dry_run and region_tree_is_stale(db):
+            try:
+                refresh_region_tree(db, fetcher)
+            except Exception as e:
+                print(f"Region Fetch Error: {e}")
+        result = ingest_forecasts(db, fetcher, area_codes, dry_run=args.dry_run)
+        print(format_result(result, cache), flush=True)
+        # デーモンモードでは1件も取れなかった回を失敗として扱い、間隔を空けて再試行させる
+        if args.daemon and result.areas and not result.rows:
+            raise RuntimeError("no forecasts could be fetched")
+        return result
+
+    try:
+        if args.replay:
+            return replay(args, db, fetcher, cache, area_codes)
+        if not args.daemon:
+            result = run()
+            return 0 if result.rows or not result.areas else 1
+
+        # デーモンモード：SIGTERM / Ctrl+C で止まるまで定期的に同期する
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+        scheduler = SyncScheduler(
+            run, interval=args.interval,
+            on_error=lambda e: print(f"Sync Error: {e}", flush=True),
+        )
+        scheduler.start(run_immediately=True)
+        try:
+            while not stopped.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        scheduler.stop()
+        return 0
+    finally:
+        fetcher.close()
+        db.close()
+        if archive is not None:
+            archive.close()
+
+
+def replay(args, db, fetcher, replayer, area_codes):
+    """アーカイブの記録を古い順にすべて取り込み、全体の処理速度を表示する"""
+    try:
+        refresh_region_tree(db, fetcher)  # 最新の記録の地域階層
+    except Exception as e:
+        print(f"Region Replay Error: {e}")
+
+    start = time.perf_counter()
+    rounds = rows = errors = 0
+    for result in ingest_archive(db, fetcher, replayer, area_codes, args.since, args.until, args.dry_run):
+        print(format_result(result), flush=True)
+        rounds += 1
+        rows += result.rows + result.weekly_rows
+        errors += result.errors
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"replayed {rounds} rounds: {rows} rows, {errors} errors, {elapsed:.2f}s ({rate:.0f} rows/s), "
+          f"archive {replayer.archive.stats()}")
+    return 0 if rounds and not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+import requests
+
+from weather_db import SQLITE_PRAGMAS
+
+DEFAULT_ROUND_GAP = 60   # この秒数より間隔の短い記録は同じ回の同期とみなす
+
+
+class ArchiveMiss(KeyError):
+    """アーカイブにそのURLの記録が無い"""
+
+
+# --- 気象庁レスポンスのアーカイブ（記録と再生） ---
+class ForecastArchive:
+    """
+    取得したJSONを URL・記録日時ごとに圧縮して SQLite に保存する
+    前回の記録と内容が同じレスポンスは保存しないので、定期同期で記録し続けても大きくならない
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            self._conn.execute(pragma)
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT NOT NULL,
+                    recorded_at TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    PRIMARY KEY (url, recorded_at)
+                ) WITHOUT ROWID
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_recorded_at ON responses (recorded_at)')
+        # URLごとの最新の記録のハッシュ（同じ内容を何度も保存しないため）
+        self._last_digest = dict(self._conn.execute('''
+            SELECT url, digest FROM responses r
+            WHERE recorded_at = (SELECT MAX(recorded_at) FROM responses WHERE url = r.url)
+        '''))
+        self._parsed = {}  # url -> (recorded_at, パース済みのJSON)（直近に再生したものだけ）
+
+    def record(self, url, data, recorded_at=None):
+        """JSONを記録する（前回と同じ内容なら何もしない）。保存したら True"""
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest()
+        if isinstance(recorded_at, datetime):
+            recorded_at = recorded_at.isoformat()
+        with self._lock:
+            if self._last_digest.get(url) == digest:
+                return False
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO responses (url, recorded_at, digest, body) VALUES (?, ?, ?, ?)',
+                    (url, recorded_at or datetime.now().isoformat(), digest, zlib.compress(body, 9)),
+                )
+            self._last_digest[url] = digest
+            return True
+
+    def lookup(self, url, as_of=None):
+        """
+        時刻 as_of の時点で最新だった記録を返す（省略時は最新の記録）
+        戻り値: (recorded_at, パース済みのJSON)。記録が無ければ ArchiveMiss
+        """
+        if isinstance(as_of, datetime):
+            as_of = as_of.isoformat()
+        with self._lock:
+            row = self._conn.execute('''
+                SELECT recorded_at, body FROM responses
+                WHERE url = ? AND recorded_at <= ?
+                ORDER BY recorded_at DESC LIMIT 1
+            ''', (url, as_of or "9999-12-31")).fetchone()
+            if row is None:
+                raise ArchiveMiss(url)
+            cached = self._parsed.get(url)
+            if cached is None or cached[0] != row[0]:
+                cached = self._parsed[url] = (row[0], json.loads(zlib.decompress(row[1])))
+            return cached
+
+    def snapshot_times(self, since=None, until=None, gap=DEFAULT_ROUND_GAP):
+        """
+        同期1回分ごとの記録日時（その回の最後の記録日時）を古い順に返す
+        間隔が gap 秒未満の記録は同じ回とみなす
+        """
+        since, until = (t.isoformat() if isinstance(t, datetime) else t for t in (since, until))
+        with self._lock:
+            times = [datetime.fromisoformat(r[0]) for r in self._conn.execute(
+                'SELECT DISTINCT recorded_at FROM responses WHERE recorded_at BETWEEN ? AND ? ORDER BY recorded_at',
+                (since or "", until or "9999-12-31"),
+            )]
+        rounds = []
+        for t in times:
+            if rounds and t - rounds[-1] < timedelta(seconds=gap):
+                rounds[-1] = t
+            else:
+                rounds.append(t)
+        return rounds
+
+    def stats(self):
+        with self._lock:
+            urls, records, stored, first, last = self._conn.execute('''
+                SELECT COUNT(DISTINCT url), COUNT(*), COALESCE(SUM(LENGTH(body)), 0), MIN(recorded_at), MAX(recorded_at)
+                FROM responses
+            ''').fetchone()
+        return {"urls": urls, "records": records, "bytes": stored, "first": first, "last": last}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ArchiveRecorder:
+    """
+    取得したJSONをアーカイブに記録しながら返す
+    HttpCache と同じ get_json を持つので、ForecastFetcher(cache=...) にそのまま渡せる
+    """
+
+    def __init__(self, archive, cache=None):
+        self.archive = archive
+        self.cache = cache  # HttpCache を重ねると、取得自体はキャッシュを通して行う
+        self.recorded = 0
+
+    def get_json(self, url, session=None, timeout=None, ttl=None):
+        if self.cache is not None:
+            data = self.cache.get_json(url, session=session, timeout=timeout, ttl=ttl)
+        else:
+            res = (session or requests).get(url, timeout=timeout)
+            res.raise_for_status()
+            data = res.json()
+        if self.archive.record(url, data):
+            self.recorded += 1
+        return data
+
+    def stats(self):
+        stats = dict(self.cache.stats()) if self.cache is not None else {}
+        stats["recorded"] = self.recorded
+        return stats
+
+
+class ArchiveReplayer:
+    """
+    ネットワークに接続せず、アーカイブの記録を返す（HttpCache と同じ get_json を持つ）
+    as_of を指定するとその時点の記録を、None なら最新の記録を返す
+    """
+
+    def __init__(self, archive, as_of=None):
+        self.archive = archive
+        self.as_of = as_of
+        self.hits = 0
+        self.misses = 0
+
+    def get_json(self, url, session=None, timeout=None, ttl=None):
+        try:
+            _, data = self.archive.lookup(url, self.as_of)
+        except ArchiveMiss:
+            self.misses += 1
+            raise
+        self.hits += 1
+        return data
+
+    def stats(self):
+        return {"replayed": self.hits, "missing": self.misses}
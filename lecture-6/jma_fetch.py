@@ -0,0 +1,126 @@
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+
+# --- 設定値とエンドポイント ---
+JMA_BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/"
+REGION_CONF_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
+
+DEFAULT_MAX_WORKERS = 8   # 同時接続数の上限
+DEFAULT_TIMEOUT = 10      # 1リクエストあたりのタイムアウト(秒)
+DEFAULT_RETRIES = 2       # 通信エラー・429・5xx などのときの再試行回数
+DEFAULT_BACKOFF = 0.5     # 再試行までの待ち時間(秒, 回数に応じて倍増)
+
+
+def is_retryable(error):
+    """
+    再試行すれば直る見込みのある失敗か
+    接続エラー・タイムアウト・429・5xx と、途中で切れた（壊れた）JSON は再試行し、404 などのそれ以外の 4xx はすぐに諦める
+    """
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return status is None or status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, ValueError))
+
+
+# --- 予報データの並列取得エンジン ---
+class ForecastFetcher:
+    def __init__(self, base_url=JMA_BASE_URL, max_workers=DEFAULT_MAX_WORKERS,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 cache=None):
+        self.base_url = base_url
+        self.cache = cache  # HttpCache を渡すと条件付きGETで取得する
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.backoff = backoff
+
+        # 予報区単位でまとめたことで省略できたHTTPリクエスト数（直近の同期 / 累計）
+        self.last_saved_requests = 0
+        self.saved_requests = 0
+
+        # コネクションを使い回すため、同時接続数と同じ大きさのプールを持つSessionを用意
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers, pool_maxsize=self.max_workers
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def office_url(self, office_code):
+        return f"{self.base_url}{office_code}.json"
+
+    def fetch_json(self, url, ttl=None):
+        """URLからJSONを取得（タイムアウト・再試行つき。再試行するのは is_retryable な失敗だけ）"""
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                if self.cache is not None:
+                    return self.cache.get_json(url, session=self.session, timeout=self.timeout, ttl=ttl)
+                res = self.session.get(url, timeout=self.timeout)
+                res.raise_for_status()
+                return res.json()
+            except (requests.RequestException, ValueError) as e:
+                if not is_retryable(e):
+                    raise
+                last_error = e
+                if attempt < self.retries:
+                    time.sleep(self.backoff * (2 ** attempt))
+        raise last_error
+
+    def fetch_office(self, office_code):
+        return self.fetch_json(self.office_url(office_code))
+
+    def fetch_offices(self, office_codes):
+        """
+        予報区（office_code）ごとのJSONを並列に取得する
+        戻り値: {office_code: (data, error)}
+        """
+        def task(office_code):
+            try:
+                return office_code, (self.fetch_office(office_code), None)
+            except Exception as e:
+                return office_code, (None, e)
+
+        office_codes = list(dict.fromkeys(office_codes))
+        if not office_codes:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(office_codes))) as pool:
+            return dict(pool.map(task, office_codes))
+
+    def fetch_areas(self, areas):
+        """
+        地域ごとの予報JSONを並列に取得する
+        同じ office_code を持つ地域はJSONを1回だけ取得・パースし、結果を全地域で共有する
+        戻り値: (area, data, error) のリスト（入力と同じ順番）
+        """
+        results = self.fetch_offices(area["office_code"] for area in areas)
+
+        # 重複をまとめたことで省略できたリクエスト数
+        self.last_saved_requests = len(areas) - len(results)
+        self.saved_requests += self.last_saved_requests
+
+        return [(area, *results[area["office_code"]]) for area in areas]
+
+    def close(self):
+        self.session.close()
+
+
+def flatten_region_config(config):
+    """
+    area.json を (level, code, parent_code, name, sort_order) の行に平坦化する
+    centers → offices → class10s の親子関係と、area.json 内の並び順を保持する
+    """
+    rows = []
+    for c_order, (c_id, c_data) in enumerate(config["centers"].items()):
+        rows.append(("center", c_id, None, c_data["name"], c_order))
+        for o_order, o_id in enumerate(c_data.get("children", [])):
+            office = config["offices"].get(o_id)
+            if office is None:
+                continue
+            rows.append(("office", o_id, c_id, office["name"], o_order))
+            for r_order, r_id in enumerate(office.get("children", [])):
+                if r_id in config["class10s"]:
+                    rows.append(("class10", r_id, o_id, config["class10s"][r_id]["name"], r_order))
+    return rows
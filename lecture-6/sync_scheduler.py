@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+
+DEFAULT_INTERVAL = 30 * 60        # 定期同期の間隔(秒)
+DEFAULT_JITTER = 0.1              # 間隔に加えるゆらぎ（間隔に対する割合）
+DEFAULT_RETRY_DELAY = 60          # 失敗したときの最初の再試行までの待ち時間(秒)
+DEFAULT_MAX_BACKOFF = 60 * 60     # 失敗が続いたときの待ち時間の上限(秒)
+
+
+# --- バックグラウンド定期同期 ---
+class SyncScheduler:
+    """
+    sync_func を専用スレッドで定期的に実行する
+    成功時は on_result(結果)、失敗時は on_error(例外) を同じスレッドから呼ぶ
+    stop() の後、実行中の同期が終わってスレッドを抜けるときに on_stop() を呼ぶ（後片付け用）
+    失敗が続くと待ち時間を倍々に伸ばし（上限 max_backoff）、成功すると通常の間隔に戻す
+    """
+
+    def __init__(self, sync_func, interval=DEFAULT_INTERVAL, jitter=DEFAULT_JITTER,
+                 retry_delay=DEFAULT_RETRY_DELAY, max_backoff=DEFAULT_MAX_BACKOFF,
+                 on_result=None, on_error=None, on_stop=None):
+        self.sync_func = sync_func
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_stop = on_stop
+
+        self.failures = 0          # 連続失敗回数
+        self.last_run_at = None    # 最後に同期を終えた時刻
+        self.running = False       # 同期の実行中かどうか
+
+        self._thread = None
+        self._wake = threading.Event()   # 手動更新の要求
+        self._stop = threading.Event()
+
+    def next_delay(self):
+        """次の同期までの待ち時間(秒)"""
+        if self.failures:
+            delay = min(self.retry_delay * (2 ** (self.failures - 1)), self.max_backoff)
+        else:
+            delay = self.interval
+        # 複数の端末が同時にアクセスしないよう、待ち時間を少しずらす
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def start(self, run_immediately=True):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        if run_immediately:
+            self._wake.set()
+        self._thread = threading.Thread(target=self._loop, name="sync-scheduler", daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        """すぐに同期する（実行中なら終わった後にもう一度実行する）"""
+        self._wake.set()
+
+    def stop(self, timeout=None, wait=True):
+        """
+        定期同期を止める
+        wait=False なら止まるのを待たずに戻る（画面のスレッドから呼ぶとき）。実行中の同期はそのまま最後まで走る
+        """
+        thread = self._thread
+        alive = thread is not None and thread.is_alive()  # _stop を立てる前に見る（立てた後だとスレッドが抜けている場合がある）
+        self._stop.set()
+        self._wake.set()
+        if not alive:
+            self._thread = None
+            self._stopped()  # スレッドが無いので、ここで後片付けをする
+        elif wait:
+            thread.join(timeout)
+            if not thread.is_alive():
+                self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.next_delay())
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self._run_once()
+            except Exception as e:
+                # コールバック側の例外でスケジューラが止まらないようにする
+                print(f"Sync Scheduler Error: {e}")
+        self._stopped()
+
+    def _stopped(self):
+        if self.on_stop is None:
+            return
+        try:
+            self.on_stop()
+        except Exception as e:
+            print(f"Sync Scheduler Error: {e}")
+
+    def _run_once(self):
+        self.running = True
+        try:
+            result = self.sync_func()
+        except Exception as e:
+            self.failures += 1
+            if self.on_error is not None:
+                self.on_error(e)
+        else:
+            self.failures = 0
+            if self.on_result is not None:
+                self.on_result(result)
+        finally:
+            self.running = False
+            self.last_run_at = time.time()
@@ -0,0 +1,139 @@
+import pytest
+
+from forecast_parser import ForecastIndex, SeriesIndex, extract_daily_forecasts, extract_weekly_forecast
+
+
+def area(code, name="", **values):
+    return {"area": {"name": name, "code": code}, **values}
+
+
+def make_forecast():
+    """気象庁の予報JSONと同じ形の小さなデータ（東京地方・伊豆諸島北部の2地域, 直近3日 + 週間4日）"""
+    return [
+        {"timeSeries": [
+            {
+                "timeDefines": ["2026-10-18T11:00:00+09:00", "2026-10-19T00:00:00+09:00", "2026-10-20T00:00:00+09:00"],
+                "areas": [
+                    area("130010", "東京地方", weatherCodes=["101", "200", "300"], weathers=["晴れ　時々　くもり", "くもり", "雨"]),
+                    area("130020", "伊豆諸島北部", weatherCodes=["200", "202", "300"], weathers=["くもり", "くもり　一時　雨", "雨"]),
+                ],
+            },
+            {
+                "timeDefines": ["2026-10-18T12:00:00+09:00", "2026-10-18T18:00:00+09:00",
+                                "2026-10-19T00:00:00+09:00", "2026-10-19T06:00:00+09:00",
+                                "2026-10-19T12:00:00+09:00", "2026-10-19T18:00:00+09:00"],
+                "areas": [
+                    area("130010", pops=["10", "20", "30", "50", "40", "--"]),
+                    area("130020", pops=["30", "40", "60", "70", "50", "40"]),
+                ],
+            },
+            {
+                # 気温はアメダス地点ごと（地域コードとは一致しないので先頭の地点を使う）
+                "timeDefines": ["2026-10-19T00:00:00+09:00", "2026-10-19T09:00:00+09:00"],
+                "areas": [area("44132", "東京", temps=["14", "22"]), area("44172", "大島", temps=["17", "21"])],
+            },
+        ]},
+        {"timeSeries": [
+            {
+                "timeDefines": ["2026-10-19T00:00:00+09:00", "2026-10-20T00:00:00+09:00",
+                                "2026-10-21T00:00:00+09:00", "2026-10-22T00:00:00+09:00"],
+                "areas": [area("130010", weatherCodes=["201", "302", "100", "101"], pops=["", "80", "10", "20"])],
+            },
+            {
+                "timeDefines": ["2026-10-19T00:00:00+09:00", "2026-10-20T00:00:00+09:00",
+                                "2026-10-21T00:00:00+09:00", "2026-10-22T00:00:00+09:00"],
+                "areas": [area("44132", "東京", tempsMin=["", "15", "13", "12"], tempsMax=["", "19", "23", "24"])],
+            },
+        ]},
+    ]
+
+
+@pytest.fixture(params=["json", "index"])
+def forecast(request):
+    """予報JSONそのものと ForecastIndex のどちらを渡しても同じ結果になること"""
+    data = make_forecast()
+    return data if request.param == "json" else ForecastIndex(data)
+
+
+def test_extract_daily_forecasts_covers_every_date(forecast):
+    assert extract_daily_forecasts(forecast, "130010") == [
+        ("130010", "2026-10-18", "101", "晴れ　時々　くもり", None, None, 20),
+        ("130010", "2026-10-19", "200", "くもり", "22", "14", 50),
+        ("130010", "2026-10-20", "300", "雨", "19", "15", 80),
+        ("130010", "2026-10-21", "100", "晴", "23", "13", 10),
+        ("130010", "2026-10-22", "101", "晴時々曇", "24", "12", 20),
+    ]
+
+
+def test_extract_daily_forecasts_uses_area_code_of_each_series(forecast):
+    rows = extract_daily_forecasts(forecast, "130020")
+    assert rows[0] == ("130020", "2026-10-18", "200", "くもり", None, None, 40)
+    assert rows[1] == ("130020", "2026-10-19", "202", "くもり　一時　雨", "22", "14", 70)
+
+
+def test_extract_daily_forecasts_falls_back_to_first_area():
+    data = make_forecast()
+    # 週間予報に無い地域は、その系列の先頭の地域で補う
+    assert [row[2] for row in extract_daily_forecasts(data, "130020")][2:] == ["300", "100", "101"]
+    # どの系列にも無い地域コードでも、先頭の地域の値で全部の日付を返す
+    unknown = extract_daily_forecasts(data, "999999")
+    assert [row[1:] for row in unknown] == [row[1:] for row in extract_daily_forecasts(data, "130010")]
+    assert {row[0] for row in unknown} == {"999999"}
+
+
+def test_extract_daily_forecasts_missing_temps_and_pops():
+    data = make_forecast()
+    del data[0]["timeSeries"][2]           # 直近の気温が無い
+    del data[1]["timeSeries"][1]           # 週間の気温も無い
+    data[0]["timeSeries"][1]["areas"][0]["pops"] = ["--", "--", "--", "--", "--", "--"]
+    data[1]["timeSeries"][0]["areas"][0].pop("pops")
+
+    rows = extract_daily_forecasts(data, "130010")
+    assert [row[1] for row in rows] == ["2026-10-18", "2026-10-19", "2026-10-20", "2026-10-21", "2026-10-22"]
+    assert all(row[4:] == (None, None, None) for row in rows)
+
+
+def test_extract_daily_forecasts_single_temp_is_max():
+    data = make_forecast()
+    # 朝に取得したときは当日の最高気温（9時）しか無い
+    data[0]["timeSeries"][2] = {
+        "timeDefines": ["2026-10-18T09:00:00+09:00"],
+        "areas": [area("44132", "東京", temps=["25"])],
+    }
+    assert extract_daily_forecasts(data, "130010")[0][4:6] == ("25", None)
+
+
+def test_extract_daily_forecasts_mismatched_time_defines_lengths():
+    data = make_forecast()
+    # 値の数が timeDefines より少ない・多い系列があっても、対応の取れる分だけを使う
+    data[0]["timeSeries"][0]["areas"][0]["weatherCodes"] = ["101", "200"]
+    data[0]["timeSeries"][0]["areas"][0]["weathers"] = ["晴れ"]
+    data[0]["timeSeries"][1]["areas"][0]["pops"] = ["10", "20", "30", "50", "40", "--", "90", "90"]
+
+    rows = {row[1]: row for row in extract_daily_forecasts(data, "130010")}
+    assert rows["2026-10-18"][2:4] == ("101", "晴れ")
+    assert rows["2026-10-19"][2:4] == ("200", "曇")    # 文言が無い日は天気コードから補う
+    assert rows["2026-10-20"][2:4] == ("302", "雨時々止む")  # 直近に無い日は週間予報で補う
+    assert rows["2026-10-19"][6] == 50
+
+
+def test_extract_daily_forecasts_empty_payload():
+    assert extract_daily_forecasts([], "130010") == []
+    assert extract_daily_forecasts([{"timeSeries": []}], "130010") == []
+
+
+def test_extract_weekly_forecast(forecast):
+    assert extract_weekly_forecast(forecast, "130010") == [
+        ("130010", "2026-10-19", "201", "--", "--", "--"),
+        ("130010", "2026-10-20", "302", "80", "15", "19"),
+        ("130010", "2026-10-21", "100", "10", "13", "23"),
+        ("130010", "2026-10-22", "101", "20", "12", "24"),
+    ]
+
+
+def test_series_index_find_is_the_same_before_and_after_indexing():
+    series = {"timeDefines": [], "areas": [area("130010", "A"), area("130020", "B"), area("130010", "C")]}
+    index = SeriesIndex(series)
+    # 1回目は先頭から探し、2回目以降は索引を引く（どちらも先に出てきたエリアと、無ければ先頭のエリア）
+    assert [index.find(code)["area"]["name"] for code in ("130010", "130010", "130020", "999999")] == ["A", "A", "B", "A"]
+    assert SeriesIndex({"areas": []}).find("130010") == {}
@@ -0,0 +1,137 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from http_cache import HttpCache
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Sat, 17 Oct 2026 00:00:00 GMT"
+PAYLOAD = {"centers": {"010100": {"name": "北海道地方"}}}
+
+
+def etag_server(stub_server):
+    """ETag と Last-Modified を返し、If-None-Match が一致すれば304を返すサーバー"""
+    def respond(path, headers):
+        if headers.get("If-None-Match") == ETAG:
+            return 304, {"ETag": ETAG}, b""
+        body = json.dumps(PAYLOAD).encode("utf-8")
+        return 200, {"Content-Type": "application/json", "ETag": ETAG, "Last-Modified": LAST_MODIFIED}, body
+
+    return stub_server(respond)
+
+
+def test_get_json_revalidates_with_etag(stub_server, tmp_path):
+    server = etag_server(stub_server)
+    cache = HttpCache(cache_dir=str(tmp_path), ttl=0)
+    url = f"{server.url}area.json"
+
+    assert cache.get_json(url) == PAYLOAD
+    assert cache.get_json(url) == PAYLOAD
+
+    first, second = (headers for _, headers in server.requests)
+    assert "If-None-Match" not in first
+    assert second["If-None-Match"] == ETAG
+    assert second["If-Modified-Since"] == LAST_MODIFIED
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["revalidated"]) == (0, 1, 1)
+
+
+def test_get_json_uses_cache_within_ttl(stub_server, tmp_path):
+    server = etag_server(stub_server)
+    cache = HttpCache(cache_dir=str(tmp_path), ttl=600)
+    url = f"{server.url}area.json"
+
+    cache.get_json(url)
+    assert cache.get_json(url) == PAYLOAD
+    assert len(server.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_get_json_revalidates_after_restart(stub_server, tmp_path):
+    server = etag_server(stub_server)
+    url = f"{server.url}area.json"
+    HttpCache(cache_dir=str(tmp_path), ttl=0).get_json(url)
+
+    # インデックスと本文はディスクに残るので、別インスタンスでも304で済む
+    cache = HttpCache(cache_dir=str(tmp_path), ttl=0)
+    assert cache.get_json(url) == PAYLOAD
+    assert cache.stats()["revalidated"] == 1
+    assert server.requests[-1][1]["If-None-Match"] == ETAG
+
+
+def test_get_json_refetches_when_body_is_broken(stub_server, tmp_path):
+    server = etag_server(stub_server)
+    cache = HttpCache(cache_dir=str(tmp_path), ttl=0)
+    url = f"{server.url}area.json"
+    cache.get_json(url)
+
+    # 手元の本文が壊れていれば、304を受けても条件なしで取り直す
+    (tmp_path / f"{cache._key(url)}.json").write_bytes(b"{broken")
+    cache._parsed.clear()
+    assert cache.get_json(url) == PAYLOAD
+    assert "If-None-Match" not in server.requests[-1][1]
+    assert cache.stats()["misses"] == 2
+
+
+def test_get_json_refetches_when_body_is_missing(stub_server, tmp_path):
+    server = etag_server(stub_server)
+    cache = HttpCache(cache_dir=str(tmp_path), ttl=0)
+    url = f"{server.url}area.json"
+    cache.get_json(url)
+
+    (tmp_path / f"{cache._key(url)}.json").unlink()
+    cache._parsed.clear()
+    assert cache.get_json(url) == PAYLOAD
+    assert [("If-None-Match" in headers) for _, headers in server.requests] == [False, True, False]
+    assert cache.stats()["revalidated"] == 0
+
+
+def test_refetch_after_broken_304_does_not_hold_the_lock(stub_server, tmp_path):
+    refetching, release = threading.Event(), threading.Event()
+    body = json.dumps(PAYLOAD).encode("utf-8")
+    refetch_started = {"value": False}
+
+    def respond(path, headers):
+        if path == "/broken.json":
+            if headers.get("If-None-Match") == ETAG:
+                return 304, {"ETag": ETAG}, b""
+            if refetch_started["value"]:
+                # 条件なしの取り直しは、テスト側が release するまで返さない
+                refetching.set()
+                release.wait(5)
+        return 200, {"Content-Type": "application/json", "ETag": ETAG}, body
+
+    server = stub_server(respond)
+    cache = HttpCache(cache_dir=str(tmp_path), ttl=600)
+    broken_url, other_url = f"{server.url}broken.json", f"{server.url}other.json"
+    cache.get_json(broken_url)
+    cache.get_json(other_url)
+
+    (tmp_path / f"{cache._key(broken_url)}.json").write_bytes(b"{broken")
+    cache._parsed.clear()
+    cache._index[cache._key(broken_url)]["stored_at"] = 0
+    refetch_started["value"] = True
+    worker = threading.Thread(target=cache.get_json, args=(broken_url,))
+    worker.start()
+    try:
+        assert refetching.wait(5)
+        # 取り直しの通信中でも、他のURLはキャッシュから返せる
+        other = threading.Thread(target=cache.get_json, args=(other_url,))
+        other.start()
+        other.join(2)
+        assert not other.is_alive()
+        assert cache.stats()["hits"] == 1
+    finally:
+        release.set()
+        worker.join(5)
+    assert cache.get_json(broken_url) == PAYLOAD
+
+
+def test_get_json_raises_on_error_status(stub_server, tmp_path):
+    server = stub_server(lambda path, headers: (500, {}, b""))
+    cache = HttpCache(cache_dir=str(tmp_path))
+    with pytest.raises(requests.HTTPError):
+        cache.get_json(f"{server.url}area.json")
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+import requests
+
+from http_cache import HttpCache
+from jma_fetch import ForecastFetcher
+
+PAYLOAD = [{"publishingOffice": "気象庁", "timeSeries": []}]
+
+
+def failing_then_ok(failures, status=503):
+    """最初の failures 回は status を返し、その後は PAYLOAD を返す"""
+    calls = {"count": 0}
+
+    def respond(path, headers):
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            return status, {}, b""
+        return 200, {"Content-Type": "application/json"}, json.dumps(PAYLOAD).encode("utf-8")
+
+    return respond
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_fetch_json_retries_until_success(stub_server, status):
+    server = stub_server(failing_then_ok(2, status))
+    fetcher = ForecastFetcher(base_url=server.url, retries=2, backoff=0)
+    try:
+        assert fetcher.fetch_office("130000") == PAYLOAD
+    finally:
+        fetcher.close()
+    assert [path for path, _ in server.requests] == ["/130000.json"] * 3
+
+
+def test_fetch_json_raises_last_error_after_retries(stub_server):
+    server = stub_server(failing_then_ok(3))
+    fetcher = ForecastFetcher(base_url=server.url, retries=2, backoff=0)
+    try:
+        with pytest.raises(requests.HTTPError):
+            fetcher.fetch_office("130000")
+    finally:
+        fetcher.close()
+    assert len(server.requests) == 3
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_fetch_json_does_not_retry_not_found(stub_server, tmp_path, use_cache):
+    server = stub_server(failing_then_ok(3, status=404))
+    cache = HttpCache(cache_dir=str(tmp_path)) if use_cache else None
+    fetcher = ForecastFetcher(base_url=server.url, retries=2, backoff=0, cache=cache)
+    try:
+        with pytest.raises(requests.HTTPError) as excinfo:
+            fetcher.fetch_office("130000")
+    finally:
+        fetcher.close()
+    # 404 は再試行しても直らないので、1回で諦める
+    assert excinfo.value.response.status_code == 404
+    assert len(server.requests) == 1
+
+
+def test_fetch_json_retries_invalid_json(stub_server):
+    calls = {"count": 0}
+
+    def respond(path, headers):
+        calls["count"] += 1
+        body = b"{broken" if calls["count"] == 1 else json.dumps(PAYLOAD).encode("utf-8")
+        return 200, {"Content-Type": "application/json"}, body
+
+    server = stub_server(respond)
+    fetcher = ForecastFetcher(base_url=server.url, retries=1, backoff=0)
+    try:
+        assert fetcher.fetch_office("130000") == PAYLOAD
+    finally:
+        fetcher.close()
+    assert len(server.requests) == 2
+
+
+def test_fetch_offices_reports_errors_per_office(stub_server):
+    def respond(path, headers):
+        if path == "/130000.json":
+            return 200, {"Content-Type": "application/json"}, json.dumps(PAYLOAD).encode("utf-8")
+        return 404, {}, b""
+
+    server = stub_server(respond)
+    fetcher = ForecastFetcher(base_url=server.url, retries=0, backoff=0)
+    try:
+        results = fetcher.fetch_offices(["130000", "999999", "130000"])
+    finally:
+        fetcher.close()
+    assert results["130000"] == (PAYLOAD, None)
+    data, error = results["999999"]
+    assert data is None and isinstance(error, requests.HTTPError)
+    # 重複した予報区は1回だけ取得する
+    assert len(server.requests) == 2
@@ -0,0 +1,146 @@
+import threading
+
+from sync_scheduler import SyncScheduler
+
+
+def test_next_delay_backs_off_and_resets():
+    calls = {"count": 0}
+
+    def flaky_sync():
+        calls["count"] += 1
+        if calls["count"] <= 4:
+            raise RuntimeError("offline")
+        return "ok"
+
+    scheduler = SyncScheduler(flaky_sync, interval=1800, jitter=0, retry_delay=60, max_backoff=300)
+    assert scheduler.next_delay() == 1800
+
+    delays = []
+    for _ in range(4):
+        scheduler._run_once()
+        delays.append(scheduler.next_delay())
+    # 60, 120, 240 と倍々に伸び、上限の300で止まる
+    assert delays == [60, 120, 240, 300]
+    assert scheduler.failures == 4
+
+    scheduler._run_once()
+    assert scheduler.failures == 0
+    assert scheduler.next_delay() == 1800
+
+
+def test_next_delay_jitter_stays_in_range():
+    scheduler = SyncScheduler(lambda: None, interval=100, jitter=0.1)
+    assert all(90 <= scheduler.next_delay() <= 110 for _ in range(100))
+
+
+def test_run_once_calls_callbacks():
+    results, errors = [], []
+    scheduler = SyncScheduler(lambda: 42, on_result=results.append, on_error=errors.append)
+    scheduler._run_once()
+    assert results == [42] and errors == []
+    assert scheduler.last_run_at is not None and not scheduler.running
+
+    error = ValueError("bad payload")
+
+    def failing_sync():
+        raise error
+
+    scheduler.sync_func = failing_sync
+    scheduler._run_once()
+    assert errors == [error]
+
+
+def test_trigger_runs_sync_without_waiting_for_interval():
+    done = threading.Event()
+    results = []
+
+    def on_result(result):
+        results.append(result)
+        done.set()
+
+    calls = {"count": 0}
+
+    def sync():
+        calls["count"] += 1
+        return calls["count"]
+
+    scheduler = SyncScheduler(sync, interval=3600, jitter=0, on_result=on_result)
+    scheduler.start(run_immediately=False)
+    try:
+        assert not done.wait(0.2)
+        scheduler.trigger()
+        assert done.wait(5)
+    finally:
+        scheduler.stop(timeout=5)
+    assert results == [1]
+
+
+def test_start_runs_immediately_and_stop_ends_thread():
+    done = threading.Event()
+    scheduler = SyncScheduler(lambda: "ok", interval=3600, on_result=lambda result: done.set())
+    scheduler.start()
+    thread = scheduler._thread
+    assert done.wait(5)
+    scheduler.stop(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_callback_error_does_not_stop_scheduler(capsys):
+    calls = []
+    first, done = threading.Event(), threading.Event()
+
+    def on_result(result):
+        calls.append(result)
+        if len(calls) == 1:
+            first.set()
+            raise RuntimeError("render failed")
+        done.set()
+
+    scheduler = SyncScheduler(lambda: "ok", interval=3600, on_result=on_result)
+    scheduler.start()
+    try:
+        # 1回目のコールバックが失敗しても、次の trigger で再び同期する
+        assert first.wait(5)
+        scheduler.trigger()
+        assert done.wait(5)
+    finally:
+        scheduler.stop(timeout=5)
+    assert "render failed" in capsys.readouterr().out
+
+
+def test_stop_during_run_does_not_wait_and_cleans_up_after_run():
+    started, release, stopped = threading.Event(), threading.Event(), threading.Event()
+    events = []
+
+    def slow_sync():
+        started.set()
+        release.wait(5)
+        events.append("sync")
+        return "ok"
+
+    scheduler = SyncScheduler(slow_sync, interval=3600, on_result=lambda result: events.append("result"),
+                              on_stop=lambda: (events.append("stop"), stopped.set()))
+    scheduler.start()
+    thread = scheduler._thread
+    assert started.wait(5)
+
+    # 画面のスレッドからは待たずに戻り、実行中の同期が終わるまで後片付けはしない
+    scheduler.stop(wait=False)
+    assert scheduler.running and thread.is_alive()
+    assert not stopped.wait(0.2)
+    # 待つ場合も timeout で戻る
+    scheduler.stop(timeout=0.1)
+    assert thread.is_alive() and events == []
+
+    release.set()
+    assert stopped.wait(5)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert events == ["sync", "result", "stop"]
+
+
+def test_stop_without_thread_cleans_up_immediately():
+    stops = []
+    scheduler = SyncScheduler(lambda: "ok", on_stop=lambda: stops.append(True))
+    scheduler.stop(wait=False)
+    assert stops == [True]
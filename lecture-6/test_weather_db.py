@@ -0,0 +1,249 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from weather_db import UPSERT_INSERTED, UPSERT_INVALID, UPSERT_UPDATED, WeatherDatabase, to_int
+
+# 数値列がTEXT型だった旧バージョンのスキーマ
+OLD_SCHEMA = '''
+    CREATE TABLE areas (
+        area_code TEXT PRIMARY KEY, office_code TEXT, name TEXT, pos_y INTEGER, pos_x INTEGER
+    );
+    CREATE TABLE forecasts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        area_code TEXT, target_date TEXT, weather_code TEXT, weather_text TEXT,
+        temp_max TEXT, temp_min TEXT, pop TEXT, fetched_at TEXT,
+        UNIQUE(area_code, target_date)
+    );
+    CREATE TABLE weekly_forecasts (
+        area_code TEXT, target_date TEXT, weather_code TEXT,
+        pop TEXT, temp_min TEXT, temp_max TEXT, fetched_at TEXT,
+        PRIMARY KEY (area_code, target_date)
+    );
+'''
+
+
+@pytest.fixture
+def old_db_path(tmp_path):
+    path = str(tmp_path / "weather.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.executemany(
+        "INSERT INTO forecasts (area_code, target_date, weather_code, weather_text, temp_max, temp_min, pop, fetched_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("130010", "2026-10-17", "100", "晴れ", "25", "12.6", "30", "2026-10-17T05:00:00"),
+            ("016010", "2026-10-17", "400", "雪", "-3", "--", "", "2026-10-17T05:00:00"),
+        ],
+    )
+    conn.execute(
+        "INSERT INTO weekly_forecasts VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ("130010", "2026-10-18", "101", "20", "--", "22", "2026-10-17T05:00:00"),
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = WeatherDatabase(str(tmp_path / "weather.db"))
+    yield db
+    db.close()
+
+
+def column_types(db, table):
+    return {row[1]: row[2] for row in db.query(f"PRAGMA table_info({table})")}
+
+
+def test_migrate_numeric_columns_converts_text_to_integer(old_db_path):
+    db = WeatherDatabase(old_db_path)
+    try:
+        for table in ("forecasts", "weekly_forecasts"):
+            types = column_types(db, table)
+            assert (types["temp_max"], types["temp_min"], types["pop"]) == ("INTEGER",) * 3
+
+        rows = db.query_records(None, '''
+            SELECT area_code, temp_max, temp_min, pop, typeof(temp_max) FROM forecasts ORDER BY area_code
+        ''')
+        assert rows == [
+            ("016010", -3, None, None, "integer"),
+            ("130010", 25, 13, 30, "integer"),
+        ]
+        weekly = db.get_weekly_forecasts("130010")
+        assert [(r.pop, r.temp_min, r.temp_max) for r in weekly] == [(20, None, 22)]
+    finally:
+        db.close()
+
+
+def test_migrated_db_keeps_unique_constraint(old_db_path):
+    db = WeatherDatabase(old_db_path)
+    try:
+        db.upsert_forecast("130010", "2026-10-17", "200", "くもり", "21", "--", "40")
+        rows = db.query_records(None, '''
+            SELECT weather_code, temp_max, temp_min, pop FROM forecasts
+            WHERE area_code = '130010' AND target_date = '2026-10-17'
+        ''')
+        assert rows == [("200", 21, None, 40)]
+    finally:
+        db.close()
+
+
+def test_migration_runs_only_once(old_db_path):
+    WeatherDatabase(old_db_path).close()
+    db = WeatherDatabase(old_db_path)
+    try:
+        assert db.query_records(None, "SELECT COUNT(*) FROM forecasts") == [(2,)]
+        assert db.query_records(None, "SELECT name FROM sqlite_master WHERE name LIKE '%_migrating'") == []
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None), (7, 7), ("12", 12), ("12.6", 13), ("-3", -3), ("--", None), ("", None),
+])
+def test_to_int(value, expected):
+    assert to_int(value) == expected
+
+
+# --- upsert_forecasts の行ごとの結果 ---
+
+MIXED_BATCH = [
+    ("130010", "2026-10-17", "100", "晴れ", "25", "13", "30"),   # 保存済み
+    ("130010", "2026-10-18", "200", "くもり", "21", "--", "40"),  # 新規
+    ("130010", "2026-10-19", "300", "雨"),                       # 列が足りない
+    ("", "2026-10-18", "100", "晴れ", "20", "10", "0"),          # 地域コードが無い
+    ("016010", "2026-10-18", "400", "雪", "-3", "-8", ""),       # 新規
+    ("016010", None, "400", "雪", "-3", "-8", "50"),             # 対象日が無い
+    ("130010", "2026-10-18", "201", "くもり時々晴れ", "22", "--", "30"),  # 同じバッチ内で2回目
+]
+
+
+def saved_forecasts(db):
+    return db.query_records(None, '''
+        SELECT area_code, target_date, weather_code, temp_max, temp_min, pop, fetched_at
+        FROM forecasts ORDER BY area_code, target_date
+    ''')
+
+
+def test_upsert_forecasts_reports_status_per_row(db):
+    db.upsert_forecasts([("130010", "2026-10-17", "101", "晴れ時々くもり", "24", "12", "20")], fetched_at="2026-10-17T05:00:00")
+
+    statuses = db.upsert_forecasts(MIXED_BATCH, fetched_at="2026-10-17T11:00:00")
+    assert statuses == [
+        UPSERT_UPDATED, UPSERT_INSERTED, UPSERT_INVALID, UPSERT_INVALID,
+        UPSERT_INSERTED, UPSERT_INVALID, UPSERT_UPDATED,
+    ]
+    # 無効な行は書き込まず、同じキーの行は後のものが残る
+    assert saved_forecasts(db) == [
+        ("016010", "2026-10-18", "400", -3, -8, None, "2026-10-17T11:00:00"),
+        ("130010", "2026-10-17", "100", 25, 13, 30, "2026-10-17T11:00:00"),
+        ("130010", "2026-10-18", "201", 22, None, 30, "2026-10-17T11:00:00"),
+    ]
+
+
+def test_upsert_forecasts_rerun_is_idempotent(db):
+    first = db.upsert_forecasts(MIXED_BATCH, fetched_at="2026-10-17T11:00:00")
+    saved = saved_forecasts(db)
+
+    second = db.upsert_forecasts(MIXED_BATCH, fetched_at="2026-10-17T11:00:00")
+    assert first.count(UPSERT_INSERTED) == 3
+    # 2回目は有効な行がすべて上書きになり、行数も値も変わらない
+    assert second == [UPSERT_INVALID if status == UPSERT_INVALID else UPSERT_UPDATED for status in first]
+    assert saved_forecasts(db) == saved
+
+
+def test_upsert_forecasts_empty_batch(db):
+    assert db.upsert_forecasts([]) == []
+    assert saved_forecasts(db) == []
+
+
+# --- 履歴（keep_history=True）と期間・時点の検索 ---
+
+REVISIONS = [
+    # (取得日時, 行)
+    ("2026-10-17T05:00:00", [("130010", "2026-10-18", "100", "晴れ", "24", "12", "10"),
+                             ("130010", "2026-10-19", "200", "くもり", "20", "14", "40")]),
+    ("2026-10-17T11:00:00", [("130010", "2026-10-18", "101", "晴れ時々くもり", "23", "12", "20"),
+                             ("016010", "2026-10-18", "400", "雪", "-3", "-8", "60")]),
+    ("2026-10-17T17:00:00", [("130010", "2026-10-18", "300", "雨", "19", "13", "80")]),
+]
+
+
+@pytest.fixture
+def history_db(tmp_path):
+    db = WeatherDatabase(str(tmp_path / "weather.db"), keep_history=True)
+    db.upsert_area([("130000", "130010", "東京地方", 0, 0), ("016000", "016010", "石狩地方", 0, 0)])
+    for fetched_at, rows in REVISIONS:
+        db.upsert_forecasts(rows, fetched_at=fetched_at)
+    yield db
+    db.close()
+
+
+def as_of(db, target_date, when):
+    return sorted((r.area_code, r.weather_code, r.fetched_at) for r in db.get_forecasts_as_of(target_date, when))
+
+
+@pytest.mark.parametrize("when, expected", [
+    ("2026-10-17T04:59:59", []),                                           # 最初の版より前
+    ("2026-10-17T05:00:00", [("130010", "100", "2026-10-17T05:00:00")]),  # 版の取得日時ちょうど（その版を含む）
+    ("2026-10-17T10:59:59", [("130010", "100", "2026-10-17T05:00:00")]),  # 次の版の直前
+    ("2026-10-17T11:00:00", [("016010", "400", "2026-10-17T11:00:00"), ("130010", "101", "2026-10-17T11:00:00")]),
+    ("2026-10-17T16:59:59", [("016010", "400", "2026-10-17T11:00:00"), ("130010", "101", "2026-10-17T11:00:00")]),
+    ("2026-10-18T00:00:00", [("016010", "400", "2026-10-17T11:00:00"), ("130010", "300", "2026-10-17T17:00:00")]),
+])
+def test_get_forecasts_as_of_revision_boundaries(history_db, when, expected):
+    assert as_of(history_db, "2026-10-18", when) == expected
+
+
+def test_get_forecasts_as_of_accepts_datetime(history_db):
+    assert as_of(history_db, "2026-10-18", datetime(2026, 10, 17, 11)) == as_of(history_db, "2026-10-18", "2026-10-17T11:00:00")
+    assert as_of(history_db, "2026-10-20", "2026-10-18T00:00:00") == []
+
+
+def test_get_forecast_history_returns_every_revision_in_range(history_db):
+    history = history_db.get_forecast_history("130010")
+    assert [(r.target_date, r.weather_code, r.temp_max, r.fetched_at) for r in history] == [
+        ("2026-10-18", "100", 24, "2026-10-17T05:00:00"),
+        ("2026-10-18", "101", 23, "2026-10-17T11:00:00"),
+        ("2026-10-18", "300", 19, "2026-10-17T17:00:00"),
+        ("2026-10-19", "200", 20, "2026-10-17T05:00:00"),
+    ]
+    # 期間は両端を含む
+    assert [r.target_date for r in history_db.get_forecast_history("130010", "2026-10-19", "2026-10-19")] == ["2026-10-19"]
+    assert history_db.get_forecast_history("130010", "2026-10-20", "2026-10-31") == []
+
+    # 同じ取得日時の版を入れ直しても増えない
+    history_db.upsert_forecasts(REVISIONS[-1][1], fetched_at=REVISIONS[-1][0])
+    assert len(history_db.get_forecast_history("130010")) == 4
+
+
+def test_get_forecasts_in_range_returns_latest_revision(history_db):
+    rows = history_db.get_forecasts_in_range("2026-10-18", "2026-10-19")
+    assert [(r.area_code, r.target_date, r.weather_code) for r in rows] == [
+        ("016010", "2026-10-18", "400"), ("130010", "2026-10-18", "300"), ("130010", "2026-10-19", "200"),
+    ]
+    assert [r.target_date for r in history_db.get_forecasts_in_range("2026-10-19", "2026-10-31", "130010")] == ["2026-10-19"]
+    assert history_db.get_forecasts_in_range("2026-10-18", "2026-10-18", "016010")[0].fetched_at == "2026-10-17T11:00:00"
+    assert history_db.get_forecasts_in_range("2026-10-20", "2026-10-31") == []
+
+
+def test_history_is_seeded_when_enabled_later(tmp_path):
+    path = str(tmp_path / "weather.db")
+    db = WeatherDatabase(path)
+    try:
+        for fetched_at, rows in REVISIONS:
+            db.upsert_forecasts(rows, fetched_at=fetched_at)
+        assert db.get_forecast_history("130010") == []
+    finally:
+        db.close()
+
+    # 履歴を有効にすると、その時点の最新版が履歴の起点になる
+    db = WeatherDatabase(path, keep_history=True)
+    try:
+        assert [(r.target_date, r.fetched_at) for r in db.get_forecast_history("130010")] == [
+            ("2026-10-18", "2026-10-17T17:00:00"), ("2026-10-19", "2026-10-17T05:00:00"),
+        ]
+    finally:
+        db.close()
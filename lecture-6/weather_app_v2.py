@@ -1,144 +1,113 @@
 import flet as ft
-import requests
-import sqlite3
+import threading
+from collections import namedtuple
 from datetime import datetime, timedelta
+from forecast_cache import ForecastDateCache
+from http_cache import HttpCache
+from jma_archive import ArchiveReplayer, ForecastArchive
+from ingest import (
+    DB_NAME, INITIAL_MONITOR_POINTS, format_result, ingest_forecasts, refresh_region_tree, region_tree_is_stale,
+)
+from jma_fetch import ForecastFetcher, JMA_BASE_URL
+from sync_scheduler import SyncScheduler
+from forecast_parser import extract_weekly_forecast
+from weather_db import WeatherDatabase
+from weather_styles import style_for_code
 
 # --- 設定値とエンドポイント ---
-JMA_BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/"
-REGION_CONF_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
-DB_NAME = "weather_intelligence.db"
-
-# 観測地点（ID, 地域コード, 表示名, Y座標, X座標）
-# 初期データとしてDBに登録します
-INITIAL_MONITOR_POINTS = [
-    ("016000", "016010", "札幌", 40, 620),
-    ("015000", "015010", "釧路", 70, 730),
-    ("040000", "040010", "仙台", 230, 590),
-    ("150000", "150010", "新潟", 250, 480),
-    ("130000", "130010", "東京", 360, 560),
-    ("230000", "230010", "名古屋", 390, 450),
-    ("170000", "170010", "金沢", 290, 380),
-    ("270000", "270000", "大阪", 410, 360),
-    ("340000", "340010", "広島", 410, 240),
-    ("390000", "390010", "高知", 520, 280),
-    ("400000", "400010", "福岡", 410, 100),
-    ("460100", "460100", "鹿児島", 530, 80),
-    ("471000", "471010", "那覇", 630, 210),
-]
-
-# --- データベース管理クラス ---
-class WeatherDatabase:
-    def __init__(self, db_name):
-        self.db_name = db_name
-        self.init_db()
-
-    def get_connection(self):
-        return sqlite3.connect(self.db_name)
-
-    def init_db(self):
-        """テーブルの作成"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # 地域マスタ
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS areas (
-                area_code TEXT PRIMARY KEY,
-                office_code TEXT,
-                name TEXT,
-                pos_y INTEGER,
-                pos_x INTEGER
-            )
-        ''')
-
-        # 予報データ
-        # target_date: 予報対象日, fetched_at: データ取得日時
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS forecasts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                area_code TEXT,
-                target_date TEXT,
-                weather_code TEXT,
-                weather_text TEXT,
-                temp_max TEXT,
-                temp_min TEXT,
-                pop TEXT,
-                fetched_at TEXT,
-                FOREIGN KEY (area_code) REFERENCES areas (area_code),
-                UNIQUE(area_code, target_date)
-            )
-        ''')
-        conn.commit()
-        conn.close()
-
-    def upsert_area(self, area_data):
-        """地域の登録・更新"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.executemany('''
-            INSERT OR REPLACE INTO areas (office_code, area_code, name, pos_y, pos_x)
-            VALUES (?, ?, ?, ?, ?)
-        ''', area_data)
-        conn.commit()
-        conn.close()
-
-    def upsert_forecast(self, area_code, target_date, w_code, w_text, t_max, t_min, pop):
-        """予報データの保存（既存の日付データがあれば上書き）"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        now = datetime.now().isoformat()
-        cursor.execute('''
-            INSERT OR REPLACE INTO forecasts 
-            (area_code, target_date, weather_code, weather_text, temp_max, temp_min, pop, fetched_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (area_code, target_date, w_code, w_text, t_max, t_min, pop, now))
-        conn.commit()
-        conn.close()
-
-    def get_forecasts_by_date(self, target_date_str):
-        """指定した日付の予報データを全地域分取得"""
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT f.*, a.office_code, a.name, a.pos_x, a.pos_y
-            FROM areas a
-            LEFT JOIN forecasts f ON a.area_code = f.area_code AND f.target_date = ?
-        ''', (target_date_str,))
-        rows = cursor.fetchall()
-        conn.close()
-        return rows
-
-    def get_all_areas(self):
-        conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM areas')
-        rows = cursor.fetchall()
-        conn.close()
-        return rows
-
-# --- 天気予報ロジック ---
-
-def fetch_visual_style(condition_text):
-    if not condition_text: return "❓", "#CBD5E1", ft.LinearGradient(["#F8FAFC", "#F1F5F9"])
-    target = str(condition_text)
-    if "雷" in target:
-        return "⛈️", "#7C3AED", ft.LinearGradient(["#DDD6FE", "#A78BFA"], begin=ft.alignment.top_left)
-    if "雪" in target:
-        return "❄️", "#0891B2", ft.LinearGradient(["#CFFAFE", "#67E8F9"], begin=ft.alignment.top_left)
-    if "雨" in target:
-        return "🌧️", "#2563EB", ft.LinearGradient(["#DBEAFE", "#93C5FD"], begin=ft.alignment.top_left)
-    if "晴" in target and ("曇" in target or "くもり" in target):
-        return "🌤️", "#D97706", ft.LinearGradient(["#FEF3C7", "#FDE68A"], begin=ft.alignment.top_left)
-    if "晴" in target:
-        return "☀️", "#EA580C", ft.LinearGradient(["#FFEDD5", "#FED7AA"], begin=ft.alignment.top_left)
-    return "☁️", "#475569", ft.LinearGradient(["#F1F5F9", "#E2E8F0"], begin=ft.alignment.top_left)
-
-def main(page: ft.Page):
+SYNC_MAX_WORKERS = 8  # 同期時の同時接続数
+WEEKLY_TTL = 3 * 60 * 60  # 週間予報はこの時間内ならDBの値だけで表示する
+SYNC_INTERVAL = 30 * 60  # バックグラウンドで自動同期する間隔(秒)
+SYNC_JITTER = 0.1  # 自動同期の間隔のゆらぎ（割合）
+KEEP_FORECAST_HISTORY = True  # 同期のたびに予報の版を forecast_history に残す
+REPLAY_ARCHIVE = None  # 記録済みアーカイブ（ingest.py --record）のパスを指定すると、気象庁に接続せずその最新の記録で動く
+
+# main() が返す画面の操作口（ベンチマークなどから、ブラウザを使わずに画面を動かすため）
+Dashboard = namedtuple("Dashboard", [
+    "db", "forecast_cache", "weather_canvas", "nav_panel", "area_cards",
+    "render_map", "open_report", "expand_center", "expand_office", "sync",
+])
+
+def display(value):
+    """DBのNULL（データなし）を「--」として表示する"""
+    return "--" if value is None else value
+
+# --- UI部品 ---
+
+class AreaCard(ft.Container):
+    """地図上の地点カード（作り直さず、値が変わった部分だけを書き換える）"""
+
+    def __init__(self, on_open):
+        super().__init__(
+            width=110, border_radius=12, padding=8,
+            shadow=ft.BoxShadow(blur_radius=8, color="#1E293B20"),
+        )
+        self.office_code = None
+        self.area_code = None
+        self.name_text = ft.Text(size=10, weight="bold")
+        self.emoji_text = ft.Text(size=22)
+        self.max_text = ft.Text(size=10, color="#EF4444")
+        self.min_text = ft.Text(size=10, color="#3B82F6")
+        self.pop_text = ft.Text(size=9, color="#64748B")
+        self.content = ft.Column(
+            [
+                self.name_text,
+                self.emoji_text,
+                ft.Row([self.max_text, self.min_text], alignment="center", spacing=4),
+                ft.Row(
+                    [ft.Icon(ft.Icons.WATER_DROP, size=10, color="#3B82F6"), self.pop_text],
+                    alignment="center", spacing=2,
+                ),
+            ],
+            horizontal_alignment="center", spacing=2,
+        )
+        self.on_click = lambda e: on_open(self.office_code, self.area_code, self.name_text.value)
+
+    def apply(self, row):
+        """DBの1行（MapForecastRecord）を反映し、値が変わったコントロールのリストを返す"""
+        # データがない場合（過去の日付で保存がない場合など）は「--」表示
+        t_max = display(row.temp_max)
+        t_min = display(row.temp_min)
+        pop = display(row.pop)
+        emoji = style_for_code(row.weather_code).emoji
+
+        self.office_code = row.office_code
+        self.area_code = row.area_code
+
+        changed = []
+        def set_value(control, attr, value):
+            if getattr(control, attr) != value:
+                setattr(control, attr, value)
+                if control not in changed:
+                    changed.append(control)
+
+        set_value(self, "top", row.pos_y)
+        set_value(self, "left", row.pos_x)
+        # DBにデータがない場合はグレーアウトさせるスタイル
+        set_value(self, "bgcolor", "white" if row.weather_code else "#F1F5F9")
+        set_value(self.name_text, "value", row.name)
+        set_value(self.emoji_text, "value", emoji)
+        set_value(self.max_text, "value", f"↑{t_max}°")
+        set_value(self.min_text, "value", f"↓{t_min}°")
+        set_value(self.pop_text, "value", f"{pop}%")
+        return changed
+
+
+def main(page: ft.Page, db_name=DB_NAME, base_url=JMA_BASE_URL, monitor_points=INITIAL_MONITOR_POINTS,
+         use_cache=True, auto_sync=True, replay_archive=REPLAY_ARCHIVE):
+    """
+    ダッシュボードを組み立てる（ft.app からは page だけが渡される）
+    auto_sync=False にするとバックグラウンド同期を始めない（同期は戻り値の sync() で行う）
+    """
     # DB初期化
-    db = WeatherDatabase(DB_NAME)
-    db.upsert_area(INITIAL_MONITOR_POINTS) # マスタデータの投入
+    db = WeatherDatabase(db_name, keep_history=KEEP_FORECAST_HISTORY)
+    db.upsert_area(monitor_points) # マスタデータの投入
+    if replay_archive:
+        http_cache = ArchiveReplayer(ForecastArchive(replay_archive))
+    else:
+        http_cache = HttpCache() if use_cache else None
+    fetcher = ForecastFetcher(base_url=base_url, max_workers=SYNC_MAX_WORKERS, cache=http_cache)
+    forecast_cache = ForecastDateCache(db)  # 日付ごとの地図データ（前後の日付は先読みする）
 
     page.title = "Weather Intelligence Dashboard (DB Integrated)"
     page.theme_mode = ft.ThemeMode.LIGHT
@@ -151,57 +120,62 @@ def main(page: ft.Page):
     current_date = datetime.now().strftime("%Y-%m-%d")
     selected_date_text = ft.Text(f"表示中のデータ: {current_date}", size=14, weight="bold")
 
+    synced_date = current_date       # 最後に同期した日（この日を表示中なら、同期後も「今日」に合わせる）
+    manual_sync_requested = False    # 更新ボタンが押されたか（押されていれば同期後に今日の日付へ移る）
+    sync_notice = None               # 更新ボタンで表示した SnackBar（同期後にこれだけを取り除く）
+
     weather_canvas = ft.Stack(width=1100, height=850)
+    area_cards = {}  # area_code -> AreaCard（日付の切り替えや同期のたびに使い回す）
+    # 描画は同期のスレッドと画面の操作（日付の変更など）の両方から呼ばれるので、1つずつ行う
+    render_lock = threading.RLock()
     nav_panel = ft.Column(scroll=ft.ScrollMode.AUTO, expand=True)
 
-    # 詳細ダイアログ表示 (APIから直接取得のまま維持 - 週間予報のため)
+    # 週間予報をDBから取得（無いか古い場合だけAPIから取り直して保存する）
+    def load_weekly_forecast(office_id, area_id):
+        rows = db.get_weekly_forecasts(area_id)
+        if rows and datetime.now() - datetime.fromisoformat(rows[0].fetched_at) < timedelta(seconds=WEEKLY_TTL):
+            return rows
+        try:
+            weekly_rows = extract_weekly_forecast(fetcher.fetch_office(office_id), area_id)
+            db.replace_weekly_forecasts(weekly_rows)
+            return db.get_weekly_forecasts(area_id)
+        except Exception as e:
+            if not rows:
+                raise
+            print(f"Weekly Refresh Error: {e}")  # 取り直せなければ古いデータで表示する
+            return rows
+
+    # 詳細ダイアログ表示（週間予報はDBから読み込む）
     def open_detailed_report(office_id, area_id, area_name):
         try:
-            # 週間予報等はAPIから直接取得（今回はDB保存対象外とする）
-            raw_data = requests.get(f"{JMA_BASE_URL}{office_id}.json").json()
-            
             weekly_box = ft.Row(scroll=ft.ScrollMode.AUTO, spacing=12)
-            if len(raw_data) > 1:
-                week_ts = raw_data[1]["timeSeries"]
-                w_weather = next((a for a in week_ts[0]["areas"] if a["area"]["code"] == area_id), week_ts[0]["areas"][0])
-                w_temp = next((a for a in week_ts[1]["areas"] if a["area"]["code"] == area_id), week_ts[1]["areas"][0])
-
-                for i, date_raw in enumerate(week_ts[0]["timeDefines"]):
-                    day_obj = datetime.fromisoformat(date_raw.replace('Z','+00:00'))
-                    
-                    code = w_weather.get("weatherCodes", ["100"] * 10)[i]
-                    # 簡易的な天気判定ロジック
-                    if code.startswith("1"): w_text = "晴"
-                    elif code.startswith("2"): w_text = "雨" if code in ["202","203"] else "曇"
-                    elif code.startswith("3"): w_text = "雨"
-                    elif code.startswith("4"): w_text = "雪"
-                    else: w_text = "曇"
-
-                    w_emoji, _, _ = fetch_visual_style(w_text)
-                    w_pop = w_weather.get("pops", ["--"]*10)[i]
-
-                    weekly_box.controls.append(
-                        ft.Container(
-                            width=100, padding=15, bgcolor="#FFFFFF", border_radius=15, border=ft.border.all(1, "#F1F5F9"),
-                            content=ft.Column([
-                                ft.Text(day_obj.strftime("%m/%d"), size=11, weight="bold", color="#94A3B8"),
-                                ft.Text(w_emoji, size=28),
-                                ft.Container(
-                                    content=ft.Text(f"{w_pop}%", size=10, weight="bold", color="#3B82F6"),
-                                    bgcolor="#EFF6FF", padding=ft.padding.symmetric(4, 8), border_radius=6
-                                ),
-                                ft.Row([
-                                    ft.Text(f"{w_temp.get('tempsMin',['--']*10)[i]}°", color="#3B82F6", size=10),
-                                    ft.Text(f"{w_temp.get('tempsMax',['--']*10)[i]}°", color="#EF4444", size=10)
-                                ], spacing=4, alignment="center")
-                            ], horizontal_alignment="center", spacing=6)
-                        )
+            for row in load_weekly_forecast(office_id, area_id):
+                day_obj = datetime.strptime(row.target_date, "%Y-%m-%d")
+
+                w_emoji = style_for_code(row.weather_code).emoji
+
+                weekly_box.controls.append(
+                    ft.Container(
+                        width=100, padding=15, bgcolor="#FFFFFF", border_radius=15, border=ft.border.all(1, "#F1F5F9"),
+                        content=ft.Column([
+                            ft.Text(day_obj.strftime("%m/%d"), size=11, weight="bold", color="#94A3B8"),
+                            ft.Text(w_emoji, size=28),
+                            ft.Container(
+                                content=ft.Text(f"{display(row.pop)}%", size=10, weight="bold", color="#3B82F6"),
+                                bgcolor="#EFF6FF", padding=ft.padding.symmetric(4, 8), border_radius=6
+                            ),
+                            ft.Row([
+                                ft.Text(f"{display(row.temp_min)}°", color="#3B82F6", size=10),
+                                ft.Text(f"{display(row.temp_max)}°", color="#EF4444", size=10)
+                            ], spacing=4, alignment="center")
+                        ], horizontal_alignment="center", spacing=6)
                     )
+                )
 
             page.open(ft.AlertDialog(
                 title=ft.Text(f"{area_name} の週間予報", size=16, weight="bold"),
                 content=ft.Column([
-                    ft.Text("🗓️ 7日間の予報推移 (API直接取得)", size=14, weight="bold"), 
+                    ft.Text("🗓️ 7日間の予報推移", size=14, weight="bold"), 
                     weekly_box
                 ], tight=True, spacing=15)
             ))
@@ -210,134 +184,148 @@ def main(page: ft.Page):
 
     # UI描画関数：DBからデータを読み込んで表示
     def render_map_from_db(target_date_str):
-        weather_canvas.controls.clear()
-        
-        # DBから指定日のデータを取得
-        rows = db.get_forecasts_by_date(target_date_str)
-        
+        with render_lock:
+            _render_map(target_date_str)
+
+    def _render_map(target_date_str):
+        # 指定日のデータを取得（キャッシュに無ければDBから読み、前後の日付を先読みしておく）
+        rows = forecast_cache.get(target_date_str)
+        forecast_cache.prefetch_around(target_date_str)
+
+        changed = []           # 値が変わったコントロール（これだけをクライアントに送る）
+        structure_changed = False  # カードの追加・削除があったか
+
         for row in rows:
-            # データがない場合（過去の日付で保存がない場合など）は「--」表示
-            name = row["name"]
-            w_text = row["weather_text"] if row["weather_text"] else ""
-            t_max = row["temp_max"] if row["temp_max"] else "--"
-            t_min = row["temp_min"] if row["temp_min"] else "--"
-            pop = row["pop"] if row["pop"] else "--"
-            
-            emoji, _, _ = fetch_visual_style(w_text)
-            
-            # DBにデータがない場合はグレーアウトさせるスタイル
-            bg_color = "white" if row["weather_code"] else "#F1F5F9"
-            
-            weather_canvas.controls.append(
-                ft.Container(
-                    top=row["pos_y"],
-                    left=row["pos_x"],
-                    width=110,
-                    bgcolor=bg_color,
-                    border_radius=12,
-                    padding=8,
-                    shadow=ft.BoxShadow(blur_radius=8, color="#1E293B20"),
-                    content=ft.Column(
-                        [
-                            ft.Text(name, size=10, weight="bold"),
-                            ft.Text(emoji, size=22),
-                            ft.Row(
-                                [
-                                    ft.Text(f"↑{t_max}°", size=10, color="#EF4444"),
-                                    ft.Text(f"↓{t_min}°", size=10, color="#3B82F6"),
-                                ],
-                                alignment="center", spacing=4,
-                            ),
-                            ft.Row(
-                                [
-                                    ft.Icon(ft.Icons.WATER_DROP, size=10, color="#3B82F6"),
-                                    ft.Text(f"{pop}%", size=9, color="#64748B"),
-                                ],
-                                alignment="center", spacing=2,
-                            ),
-                        ],
-                        horizontal_alignment="center", spacing=2,
-                    ),
-                    on_click=lambda e, oid=row["office_code"], rid=row["area_code"], rname=name:
-                        open_detailed_report(oid, rid, rname),
-                )
-            )
+            card = area_cards.get(row.area_code)
+            if card is None:
+                card = AreaCard(open_detailed_report)
+                card.apply(row)
+                area_cards[row.area_code] = card
+                weather_canvas.controls.append(card)
+                structure_changed = True
+            else:
+                changed.extend(card.apply(row))
+
+        # マスタから消えた地域のカードを取り除く
+        current_codes = {row.area_code for row in rows}
+        for code in [c for c in area_cards if c not in current_codes]:
+            weather_canvas.controls.remove(area_cards.pop(code))
+            structure_changed = True
+
+        if structure_changed:
+            page.update(weather_canvas)
+        elif changed:
+            page.update(*changed)
+
+    # データ同期：APIから取得してDBに保存する（バックグラウンドのスレッドで実行）
+    def run_sync():
+        # 地域階層も古くなっていれば取り直しておく（次回起動時のナビゲーションに反映）
+        if region_tree_is_stale(db):
+            try:
+                refresh_region_tree(db, fetcher)
+            except Exception as e:
+                print(f"Region Fetch Error: {e}")
+
+        result = ingest_forecasts(db, fetcher)
+        forecast_cache.invalidate()  # DBが書き換わったので、キャッシュした地図データは捨てる
+        print(f"Sync: {format_result(result, http_cache)}")
+
+        # 1件も取れなかった場合は失敗として扱う（スケジューラが間隔を空けて再試行する）
+        if result.areas and not result.rows:
+            raise RuntimeError("no forecasts could be fetched")
+        return result.sync_date
+
+    # 更新ボタンで出した SnackBar だけを取り除く（ダイアログや日付選択は overlay に残す）
+    def dismiss_sync_notice():
+        nonlocal sync_notice
+        if sync_notice is not None and sync_notice in page.overlay:
+            page.overlay.remove(sync_notice)
+        sync_notice = None
+
+    # 同期が完了したら再描画する
+    # 更新ボタンからの同期か、今日の日付を表示中のときだけ、新しい今日の日付に切り替える
+    # （定期同期で、ユーザーが選んだ日付から戻されないように）
+    def on_sync_done(today_str):
+        nonlocal current_date, synced_date, manual_sync_requested
+        with render_lock:
+            if manual_sync_requested or current_date == synced_date:
+                current_date = today_str
+                selected_date_text.value = f"表示中のデータ: {current_date}"
+            manual_sync_requested = False
+            synced_date = today_str
+            render_map_from_db(current_date)
+            dismiss_sync_notice()
         page.update()
 
-    # データ同期：APIから取得してDBに保存し、画面を更新
-    def sync_data_api_to_db(e=None):
-        page.overlay.append(ft.SnackBar(ft.Text("最新の予報を取得しDBを更新中...")))
+    def on_sync_error(e):
+        nonlocal manual_sync_requested
+        print(f"Sync Error: {e}")
+        with render_lock:
+            manual_sync_requested = False
+            dismiss_sync_notice()
         page.update()
-        
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        areas = db.get_all_areas() # DBのマスタから取得
-        
-        for area in areas:
-            oid = area["office_code"]
-            rid = area["area_code"]
-            
-            try:
-                data = requests.get(f"{JMA_BASE_URL}{oid}.json").json()
-                ts_base = data[0]["timeSeries"]
-                
-                # エリアデータを特定
-                area_w = next((a for a in ts_base[0]["areas"] if a["area"]["code"] == rid), ts_base[0]["areas"][0])
-                area_p = next((a for a in ts_base[1]["areas"] if a["area"]["code"] == rid), ts_base[1]["areas"][0])
-                
-                # 気温データの処理
-                temp_max, temp_min = "--", "--"
-                if len(ts_base) > 2:
-                    area_t = next((a for a in ts_base[2]["areas"] if a["area"]["code"] == rid), ts_base[2]["areas"][0])
-                    temps = area_t.get("temps", [])
-                    # 今日の気温を取得（配列のindexに注意が必要だが簡易的に実装）
-                    if len(temps) >= 2:
-                        temp_max = temps[1]
-                        temp_min = temps[0]
-                    elif len(temps) == 1: # 朝取得した場合などはMaxしかない場合がある
-                         temp_max = temps[0]
-
-                # 天気と降水確率
-                w_code = area_w["weatherCodes"][0]
-                w_text = area_w["weathers"][0]
-                pop_now = area_p.get("pops", ["0"])[0]
-
-                # DBに保存 (Upsert)
-                db.upsert_forecast(rid, today_str, w_code, w_text, temp_max, temp_min, pop_now)
 
-            except Exception as e:
-                print(f"Fetch Error {area['name']}: {e}")
+    scheduler = SyncScheduler(
+        run_sync, interval=SYNC_INTERVAL, jitter=SYNC_JITTER,
+        on_result=on_sync_done, on_error=on_sync_error,
+        on_stop=forecast_cache.close,  # 実行中の同期が終わってから先読みを止める
+    )
 
-        # 今日の日付を選択状態にして再描画
-        nonlocal current_date
-        current_date = today_str
-        selected_date_text.value = f"表示中のデータ: {current_date}"
-        render_map_from_db(current_date)
-        page.overlay.clear()
+    # 更新ボタン：同期をバックグラウンドに依頼するだけで、画面は止めない
+    def sync_data_api_to_db(e=None):
+        nonlocal manual_sync_requested, sync_notice
+        with render_lock:
+            manual_sync_requested = True
+            dismiss_sync_notice()
+            sync_notice = ft.SnackBar(ft.Text("最新の予報を取得しDBを更新中..."))
+            page.overlay.append(sync_notice)
         page.update()
+        scheduler.trigger()
 
     # 日付変更時の処理
     def change_date(e):
         nonlocal current_date
         if e.control.value:
             date_obj = e.control.value
-            current_date = date_obj.strftime("%Y-%m-%d")
-            selected_date_text.value = f"表示中のデータ: {current_date}"
-            render_map_from_db(current_date)
-
-    # ナビゲーション構築
+            with render_lock:
+                current_date = date_obj.strftime("%Y-%m-%d")
+                selected_date_text.value = f"表示中のデータ: {current_date}"
+                render_map_from_db(current_date)
+
+    # 子のタイルは展開されたときに初めて作る
+    def expand_center(tile):
+        if tile.controls:
+            return
+        tile.controls = [
+            ft.ExpansionTile(
+                title=ft.Text(office["name"], size=13, weight="w600"), controls=[], data=office["code"],
+                on_change=lambda e: expand_office(e.control),
+            )
+            for office in db.get_regions("office", tile.data)
+        ]
+        tile.update()
+
+    def expand_office(tile):
+        if tile.controls:
+            return
+        # ここではクリック時の詳細表示のみ設定
+        tile.controls = [
+            ft.ListTile(title=ft.Text(r["name"], size=12),
+                        on_click=lambda e, oid=tile.data, rid=r["code"], rname=r["name"]: open_detailed_report(oid, rid, rname))
+            for r in db.get_regions("class10", tile.data)
+        ]
+        tile.update()
+
+    # ナビゲーション構築（DBに保存済みの地域階層から、最上位のタイルだけを作る）
     def build_navigation():
         try:
-            config = requests.get(REGION_CONF_URL).json()
-            for c_id, c_data in config["centers"].items():
-                subs = []
-                for o_id in c_data.get("children", []):
-                    office = config["offices"][o_id]
-                    # ここではクリック時の詳細表示のみ設定
-                    regions = [ft.ListTile(title=ft.Text(config["class10s"][r]["name"], size=12), 
-                               on_click=lambda e, oid=o_id, rid=r, rname=config["class10s"][r]["name"]: open_detailed_report(oid, rid, rname))
-                               for r in office.get("children", []) if r in config["class10s"]]
-                    subs.append(ft.ExpansionTile(title=ft.Text(office["name"], size=13, weight="w600"), controls=regions))
-                nav_panel.controls.append(ft.ExpansionTile(title=ft.Text(c_data["name"], size=14, weight="bold"), controls=subs))
+            if not db.get_regions("center"):
+                refresh_region_tree(db, fetcher)  # 初回起動時のみネットワークから取得
+            for center in db.get_regions("center"):
+                nav_panel.controls.append(ft.ExpansionTile(
+                    title=ft.Text(center["name"], size=14, weight="bold"), controls=[], data=center["code"],
+                    on_change=lambda e: expand_center(e.control),
+                ))
             page.update()
         except Exception as e:
             print(f"Nav Build Error: {e}")
@@ -393,7 +381,22 @@ def main(page: ft.Page):
     )
 
     build_navigation()
-    # 初回起動時はAPIからデータを取得してDBに入れる
-    sync_data_api_to_db()
+    # DBに保存済みのデータをすぐに表示し、最新の予報はバックグラウンドで取得する
+    render_map_from_db(current_date)
+    def on_disconnect(e):
+        # 画面のスレッドでは同期の終わりを待たない（キャッシュは on_stop で、スケジューラのスレッドを抜けるときに閉じる）
+        scheduler.stop(wait=False)
+
+    page.on_disconnect = on_disconnect
+    if auto_sync:
+        scheduler.start(run_immediately=True)
+
+    return Dashboard(
+        db=db, forecast_cache=forecast_cache, weather_canvas=weather_canvas, nav_panel=nav_panel, area_cards=area_cards,
+        render_map=render_map_from_db, open_report=open_detailed_report,
+        expand_center=expand_center, expand_office=expand_office,
+        sync=lambda: on_sync_done(run_sync()),
+    )
 
-ft.app(target=main)
\ No newline at end of file
+if __name__ == "__main__":
+    ft.app(target=main)
\ No newline at end of file
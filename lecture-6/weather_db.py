@@ -0,0 +1,431 @@
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+# 接続時に設定するPRAGMA
+# WAL + synchronous=NORMAL にすることで、コミットのたびにfsyncが走らないようにする
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",     # 約16MB
+    "PRAGMA mmap_size=268435456",   # 256MB
+    "PRAGMA busy_timeout=5000",
+]
+
+# 1つのSQL文に渡すプレースホルダ数の上限（古いSQLiteの既定値に合わせる）
+SQLITE_MAX_PARAMS = 999
+
+# upsert_forecasts が返す行ごとの結果
+UPSERT_INSERTED = "inserted"
+UPSERT_UPDATED = "updated"
+UPSERT_INVALID = "invalid"
+
+# 数値で保存する列（欠損は "--" ではなく NULL）
+NUMERIC_COLUMNS = ("temp_max", "temp_min", "pop")
+
+# 予報データ
+# target_date: 予報対象日, fetched_at: データ取得日時
+FORECASTS_DDL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        area_code TEXT,
+        target_date TEXT,
+        weather_code TEXT,
+        weather_text TEXT,
+        temp_max INTEGER,
+        temp_min INTEGER,
+        pop INTEGER,
+        fetched_at TEXT,
+        FOREIGN KEY (area_code) REFERENCES areas (area_code),
+        UNIQUE(area_code, target_date)
+    )
+'''
+
+# 予報の履歴（取得した版をすべて残す）
+# 主キー順に格納されるので、地域・対象日・取得日時での範囲検索がインデックスだけで済む
+FORECAST_HISTORY_DDL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        area_code TEXT NOT NULL,
+        target_date TEXT NOT NULL,
+        fetched_at TEXT NOT NULL,
+        weather_code TEXT,
+        weather_text TEXT,
+        temp_max INTEGER,
+        temp_min INTEGER,
+        pop INTEGER,
+        PRIMARY KEY (area_code, target_date, fetched_at)
+    ) WITHOUT ROWID
+'''
+
+# 週間予報（詳細ダイアログ用, 同期のたびに地域ごと入れ替える）
+WEEKLY_FORECASTS_DDL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        area_code TEXT,
+        target_date TEXT,
+        weather_code TEXT,
+        pop INTEGER,
+        temp_min INTEGER,
+        temp_max INTEGER,
+        fetched_at TEXT,
+        PRIMARY KEY (area_code, target_date)
+    )
+'''
+
+# 旧形式（TEXT列に "--" 等が入っている）の値を整数に変換するSQL
+NUMERIC_CAST_SQL = "CASE WHEN {col} GLOB '[0-9]*' OR {col} GLOB '-[0-9]*' THEN CAST(ROUND(CAST({col} AS REAL)) AS INTEGER) END"
+
+# --- 検索結果のレコード型 ---
+# sqlite3.Row より軽いタプルで返す（属性名でアクセスできる）
+ForecastRecord = namedtuple("ForecastRecord", [
+    "area_code", "target_date", "weather_code", "weather_text", "temp_max", "temp_min", "pop", "fetched_at",
+])
+MapForecastRecord = namedtuple("MapForecastRecord", [
+    "area_code", "office_code", "name", "pos_x", "pos_y",
+    "target_date", "weather_code", "weather_text", "temp_max", "temp_min", "pop", "fetched_at",
+])
+WeeklyForecastRecord = namedtuple("WeeklyForecastRecord", [
+    "area_code", "target_date", "weather_code", "pop", "temp_min", "temp_max", "fetched_at",
+])
+FORECAST_SELECT = ", ".join(ForecastRecord._fields)
+
+
+def to_int(value):
+    """"--" や空文字は None、数値（文字列でも可）は int にする"""
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(round(float(value)))
+        except (TypeError, ValueError):
+            return None
+
+
+# --- データベース管理クラス ---
+class WeatherDatabase:
+    def __init__(self, db_name, keep_history=False):
+        self.db_name = db_name
+        # True のとき、予報を上書きする前の版も forecast_history に残す
+        self.keep_history = keep_history
+        # 接続は1本を使い回し、スレッド間の同時アクセスはロックで直列化する
+        self._conn = None
+        self._lock = threading.RLock()
+        self.init_db()
+
+    def get_connection(self):
+        """長寿命の接続を返す（初回呼び出し時に作成）"""
+        with self._lock:
+            if self._conn is None:
+                conn = sqlite3.connect(self.db_name, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                for pragma in SQLITE_PRAGMAS:
+                    conn.execute(pragma)
+                self._conn = conn
+            return self._conn
+
+    @contextmanager
+    def transaction(self):
+        """1つのトランザクションとしてまとめて実行する（成功時commit / 失敗時rollback）"""
+        with self._lock:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def query(self, sql, params=()):
+        """SELECT文を実行して全行を返す"""
+        with self._lock:
+            return self.get_connection().execute(sql, params).fetchall()
+
+    def query_records(self, record_type, sql, params=()):
+        """SELECT文を実行し、各行を record_type（namedtuple）にして返す（None ならタプルのまま）"""
+        with self._lock:
+            cursor = self.get_connection().cursor()
+            cursor.row_factory = None
+            try:
+                if record_type is None:
+                    return cursor.execute(sql, params).fetchall()
+                return list(map(record_type._make, cursor.execute(sql, params)))
+            finally:
+                cursor.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def init_db(self):
+        """テーブルの作成"""
+        with self.transaction() as cursor:
+            # 地域マスタ
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS areas (
+                    area_code TEXT PRIMARY KEY,
+                    office_code TEXT,
+                    name TEXT,
+                    pos_y INTEGER,
+                    pos_x INTEGER
+                )
+            ''')
+
+            cursor.execute(FORECASTS_DDL.format(table="forecasts"))
+            cursor.execute(FORECAST_HISTORY_DDL.format(table="forecast_history"))
+            cursor.execute(WEEKLY_FORECASTS_DDL.format(table="weekly_forecasts"))
+
+            # 旧バージョンのDB（温度・降水確率がTEXT列）をその場で移行する
+            self._migrate_numeric_columns(cursor, "forecasts", FORECASTS_DDL)
+            self._migrate_numeric_columns(cursor, "forecast_history", FORECAST_HISTORY_DDL)
+            self._migrate_numeric_columns(cursor, "weekly_forecasts", WEEKLY_FORECASTS_DDL)
+
+            # 日付範囲の検索用
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_forecasts_target_date
+                ON forecasts (target_date, area_code)
+            ''')
+
+            # 履歴モードを初めて有効にしたときは、今ある最新版を履歴の起点にする
+            if self.keep_history and cursor.execute('SELECT 1 FROM forecast_history LIMIT 1').fetchone() is None:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO forecast_history
+                    (area_code, target_date, fetched_at, weather_code, weather_text, temp_max, temp_min, pop)
+                    SELECT area_code, target_date, fetched_at, weather_code, weather_text, temp_max, temp_min, pop
+                    FROM forecasts WHERE fetched_at IS NOT NULL
+                ''')
+
+            # 地域階層（area.json の centers / offices / class10s を平坦化したもの）
+            # level: center / office / class10, parent_code: 1つ上の階層のコード
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS regions (
+                    level TEXT NOT NULL,
+                    code TEXT NOT NULL,
+                    parent_code TEXT,
+                    name TEXT,
+                    sort_order INTEGER,
+                    fetched_at TEXT,
+                    PRIMARY KEY (level, code)
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_regions_parent
+                ON regions (level, parent_code, sort_order)
+            ''')
+
+    def _migrate_numeric_columns(self, cursor, table, ddl):
+        """数値列がTEXT型のテーブルを作り直し、"--" などをNULL、数値文字列を整数に変換する"""
+        column_types = {r[1]: r[2].upper() for r in cursor.execute(f'PRAGMA table_info({table})')}
+        if column_types.get("pop") != "TEXT":
+            return
+        columns = list(column_types)
+        select = ", ".join(NUMERIC_CAST_SQL.format(col=c) if c in NUMERIC_COLUMNS else c for c in columns)
+        cursor.execute(ddl.format(table=f"{table}_migrating"))
+        cursor.execute(f'INSERT INTO {table}_migrating ({", ".join(columns)}) SELECT {select} FROM {table}')
+        cursor.execute(f'DROP TABLE {table}')
+        cursor.execute(f'ALTER TABLE {table}_migrating RENAME TO {table}')
+
+    def upsert_area(self, area_data):
+        """地域の登録・更新"""
+        with self.transaction() as cursor:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO areas (office_code, area_code, name, pos_y, pos_x)
+                VALUES (?, ?, ?, ?, ?)
+            ''', area_data)
+
+    def upsert_forecast(self, area_code, target_date, w_code, w_text, t_max, t_min, pop):
+        """予報データの保存（既存の日付データがあれば上書き）"""
+        self.upsert_forecasts([(area_code, target_date, w_code, w_text, t_max, t_min, pop)])
+
+    def upsert_forecasts(self, rows, fetched_at=None):
+        """
+        予報データの一括保存（executemanyで1トランザクション・1コミット）
+        rows: (area_code, target_date, w_code, w_text, t_max, t_min, pop) のリスト
+        fetched_at: 取得日時（省略時は現在時刻, 記録済みデータを取り込むときはその記録日時）
+        戻り値: 行ごとの結果（UPSERT_INSERTED / UPSERT_UPDATED / UPSERT_INVALID）のリスト
+        """
+        now = fetched_at or datetime.now().isoformat()
+        statuses = []
+        params = []
+        for row in rows:
+            if len(row) != 7 or not row[0] or not row[1]:
+                statuses.append(UPSERT_INVALID)
+                continue
+            statuses.append(None)
+            area_code, target_date, w_code, w_text, t_max, t_min, pop = row
+            params.append((area_code, target_date, w_code, w_text, to_int(t_max), to_int(t_min), to_int(pop), now))
+
+        with self.transaction() as cursor:
+            # 既に保存済みの (area_code, target_date) を調べて「新規 / 上書き」を判定する
+            dates = sorted({p[1] for p in params})
+            existing = set()
+            for i in range(0, len(dates), SQLITE_MAX_PARAMS):
+                chunk = dates[i:i + SQLITE_MAX_PARAMS]
+                cursor.execute(
+                    f"SELECT area_code, target_date FROM forecasts WHERE target_date IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                existing.update((r[0], r[1]) for r in cursor.fetchall())
+
+            keys = iter((p[0], p[1]) for p in params)
+            for i, status in enumerate(statuses):
+                if status is not None:
+                    continue
+                key = next(keys)
+                statuses[i] = UPSERT_UPDATED if key in existing else UPSERT_INSERTED
+                existing.add(key)
+
+            cursor.executemany('''
+                INSERT OR REPLACE INTO forecasts
+                (area_code, target_date, weather_code, weather_text, temp_max, temp_min, pop, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', params)
+            if self.keep_history:
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO forecast_history
+                    (area_code, target_date, weather_code, weather_text, temp_max, temp_min, pop, fetched_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', params)
+        return statuses
+
+    def get_forecasts_by_date(self, target_date_str):
+        """指定した日付の予報データを全地域分取得"""
+        return self.query_records(MapForecastRecord, '''
+            SELECT a.area_code, a.office_code, a.name, a.pos_x, a.pos_y,
+                   f.target_date, f.weather_code, f.weather_text, f.temp_max, f.temp_min, f.pop, f.fetched_at
+            FROM areas a
+            LEFT JOIN forecasts f ON a.area_code = f.area_code AND f.target_date = ?
+        ''', (target_date_str,))
+
+    def get_forecasts_in_range(self, start_date, end_date, area_code=None):
+        """期間内（両端を含む）の最新の予報を取得"""
+        if area_code is None:
+            return self.query_records(ForecastRecord, f'''
+                SELECT {FORECAST_SELECT} FROM forecasts
+                WHERE target_date BETWEEN ? AND ?
+                ORDER BY target_date, area_code
+            ''', (start_date, end_date))
+        return self.query_records(ForecastRecord, f'''
+            SELECT {FORECAST_SELECT} FROM forecasts
+            WHERE area_code = ? AND target_date BETWEEN ? AND ?
+            ORDER BY target_date
+        ''', (area_code, start_date, end_date))
+
+    def get_forecast_history(self, area_code, start_date="", end_date="9999-12-31"):
+        """1地域の予報の履歴（全版）を対象日・取得日時の順に取得"""
+        return self.query_records(ForecastRecord, f'''
+            SELECT {FORECAST_SELECT} FROM forecast_history
+            WHERE area_code = ? AND target_date BETWEEN ? AND ?
+            ORDER BY target_date, fetched_at
+        ''', (area_code, start_date, end_date))
+
+    def get_forecasts_as_of(self, target_date, as_of):
+        """
+        時刻 as_of の時点で最新だった予報を全地域分取得
+        （地域ごとに主キーを1回たどるだけなので、履歴が増えても速度が落ちにくい）
+        """
+        if isinstance(as_of, datetime):
+            as_of = as_of.isoformat()
+        return self.query_records(ForecastRecord, f'''
+            SELECT {", ".join("h." + c for c in ForecastRecord._fields)}
+            FROM areas a
+            JOIN forecast_history h
+              ON h.area_code = a.area_code
+             AND h.target_date = ?
+             AND h.fetched_at = (
+                SELECT MAX(fetched_at) FROM forecast_history
+                WHERE area_code = a.area_code AND target_date = ? AND fetched_at <= ?
+             )
+        ''', (target_date, target_date, as_of))
+
+    def get_forecast_columns(self, start_date, end_date):
+        """
+        期間内の最新の予報を列ごとのリスト（{列名: [値, ...]}）で取得
+        行数が多い分析向け（1行ごとのオブジェクトを作らない）
+        """
+        rows = self.query_records(None, f'''
+            SELECT {FORECAST_SELECT} FROM forecasts
+            WHERE target_date BETWEEN ? AND ?
+            ORDER BY target_date, area_code
+        ''', (start_date, end_date))
+        columns = list(zip(*rows)) or [()] * len(ForecastRecord._fields)
+        return {name: list(values) for name, values in zip(ForecastRecord._fields, columns)}
+
+    def get_area_statistics(self, start_date, end_date):
+        """期間内の地域ごとの気温・降水確率の集計（SQLで計算）"""
+        return self.query('''
+            SELECT area_code,
+                   COUNT(*) AS days,
+                   MAX(temp_max) AS temp_max,
+                   MIN(temp_min) AS temp_min,
+                   AVG(temp_max) AS avg_temp_max,
+                   AVG(temp_min) AS avg_temp_min,
+                   AVG(pop) AS avg_pop
+            FROM forecasts
+            WHERE target_date BETWEEN ? AND ?
+            GROUP BY area_code
+            ORDER BY area_code
+        ''', (start_date, end_date))
+
+    def get_all_areas(self):
+        return self.query('SELECT * FROM areas')
+
+    def replace_weekly_forecasts(self, weekly_rows, fetched_at=None):
+        """
+        週間予報の保存（含まれる地域の古いデータは消してから入れ直す）
+        weekly_rows: (area_code, target_date, weather_code, pop, temp_min, temp_max) のリスト
+        """
+        now = fetched_at or datetime.now().isoformat()
+        area_codes = sorted({row[0] for row in weekly_rows})
+        with self.transaction() as cursor:
+            cursor.executemany('DELETE FROM weekly_forecasts WHERE area_code = ?', [(c,) for c in area_codes])
+            cursor.executemany('''
+                INSERT OR REPLACE INTO weekly_forecasts
+                (area_code, target_date, weather_code, pop, temp_min, temp_max, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(code, date, w_code, to_int(pop), to_int(t_min), to_int(t_max), now)
+                  for code, date, w_code, pop, t_min, t_max in weekly_rows])
+
+    def get_weekly_forecasts(self, area_code):
+        """指定した地域の週間予報を日付順に取得"""
+        return self.query_records(WeeklyForecastRecord, f'''
+            SELECT {", ".join(WeeklyForecastRecord._fields)} FROM weekly_forecasts
+            WHERE area_code = ? ORDER BY target_date
+        ''', (area_code,))
+
+    def replace_regions(self, region_rows):
+        """
+        地域階層をまとめて入れ替える
+        region_rows: (level, code, parent_code, name, sort_order) のリスト
+        """
+        now = datetime.now().isoformat()
+        with self.transaction() as cursor:
+            cursor.execute('DELETE FROM regions')
+            cursor.executemany('''
+                INSERT OR REPLACE INTO regions (level, code, parent_code, name, sort_order, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(*row, now) for row in region_rows])
+
+    def get_regions(self, level, parent_code=None):
+        """指定した階層の地域を取得（parent_code を指定するとその子だけ）"""
+        if parent_code is None:
+            return self.query(
+                'SELECT * FROM regions WHERE level = ? ORDER BY sort_order', (level,)
+            )
+        return self.query(
+            'SELECT * FROM regions WHERE level = ? AND parent_code = ? ORDER BY sort_order',
+            (level, parent_code),
+        )
+
+    def get_regions_fetched_at(self):
+        """地域階層を最後に保存した日時（未保存ならNone）"""
+        row = self.query('SELECT MAX(fetched_at) AS fetched_at FROM regions')[0]
+        return datetime.fromisoformat(row["fetched_at"]) if row["fetched_at"] else None
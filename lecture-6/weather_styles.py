@@ -0,0 +1,53 @@
+import flet as ft
+from collections import namedtuple
+
+from forecast_parser import WEATHER_CODE_TEXT
+
+# --- 天気の分類と表示スタイル ---
+# スタイル（色・グラデーション）は起動時に1回だけ作り、すべてのカードで使い回す
+
+WeatherStyle = namedtuple("WeatherStyle", ["category", "label", "emoji", "color", "gradient"])
+
+STYLES = {
+    "thunder": WeatherStyle("thunder", "雷", "⛈️", "#7C3AED", ft.LinearGradient(["#DDD6FE", "#A78BFA"], begin=ft.alignment.top_left)),
+    "snow": WeatherStyle("snow", "雪", "❄️", "#0891B2", ft.LinearGradient(["#CFFAFE", "#67E8F9"], begin=ft.alignment.top_left)),
+    "rain": WeatherStyle("rain", "雨", "🌧️", "#2563EB", ft.LinearGradient(["#DBEAFE", "#93C5FD"], begin=ft.alignment.top_left)),
+    "partly": WeatherStyle("partly", "晴時々曇", "🌤️", "#D97706", ft.LinearGradient(["#FEF3C7", "#FDE68A"], begin=ft.alignment.top_left)),
+    "sunny": WeatherStyle("sunny", "晴", "☀️", "#EA580C", ft.LinearGradient(["#FFEDD5", "#FED7AA"], begin=ft.alignment.top_left)),
+    "cloudy": WeatherStyle("cloudy", "曇", "☁️", "#475569", ft.LinearGradient(["#F1F5F9", "#E2E8F0"], begin=ft.alignment.top_left)),
+}
+UNKNOWN_STYLE = WeatherStyle("unknown", "", "❓", "#CBD5E1", ft.LinearGradient(["#F8FAFC", "#F1F5F9"]))
+
+# 一覧に無いコードは上1桁で分類する
+CODE_PREFIX_CATEGORY = {"1": "sunny", "2": "cloudy", "3": "rain", "4": "snow"}
+
+
+def classify_text(condition_text):
+    """天気の文言から分類を決める（優先順位: 雷 > 雪 > 雨 > 晴と曇 > 晴 > 曇）"""
+    target = str(condition_text)
+    if "雷" in target:
+        return "thunder"
+    if "雪" in target or "みぞれ" in target:
+        return "snow"
+    if "雨" in target:
+        return "rain"
+    if "晴" in target and ("曇" in target or "くもり" in target):
+        return "partly"
+    if "晴" in target:
+        return "sunny"
+    return "cloudy"
+
+
+# 100〜499 のすべてのコードについて、スタイルを事前に決めておく
+CODE_STYLES = {
+    str(code): STYLES[
+        classify_text(WEATHER_CODE_TEXT[str(code)]) if str(code) in WEATHER_CODE_TEXT
+        else CODE_PREFIX_CATEGORY[str(code)[0]]
+    ]
+    for code in range(100, 500)
+}
+
+
+def style_for_code(weather_code):
+    """天気コードから表示スタイルを引く（データなし・不明なコードは UNKNOWN_STYLE）"""
+    return CODE_STYLES.get(weather_code, UNKNOWN_STYLE) if weather_code else UNKNOWN_STYLE